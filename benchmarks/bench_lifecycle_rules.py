@@ -0,0 +1,56 @@
+"""
+Micro-benchmark: compiled stage predicates vs the condition interpreter.
+
+Run with: python -m benchmarks.bench_lifecycle_rules
+"""
+
+import random
+import timeit
+
+from src.services.lifecycle import LifecycleService, LifecycleStage
+
+
+def interpret(service: LifecycleService, stage: LifecycleStage, data: dict) -> bool:
+    """Per-dict condition interpretation, as evaluate_transition used to do."""
+    config = service.stage_configs[stage]
+    for condition in config.conditions:
+        actual = data.get(condition["field"])
+        if not service._evaluate_condition(actual, condition["operator"], condition["value"]):
+            return False
+    return True
+
+
+def main(n_contacts: int = 200_000, repeat: int = 5):
+    service = LifecycleService()
+    rng = random.Random(42)
+    contacts = [
+        {
+            "engagement_score": rng.randint(0, 100),
+            "meeting_scheduled": rng.random() < 0.3,
+            "budget_confirmed": rng.random() < 0.2,
+        }
+        for _ in range(n_contacts)
+    ]
+    stages = [LifecycleStage.LEAD, LifecycleStage.MQL, LifecycleStage.SQL]
+    work = [(stages[i % 3], c) for i, c in enumerate(contacts)]
+    compiled = {stage: service._get_compiled(stage).predicate for stage in stages}
+    
+    def run_interpreted():
+        for stage, data in work:
+            interpret(service, stage, data)
+    
+    def run_compiled():
+        for stage, data in work:
+            compiled[stage](data)
+    
+    interpreted = min(timeit.repeat(run_interpreted, number=1, repeat=repeat))
+    fast = min(timeit.repeat(run_compiled, number=1, repeat=repeat))
+    
+    print(f"contacts:    {n_contacts}")
+    print(f"interpreted: {interpreted * 1e3:8.1f} ms")
+    print(f"compiled:    {fast * 1e3:8.1f} ms")
+    print(f"speedup:     {interpreted / fast:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
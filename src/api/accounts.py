@@ -2,11 +2,16 @@
 Account management API endpoints.
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from src.core.config import settings
+from src.core.pagination import NEXT_CURSOR_HEADER
+from src.services.account_rollups import current_health
+from src.services.repositories import account_repository, deal_repository
+
 router = APIRouter()
 
 
@@ -33,33 +38,46 @@ class AccountResponse(BaseModel):
 
 @router.get("/", response_model=List[AccountResponse])
 async def list_accounts(
+    response: Response,
     industry: Optional[str] = None,
     size: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
 ):
-    """List accounts with optional filtering."""
-    return []
+    """
+    List accounts with optional filtering.
+    
+    Results are ordered by most recently updated. When more results exist,
+    the X-Next-Cursor response header holds the cursor for the next page.
+    """
+    try:
+        page = await account_repository.list(
+            industry=industry,
+            size=size,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return [current_health(account) for account in page.items]
 
 
 @router.post("/", response_model=AccountResponse, status_code=status.HTTP_201_CREATED)
 async def create_account(account: AccountCreate):
     """Create a new account."""
-    return {
-        "id": "acc_abc123",
-        "name": account.name,
-        "domain": account.domain,
-        "industry": account.industry,
-        "size": account.size,
-        "health_score": 75,
-        "total_deal_value": 0,
-        "contact_count": 0,
-        "created_at": datetime.utcnow(),
-    }
+    return await account_repository.create(account.model_dump())
 
 
 @router.get("/{account_id}", response_model=AccountResponse)
 async def get_account(account_id: str):
     """Get account by ID."""
-    raise HTTPException(status_code=404, detail="Account not found")
+    account = await account_repository.get(account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return current_health(account)
 
 
 @router.get("/{account_id}/contacts")
@@ -69,22 +87,32 @@ async def get_account_contacts(account_id: str):
 
 
 @router.get("/{account_id}/deals")
-async def get_account_deals(account_id: str):
-    """Get all deals for an account."""
-    return {"account_id": account_id, "deals": []}
+async def get_account_deals(account_id: str, cursor: Optional[str] = None):
+    """Get deals for an account, one page at a time."""
+    try:
+        page = await deal_repository.list(account_id=account_id, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"account_id": account_id, "deals": page.items, "next_cursor": page.next_cursor}
 
 
 @router.get("/{account_id}/health")
 async def get_account_health(account_id: str):
-    """Get account health metrics."""
+    """
+    Get account health metrics.
+    
+    Factors are recomputed from the account's stored rollups as of now;
+    trends compare each factor with its value at the last rollup.
+    """
+    account = await account_repository.get(account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+    account = current_health(account)
+    factors = account["health_factors"]
     return {
         "account_id": account_id,
-        "health_score": 75,
-        "factors": [
-            {"factor": "engagement", "score": 80, "trend": "up"},
-            {"factor": "nps", "score": 70, "trend": "stable"},
-            {"factor": "support_tickets", "score": 85, "trend": "up"},
-            {"factor": "product_usage", "score": 65, "trend": "down"},
-        ],
-        "at_risk": False,
+        "health_score": account["health_score"],
+        "factors": [{"factor": factor, **values} for factor, values in factors.items()],
+        "at_risk": account["health_score"] < settings.account_at_risk_score,
+        "computed_at": account["health_at"],
     }
@@ -2,11 +2,29 @@
 Contact management API endpoints.
 """
 
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, EmailStr
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, TypeAdapter, ValidationError
+from typing import List, Dict, Any, Optional, Iterable, Tuple
 from datetime import datetime
 
+from src.core.config import settings
+from src.core.export import ENCODERS, EXPORT_MEDIA_TYPES
+from src.core.ingest import INGEST_FORMATS, DECODERS, DecodedRecord, iter_lines, chunked
+from src.core.pagination import NEXT_CURSOR_HEADER
+from src.services.account_rollups import account_rollups
+from src.services.dedup import dedup_service
+from src.services.engagement import engagement_service, ACTIVITY_FIELD_EFFECTS
+from src.services.enrichment_queue import enrichment_queue, EnrichmentPriority
+from src.services.lifecycle import lifecycle_service, LifecycleStage, StageTransition
+from src.services.repositories import (
+    activity_repository,
+    contact_repository,
+    DuplicateRecordError,
+    CONTACT_EXPORT_COLUMNS,
+)
+
 router = APIRouter()
 
 
@@ -17,9 +35,13 @@ class ContactCreate(BaseModel):
     company: Optional[str] = None
     title: Optional[str] = None
     phone: Optional[str] = None
+    account_id: Optional[str] = None
     custom_fields: Dict[str, Any] = {}
 
 
+_CONTACT_BATCH = TypeAdapter(List[ContactCreate])
+
+
 class ContactResponse(BaseModel):
     id: str
     email: str
@@ -27,90 +49,343 @@ class ContactResponse(BaseModel):
     last_name: str
     company: Optional[str]
     title: Optional[str]
+    account_id: Optional[str] = None
     lifecycle_stage: str
     engagement_score: int
     created_at: datetime
     updated_at: datetime
 
 
+class ContactCreated(ContactResponse):
+    # Whether enrichment was queued; None unless it was requested.
+    enrichment_queued: Optional[bool] = None
+
+
+def _contact_data(contact: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a stored contact into the field map lifecycle conditions read."""
+    return {**contact["custom_fields"], **contact}
+
+
+async def _apply_lifecycle_change(
+    contact: Dict[str, Any],
+    changed_fields: Iterable[str],
+) -> Optional[StageTransition]:
+    """
+    Re-check lifecycle after a write; no-op unless a stage condition field changed.
+    
+    Persists the new stage into contact when a transition happens.
+    """
+    transition = await lifecycle_service.reevaluate_on_change(
+        contact["id"],
+        LifecycleStage(contact["lifecycle_stage"]),
+        changed_fields,
+        _contact_data(contact),
+    )
+    if transition:
+        updated = await contact_repository.update(
+            contact["id"], {"lifecycle_stage": transition.to_stage.value}
+        )
+        if updated:
+            contact.update(updated)
+        config = lifecycle_service.stage_configs[transition.from_stage]
+        await lifecycle_service.execute_transition_actions(transition, config)
+    return transition
+
+
+def _with_custom_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Move keys ContactCreate doesn't define into custom_fields."""
+    known = {k: v for k, v in record.items() if k in ContactCreate.model_fields}
+    extra = {k: v for k, v in record.items() if k not in ContactCreate.model_fields}
+    if extra:
+        known["custom_fields"] = {**extra, **known.get("custom_fields", {})}
+    return known
+
+
+def _validate_chunk(
+    chunk: List[DecodedRecord],
+) -> Tuple[List[ContactCreate], List[Dict[str, Any]]]:
+    """
+    Validate a chunk of decoded records in one pass.
+    
+    Returns the valid contacts and a per-row error report for the rest.
+    """
+    errors = [{"row": index, "errors": [error]} for index, _, error in chunk if error]
+    candidates = [(index, _with_custom_fields(record)) for index, record, error in chunk if not error]
+    try:
+        return _CONTACT_BATCH.validate_python([record for _, record in candidates]), errors
+    except ValidationError as e:
+        invalid: Dict[int, List[str]] = {}
+        for error in e.errors():
+            position, *path = error["loc"]
+            field = ".".join(str(part) for part in path)
+            invalid.setdefault(position, []).append(f"{field}: {error['msg']}" if field else error["msg"])
+    
+    errors.extend({"row": candidates[pos][0], "errors": messages} for pos, messages in invalid.items())
+    errors.sort(key=lambda item: item["row"])
+    valid = [record for pos, (_, record) in enumerate(candidates) if pos not in invalid]
+    return _CONTACT_BATCH.validate_python(valid), errors
+
+
 @router.get("/", response_model=List[ContactResponse])
 async def list_contacts(
+    response: Response,
+    lifecycle_stage: Optional[str] = None,
+    min_score: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    List contacts with optional filtering.
+    
+    Results are ordered by most recently updated. When more results exist,
+    the X-Next-Cursor response header holds the cursor for the next page.
+    """
+    try:
+        page = await contact_repository.list(
+            lifecycle_stage=lifecycle_stage,
+            min_score=min_score,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
+
+@router.get("/export")
+async def export_contacts(
     lifecycle_stage: Optional[str] = None,
     min_score: Optional[int] = None,
-    skip: int = 0,
-    limit: int = 100,
+    format: str = "ndjson",
 ):
-    """List contacts with optional filtering."""
-    return []
+    """
+    Stream all matching contacts as NDJSON or CSV.
+    
+    Rows are read from a server-side cursor and encoded in batches, so
+    memory use does not grow with the size of the export.
+    """
+    encoder = ENCODERS.get(format)
+    if encoder is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    
+    partitions = contact_repository.stream(lifecycle_stage=lifecycle_stage, min_score=min_score)
+    return StreamingResponse(
+        encoder(CONTACT_EXPORT_COLUMNS, partitions),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
 
 
-@router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
+@router.get("/duplicates")
+async def list_duplicates(min_score: float = Query(0.0, ge=0, le=1), limit: int = Query(100, ge=1, le=1000)):
+    """
+    Suspected duplicate contacts, best match first.
+    
+    New and updated contacts are checked against the contacts sharing a
+    blocking key (email, email domain plus last name, or phone) as they are
+    written, once the index has loaded (index_ready); POST /duplicates/scan
+    re-checks the whole base.
+    """
+    return {
+        "duplicates": dedup_service.pending(min_score, limit),
+        "index_ready": dedup_service.ready,
+        "last_scan": dedup_service.last_scan,
+    }
+
+
+@router.post("/duplicates/scan")
+async def scan_duplicates():
+    """Rebuild the deduplication index from the database and re-score every block."""
+    return await dedup_service.scan()
+
+
+@router.post("/", response_model=ContactCreated, status_code=status.HTTP_201_CREATED)
 async def create_contact(contact: ContactCreate, enrich: bool = False):
     """
     Create a new contact.
     
     Options:
-    - enrich: Auto-enrich with company data, social profiles
+    - enrich: Auto-enrich with company data, social profiles. Enrichment
+      is queued and runs after the response; enrichment_queued is false
+      when the queue was full, and POST /{id}/enrich can be retried.
+    """
+    try:
+        created = await contact_repository.create(contact.model_dump())
+    except DuplicateRecordError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    dedup_service.check(created)
+    account_rollups.record_contact_created(created)
+    if enrich:
+        queued = enrichment_queue.enqueue(created, EnrichmentPriority.INTERACTIVE)
+        return {**created, "enrichment_queued": queued}
+    return created
+
+
+@router.post("/bulk")
+async def bulk_import_contacts(request: Request, enrich: bool = False):
     """
+    Import contacts from a streamed NDJSON or CSV body.
+    
+    Records are validated and upserted by email in chunks of
+    BULK_INGEST_CHUNK_SIZE. Unknown columns are kept in custom_fields.
+    Returns counts and a per-row error report; rows are numbered from 0
+    in input order. With enrich, contacts are queued for enrichment at
+    bulk priority, behind single-contact requests.
+    """
+    content_type = request.headers.get("content-type", "application/x-ndjson")
+    format = INGEST_FORMATS.get(content_type.split(";")[0].strip().lower())
+    if format is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    
+    records = DECODERS[format](iter_lines(request.stream()))
+    received, upserted = 0, 0
+    errors: List[Dict[str, Any]] = []
+    enrichment_queued = 0
+    
+    async for chunk in chunked(records, settings.bulk_ingest_chunk_size):
+        received += len(chunk)
+        # Email validation is CPU-bound; keep it off the event loop.
+        valid, chunk_errors = await run_in_threadpool(_validate_chunk, chunk)
+        errors.extend(chunk_errors)
+        if valid:
+            data = [c.model_dump() for c in valid]
+            written = await contact_repository.upsert_many(data)
+            upserted += len(written)
+            by_email = {record["email"]: record for record in data}
+            for contact in written:
+                dedup_service.check({**by_email[contact["email"]], "id": contact["id"]})
+                if contact["created"]:
+                    account_rollups.record_contact_created(contact)
+            if enrich:
+                enrichment_queued += sum(
+                    enrichment_queue.enqueue(c, EnrichmentPriority.BULK) for c in written
+                )
+    
     return {
-        "id": "con_abc123",
-        "email": contact.email,
-        "first_name": contact.first_name,
-        "last_name": contact.last_name,
-        "company": contact.company,
-        "title": contact.title,
-        "lifecycle_stage": "lead",
-        "engagement_score": 0,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow(),
+        "received": received,
+        "upserted": upserted,
+        "failed": len(errors),
+        "errors": errors,
+        "enrichment_queued": enrichment_queued,
     }
 
 
 @router.get("/{contact_id}", response_model=ContactResponse)
 async def get_contact(contact_id: str):
     """Get contact by ID."""
-    raise HTTPException(status_code=404, detail="Contact not found")
+    contact = await contact_repository.get(contact_id)
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    return contact
 
 
 @router.put("/{contact_id}", response_model=ContactResponse)
 async def update_contact(contact_id: str, contact: ContactCreate):
-    """Update a contact."""
-    return {
-        "id": contact_id,
-        "email": contact.email,
-        "first_name": contact.first_name,
-        "last_name": contact.last_name,
-        "company": contact.company,
-        "title": contact.title,
-        "lifecycle_stage": "lead",
-        "engagement_score": 0,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow(),
+    """Update a contact; optional fields left out of the body keep their values."""
+    existing = await contact_repository.get(contact_id)
+    if not existing:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    
+    data = contact.model_dump(exclude_unset=True)
+    changed_fields = {
+        field for field, value in data.items()
+        if field != "custom_fields" and existing.get(field) != value
     }
+    old_custom = existing["custom_fields"]
+    new_custom = data.get("custom_fields", old_custom)
+    changed_fields |= {
+        field for field in old_custom.keys() | new_custom.keys()
+        if old_custom.get(field) != new_custom.get(field)
+    }
+    
+    try:
+        updated = await contact_repository.update(contact_id, data)
+    except DuplicateRecordError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not updated:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    
+    dedup_service.check(updated)
+    account_rollups.record_contact_updated(existing, updated)
+    await _apply_lifecycle_change(updated, changed_fields)
+    return updated
 
 
-@router.post("/{contact_id}/enrich")
+@router.post("/{contact_id}/enrich", status_code=status.HTTP_202_ACCEPTED)
 async def enrich_contact(contact_id: str):
-    """Enrich contact with external data."""
+    """
+    Queue a contact for enrichment with external data.
+    
+    Single-contact requests are served ahead of bulk backfills.
+    """
+    contact = await contact_repository.get(contact_id)
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    if not enrichment_queue.enqueue(contact, EnrichmentPriority.INTERACTIVE):
+        raise HTTPException(status_code=503, detail="Enrichment queue is full")
     return {
         "contact_id": contact_id,
-        "enriched_fields": ["company", "title", "linkedin", "company_size"],
-        "enriched_at": datetime.utcnow().isoformat(),
+        "status": "queued",
+        "queue_depth": enrichment_queue.metrics()["depth"],
+        "queued_at": datetime.utcnow().isoformat(),
     }
 
 
 @router.post("/{contact_id}/activity")
 async def record_activity(contact_id: str, activity_type: str, details: Dict = {}):
-    """Record contact activity for engagement scoring."""
+    """
+    Record contact activity for engagement scoring.
+    
+    The activity is appended to the contact's log and folded into its
+    time-decayed engagement score without replaying earlier activity.
+    """
+    activity, contact = await engagement_service.record(contact_id, activity_type, details)
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    account_rollups.record_activities({contact_id: contact}, {contact_id: [activity]})
+    
+    effects = ACTIVITY_FIELD_EFFECTS.get(activity_type, {})
+    transition = await _apply_lifecycle_change(contact, {"engagement_score", *effects})
+    
     return {
         "contact_id": contact_id,
+        "activity_id": activity["id"],
         "activity": activity_type,
-        "new_engagement_score": 45,
-        "recorded_at": datetime.utcnow().isoformat(),
+        "points": activity["points"],
+        "new_engagement_score": contact["engagement_score"],
+        "lifecycle_transition": transition.to_stage.value if transition else None,
+        "recorded_at": activity["occurred_at"].isoformat(),
     }
 
 
 @router.get("/{contact_id}/timeline")
-async def get_contact_timeline(contact_id: str, limit: int = 50):
-    """Get contact activity timeline."""
-    return {"contact_id": contact_id, "activities": []}
+async def get_contact_timeline(
+    contact_id: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """
+    Get contact activity timeline, newest first.
+    
+    When more activity exists, the X-Next-Cursor response header holds the
+    cursor for the next page.
+    """
+    contact = await contact_repository.get(contact_id)
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    try:
+        page = await activity_repository.timeline(contact_id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return {
+        "contact_id": contact_id,
+        "engagement_score": round(engagement_service.current_score(contact), 2),
+        "activities": page.items,
+    }
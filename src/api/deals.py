@@ -2,11 +2,21 @@
 Deal pipeline API endpoints.
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from dataclasses import asdict
 from datetime import datetime
 
+from src.core.export import ENCODERS, EXPORT_MEDIA_TYPES
+from src.core.pagination import NEXT_CURSOR_HEADER
+from src.services.forecast import revenue_forecaster
+from src.services.account_rollups import account_rollups
+from src.services.pipeline import pipeline_aggregates, stage_probability
+from src.services.repositories import deal_repository, DEAL_EXPORT_COLUMNS
+from src.services.stale_deals import stale_deal_index
+
 router = APIRouter()
 
 
@@ -17,6 +27,7 @@ class DealCreate(BaseModel):
     value: float
     currency: str = "USD"
     stage: str = "qualification"
+    owner_id: Optional[str] = None
     close_date: Optional[str] = None
     custom_fields: Dict[str, Any] = {}
 
@@ -36,78 +47,153 @@ class DealResponse(BaseModel):
 
 @router.get("/", response_model=List[DealResponse])
 async def list_deals(
+    response: Response,
+    stage: Optional[str] = None,
+    owner_id: Optional[str] = None,
+    min_value: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    List deals with optional filtering.
+    
+    Results are ordered by most recently updated. When more results exist,
+    the X-Next-Cursor response header holds the cursor for the next page.
+    """
+    try:
+        page = await deal_repository.list(
+            stage=stage,
+            owner_id=owner_id,
+            min_value=min_value,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
+
+@router.get("/export")
+async def export_deals(
     stage: Optional[str] = None,
     owner_id: Optional[str] = None,
     min_value: Optional[float] = None,
+    format: str = "ndjson",
 ):
-    """List deals with optional filtering."""
-    return []
+    """
+    Stream all matching deals as NDJSON or CSV.
+    
+    Rows are read from a server-side cursor and encoded in batches, so
+    memory use does not grow with the size of the export.
+    """
+    encoder = ENCODERS.get(format)
+    if encoder is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    
+    partitions = deal_repository.stream(stage=stage, owner_id=owner_id, min_value=min_value)
+    return StreamingResponse(
+        encoder(DEAL_EXPORT_COLUMNS, partitions),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="deals.{format}"'},
+    )
 
 
 @router.post("/", response_model=DealResponse, status_code=status.HTTP_201_CREATED)
 async def create_deal(deal: DealCreate):
     """Create a new deal."""
-    return {
-        "id": "deal_abc123",
-        "name": deal.name,
-        "contact_id": deal.contact_id,
-        "account_id": deal.account_id,
-        "value": deal.value,
-        "currency": deal.currency,
-        "stage": deal.stage,
-        "probability": 20,
-        "close_date": deal.close_date,
-        "created_at": datetime.utcnow(),
-    }
+    created = await deal_repository.create({
+        **deal.model_dump(),
+        "probability": stage_probability(deal.stage),
+    })
+    pipeline_aggregates.record_created(created)
+    stale_deal_index.touch(created)
+    account_rollups.record_deal_created(created)
+    return created
 
 
 @router.put("/{deal_id}/stage")
 async def update_deal_stage(deal_id: str, stage: str, notes: Optional[str] = None):
     """Update deal stage (pipeline progression)."""
-    stage_probabilities = {
-        "qualification": 20,
-        "discovery": 40,
-        "proposal": 60,
-        "negotiation": 80,
-        "closed_won": 100,
-        "closed_lost": 0,
-    }
+    before, deal = await deal_repository.update_with_previous(deal_id, {
+        "stage": stage,
+        "probability": stage_probability(stage),
+    })
+    if not deal:
+        raise HTTPException(status_code=404, detail="Deal not found")
+    pipeline_aggregates.record_updated(before, deal)
+    stale_deal_index.touch(deal)
+    account_rollups.record_deal_updated(before, deal)
+    
     return {
         "deal_id": deal_id,
-        "stage": stage,
-        "probability": stage_probabilities.get(stage, 50),
-        "updated_at": datetime.utcnow().isoformat(),
+        "stage": deal["stage"],
+        "probability": deal["probability"],
+        "updated_at": deal["updated_at"].isoformat(),
     }
 
 
 @router.get("/pipeline")
 async def get_pipeline_summary():
-    """Get pipeline summary by stage."""
-    return {
-        "stages": [
-            {"stage": "qualification", "count": 10, "value": 50000},
-            {"stage": "discovery", "count": 8, "value": 120000},
-            {"stage": "proposal", "count": 5, "value": 200000},
-            {"stage": "negotiation", "count": 3, "value": 150000},
-        ],
-        "total_pipeline_value": 520000,
-        "weighted_value": 260000,
-    }
+    """
+    Get pipeline summary by open stage.
+    
+    Served from running aggregates maintained on every deal write.
+    """
+    return pipeline_aggregates.summary()
+
+
+@router.get("/pipeline/check")
+async def check_pipeline(repair: bool = False):
+    """
+    Compare the running pipeline aggregates with a full recompute.
+    
+    With repair, aggregates that have drifted are rebuilt.
+    """
+    report = await pipeline_aggregates.check()
+    if repair and not report["consistent"]:
+        await pipeline_aggregates.rebuild()
+        report["repaired"] = True
+    return report
 
 
 @router.get("/forecast")
 async def get_revenue_forecast(period: str = "quarter"):
-    """Get revenue forecast based on pipeline."""
-    return {
-        "period": period,
-        "expected_revenue": 180000,
-        "best_case": 320000,
-        "worst_case": 80000,
-        "closed_to_date": 45000,
-    }
+    """
+    Get revenue forecast based on pipeline.
+    
+    Percentiles come from Monte Carlo simulation of the open deals closing
+    within the period; best and worst case are the 90th and 10th.
+    """
+    try:
+        return await revenue_forecaster.forecast(period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/stale")
-async def get_stale_deals(days_threshold: int = 14):
-    """Get deals that haven't been updated recently (rot alerts)."""
-    return {"stale_deals": [], "threshold_days": days_threshold}
+async def get_stale_deals(
+    days_threshold: float = Query(14, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Get open deals that haven't been updated recently (rot alerts).
+    
+    Served from an index of open deals ordered by last activity, so only
+    the deals past the threshold are read. The most idle come first.
+    """
+    now = datetime.utcnow()
+    total, keys = stale_deal_index.stale(days_threshold, limit, now)
+    stale = await deal_repository.get_many([deal_id for _, deal_id in keys])
+    for deal in stale:
+        deal["days_idle"] = round((now - deal["updated_at"]).total_seconds() / 86400, 2)
+    return {"stale_deals": stale, "threshold_days": days_threshold, "total": total}
+
+
+@router.get("/stale/alerts")
+async def get_rot_alerts(limit: int = Query(100, ge=1, le=1000)):
+    """Most recent rot alerts raised by the stale deal sweeper, newest first."""
+    alerts = list(stale_deal_index.recent_alerts)[-limit:]
+    return {"alerts": [asdict(alert) for alert in reversed(alerts)]}
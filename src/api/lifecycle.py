@@ -2,10 +2,20 @@
 Lifecycle management API endpoints.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+import numpy as np
+
+from src.services.lifecycle import (
+    lifecycle_service,
+    LifecycleStage as Stage,
+    StageConfig,
+    encode_stages,
+    decode_stages,
+)
 
 router = APIRouter()
 
@@ -25,6 +35,15 @@ class LifecycleTransition(BaseModel):
     transitioned_at: datetime
 
 
+class BatchEvaluationRequest(BaseModel):
+    """Columnar batch of contacts; all arrays must have the same length."""
+    contact_ids: Optional[List[str]] = None
+    current_stage: List[str]
+    engagement_score: List[Optional[float]]
+    meeting_scheduled: List[bool]
+    budget_confirmed: List[bool]
+
+
 @router.get("/stages")
 async def get_lifecycle_stages():
     """Get configured lifecycle stages."""
@@ -40,9 +59,44 @@ async def get_lifecycle_stages():
     }
 
 
+def _parse_stage(name: str) -> Stage:
+    try:
+        return Stage(name)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Unknown lifecycle stage: {name}")
+
+
 @router.post("/stages")
 async def configure_stage(stage: LifecycleStage):
-    """Configure a lifecycle stage with criteria and actions."""
+    """
+    Configure a lifecycle stage with criteria and actions.
+    
+    Criteria format:
+    - conditions: [{"field": ..., "operator": ..., "value": ...}]
+    - next_stage: stage to progress to (defaults to the current setting)
+    
+    Conditions are compiled once here rather than on every evaluation.
+    """
+    current = _parse_stage(stage.name)
+    existing = lifecycle_service.stage_configs.get(current)
+    
+    next_stage_name = stage.criteria.get("next_stage")
+    if next_stage_name is not None:
+        next_stage = _parse_stage(next_stage_name)
+    else:
+        next_stage = existing.next_stage if existing else None
+    
+    conditions = stage.criteria.get("conditions", [])
+    try:
+        lifecycle_service.configure_stage(StageConfig(
+            stage=current,
+            next_stage=next_stage,
+            conditions=conditions,
+            actions=stage.actions,
+        ))
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid stage criteria: {e}")
+    
     return {
         "stage": stage.name,
         "configured": True,
@@ -56,6 +110,51 @@ async def get_recent_transitions(limit: int = 50):
     return {"transitions": []}
 
 
+def _evaluate_batch(batch: BatchEvaluationRequest) -> Dict[str, Any]:
+    current = encode_stages(batch.current_stage)
+    result = lifecycle_service.evaluate_batch(current, {
+        # None becomes NaN so ordering comparisons fail for missing scores
+        "engagement_score": np.array(batch.engagement_score, dtype=np.float64),
+        "meeting_scheduled": np.array(batch.meeting_scheduled, dtype=bool),
+        "budget_confirmed": np.array(batch.budget_confirmed, dtype=bool),
+    })
+    return {
+        "evaluated": len(current),
+        "transitioned": int(result.transitioned.sum()),
+        "next_stage": decode_stages(result.next_stage).tolist(),
+        "transition_mask": result.transitioned.tolist(),
+    }
+
+
+@router.post("/evaluate/batch")
+async def evaluate_lifecycle_batch(batch: BatchEvaluationRequest):
+    """
+    Evaluate lifecycle transitions for a columnar batch of contacts.
+    
+    Conditions are applied as vectorized comparisons over the whole batch.
+    Returns the next stage per row and a transition mask aligned with the input.
+    """
+    lengths = {
+        len(batch.current_stage),
+        len(batch.engagement_score),
+        len(batch.meeting_scheduled),
+        len(batch.budget_confirmed),
+    }
+    if batch.contact_ids is not None:
+        lengths.add(len(batch.contact_ids))
+    if len(lengths) > 1:
+        raise HTTPException(status_code=400, detail="All batch columns must have the same length")
+    
+    try:
+        result = await run_in_threadpool(_evaluate_batch, batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if batch.contact_ids is not None:
+        result["contact_ids"] = batch.contact_ids
+    return result
+
+
 @router.post("/evaluate/{contact_id}")
 async def evaluate_lifecycle(contact_id: str):
     """
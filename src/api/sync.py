@@ -2,11 +2,13 @@
 CRM sync API endpoints.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from src.services.sync_engine import sync_engine
+
 router = APIRouter()
 
 
@@ -14,8 +16,9 @@ class SyncConfig(BaseModel):
     source: str  # salesforce, hubspot, zoho
     target: str
     objects: List[str]  # contacts, deals, accounts
-    field_mapping: Dict[str, Dict[str, str]]
-    conflict_resolution: str = "source_wins"
+    field_mapping: Dict[str, Dict[str, str]] = {}  # per object type; overrides /mapping
+    conflict_resolution: Optional[str] = None  # source_wins, target_wins, manual; defaults to CONFLICT_RESOLUTION
+    full_resync: bool = False  # ignore high-water marks and re-read everything
 
 
 class SyncStatus(BaseModel):
@@ -23,55 +26,66 @@ class SyncStatus(BaseModel):
     source: str
     target: str
     status: str
+    mode: str = "incremental"
+    records_read: int = 0
+    records_skipped: int = 0
     records_synced: int
+    conflicts: int = 0
     errors: int
+    throughput: float = 0.0
     started_at: datetime
     completed_at: Optional[datetime]
 
 
+class ConflictResolution(BaseModel):
+    resolution: str  # source_wins, target_wins, custom
+    value: Any = None  # the value to write to both records, for custom
+
+
 @router.post("/run", response_model=SyncStatus)
 async def run_sync(config: SyncConfig):
     """
     Run bi-directional sync between CRM systems.
     
+    Runs are incremental: only records changed since the last clean run
+    are read, unless full_resync is set.
+    
     Sync process:
     1. Fetch records from source
     2. Apply field mapping
-    3. Resolve conflicts
+    3. Skip unchanged records and resolve conflicts
     4. Upsert to target
     5. Log results
+    
+    The job runs in the background; poll /status/{sync_id} for progress.
     """
-    return {
-        "sync_id": "sync_abc123",
-        "source": config.source,
-        "target": config.target,
-        "status": "running",
-        "records_synced": 0,
-        "errors": 0,
-        "started_at": datetime.utcnow(),
-        "completed_at": None,
-    }
+    try:
+        job = sync_engine.start(
+            source=config.source,
+            target=config.target,
+            objects=config.objects,
+            field_mapping=config.field_mapping,
+            conflict_resolution=config.conflict_resolution,
+            full_resync=config.full_resync,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_status()
 
 
 @router.get("/status/{sync_id}", response_model=SyncStatus)
 async def get_sync_status(sync_id: str):
     """Get status of a sync job."""
-    return {
-        "sync_id": sync_id,
-        "source": "hubspot",
-        "target": "salesforce",
-        "status": "completed",
-        "records_synced": 150,
-        "errors": 2,
-        "started_at": datetime.utcnow(),
-        "completed_at": datetime.utcnow(),
-    }
+    job = sync_engine.get_job(sync_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job.to_status()
 
 
 @router.get("/history")
 async def get_sync_history(limit: int = 20):
     """Get sync job history."""
-    return {"syncs": []}
+    return {"syncs": [job.to_status() for job in sync_engine.history(limit)]}
 
 
 @router.post("/mapping")
@@ -81,27 +95,48 @@ async def configure_field_mapping(
     object_type: str,
     mapping: Dict[str, str]
 ):
-    """Configure field mapping between systems."""
+    """
+    Configure field mapping between systems.
+    
+    mapping renames source fields to target fields; a target written as
+    "Field:type" also converts the value (str, int, float, bool or
+    datetime). Runs without a field_mapping of their own use it.
+    """
+    try:
+        compiled = sync_engine.mappings.configure(source, target, object_type, mapping)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
         "source": source,
         "target": target,
         "object_type": object_type,
         "mapping": mapping,
+        "coercions": compiled.coercions,
         "configured_at": datetime.utcnow().isoformat(),
     }
 
 
 @router.get("/conflicts")
 async def get_unresolved_conflicts(limit: int = 50):
-    """Get unresolved sync conflicts for manual review."""
-    return {"conflicts": []}
+    """
+    Get unresolved sync conflicts for manual review.
+    
+    A conflict is a field changed in both CRMs since the record was last
+    synced. Jobs run with the manual policy hold each one here, oldest first,
+    with the source's value and the target's value as last read.
+    """
+    return {"conflicts": await sync_engine.open_conflicts(limit)}
 
 
 @router.post("/conflicts/{conflict_id}/resolve")
-async def resolve_conflict(conflict_id: str, resolution: str, value: Any):
+async def resolve_conflict(conflict_id: str, body: ConflictResolution):
     """Manually resolve a sync conflict."""
-    return {
-        "conflict_id": conflict_id,
-        "resolution": resolution,
-        "resolved_at": datetime.utcnow().isoformat(),
-    }
+    try:
+        conflict = await sync_engine.resolve_conflict(conflict_id, body.resolution, body.value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    if conflict is None:
+        raise HTTPException(status_code=404, detail="Conflict not found")
+    return conflict
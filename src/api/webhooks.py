@@ -0,0 +1,68 @@
+"""
+Webhook ingestion endpoints.
+"""
+
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel, model_validator
+from typing import List, Dict, Any, Optional, Union
+from datetime import datetime, timezone
+
+from src.services.webhook_events import WebhookEvent, webhook_buffer
+
+router = APIRouter()
+
+
+class WebhookEventIn(BaseModel):
+    event_type: str
+    contact_id: Optional[str] = None
+    email: Optional[str] = None
+    event_id: Optional[str] = None
+    occurred_at: Optional[datetime] = None
+    details: Dict[str, Any] = {}
+    
+    @model_validator(mode="after")
+    def _identifies_contact(self):
+        if not self.contact_id and not self.email:
+            raise ValueError("Either contact_id or email is required")
+        return self
+    
+    def to_event(self) -> WebhookEvent:
+        occurred_at = self.occurred_at or datetime.utcnow()
+        if occurred_at.tzinfo is not None:
+            occurred_at = occurred_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return WebhookEvent(
+            event_type=self.event_type,
+            contact_id=self.contact_id,
+            email=self.email,
+            event_id=self.event_id,
+            occurred_at=occurred_at,
+            details=self.details,
+        )
+
+
+@router.post("/events", status_code=status.HTTP_202_ACCEPTED)
+async def receive_events(payload: Union[WebhookEventIn, List[WebhookEventIn]]):
+    """
+    Receive one event or a list of events (email opened, meeting scheduled, ...).
+    
+    Events are acknowledged once buffered and applied to engagement scores
+    and lifecycle stages in the background. Each event names its contact by
+    contact_id or email; event_id lets redelivered events be dropped. When
+    the buffer is full the whole delivery is rejected with 503 and can be
+    retried.
+    """
+    events = payload if isinstance(payload, list) else [payload]
+    if not webhook_buffer.push([event.to_event() for event in events]):
+        raise HTTPException(status_code=503, detail="Webhook buffer is full", headers={"Retry-After": "1"})
+    return {"accepted": len(events), "buffer_depth": webhook_buffer.queue.qsize()}
+
+
+@router.post("/dead-letters/replay")
+async def replay_dead_letters():
+    """
+    Queue events whose batch failed every attempt for another try.
+    
+    Events that do not fit in the buffer stay dead-lettered.
+    """
+    replayed = webhook_buffer.replay_dead_letters()
+    return {"replayed": replayed, "dead_letters": len(webhook_buffer.dead_letters)}
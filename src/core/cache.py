@@ -0,0 +1,194 @@
+"""
+Two-tier cache: an in-process LRU in front of Redis.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import asyncio
+import json
+import logging
+import time
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+T = TypeVar("T")
+
+
+class LRUCache:
+    """Size-bounded mapping with per-entry expiry; least recently used goes first."""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any, expires_at: float):
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    
+    def delete(self, key: str):
+        self._data.pop(key, None)
+    
+    def clear(self):
+        self._data.clear()
+
+
+@dataclass
+class CacheStats:
+    local_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    redis_errors: int = 0
+
+
+class TwoTierCache:
+    """
+    JSON-serializable values cached locally and in Redis under a namespace.
+    
+    Reads try the LRU first, then Redis, and copy Redis hits into the LRU
+    for the rest of their lifetime. Redis is optional: when it is disabled
+    or unreachable the cache keeps working from the LRU alone, and Redis is
+    retried after settings.cache_redis_retry_seconds.
+    """
+    
+    def __init__(self, namespace: str, maxsize: int, redis: Any = None, use_redis: bool = True):
+        self.namespace = namespace
+        self.local = LRUCache(maxsize)
+        self.redis = redis
+        self.use_redis = use_redis
+        self.counters = CacheStats()
+        self._redis_down_until = 0.0
+    
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+    
+    def _redis_client(self) -> Any:
+        if not self.use_redis or time.monotonic() < self._redis_down_until:
+            return None
+        if self.redis is None:
+            import redis.asyncio
+            
+            self.redis = redis.asyncio.from_url(settings.redis_url)
+        return self.redis
+    
+    def _redis_failed(self, error: Exception):
+        self.counters.redis_errors += 1
+        self._redis_down_until = time.monotonic() + settings.cache_redis_retry_seconds
+        logger.warning("Redis cache unavailable, using local cache only: %s", error)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.counters.local_hits += 1
+            return value
+        
+        client = self._redis_client()
+        if client is not None:
+            try:
+                raw = await client.get(self._key(key))
+            except Exception as e:
+                self._redis_failed(e)
+                raw = None
+            if raw is not None:
+                entry = json.loads(raw)
+                self.local.set(key, entry["value"], entry["expires_at"])
+                self.counters.redis_hits += 1
+                return entry["value"]
+        
+        self.counters.misses += 1
+        return None
+    
+    def peek(self, key: str) -> Optional[Any]:
+        """The locally cached value for key, without going to Redis or counting a lookup."""
+        return self.local.get(key)
+    
+    async def set(self, key: str, value: Any, ttl: float):
+        expires_at = time.time() + ttl
+        self.local.set(key, value, expires_at)
+        self.counters.sets += 1
+        
+        client = self._redis_client()
+        if client is not None:
+            payload = json.dumps({"value": value, "expires_at": expires_at}, default=str)
+            try:
+                await client.set(self._key(key), payload, ex=max(int(ttl), 1))
+            except Exception as e:
+                self._redis_failed(e)
+    
+    async def delete(self, key: str):
+        self.local.delete(key)
+        client = self._redis_client()
+        if client is not None:
+            try:
+                await client.delete(self._key(key))
+            except Exception as e:
+                self._redis_failed(e)
+    
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+    
+    def stats(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = asdict(self.counters)
+        lookups = self.counters.local_hits + self.counters.redis_hits + self.counters.misses
+        data["hit_ratio"] = round((lookups - self.counters.misses) / lookups, 4) if lookups else 0.0
+        data["local_size"] = len(self.local)
+        data["local_evictions"] = self.local.evictions
+        return data
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one in-flight call.
+    
+    The first caller starts the work as a task; callers arriving while it
+    runs await the same task. A cancelled caller does not cancel the shared
+    work for the others. Nothing is remembered once the call completes.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Task[Any]"] = {}
+        self.started = 0
+        self.shared = 0
+    
+    def __len__(self) -> int:
+        return len(self._calls)
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: str, task: "asyncio.Task[Any]"):
+        if self._calls.get(key) is task:
+            del self._calls[key]
@@ -10,6 +10,12 @@ class Settings(BaseSettings):
     app_secret_key: str = "change-me"
     
     database_url: str = "postgresql+asyncpg://localhost/crm_db"
+    database_pool_size: int = 10
+    database_max_overflow: int = 10
+    database_pool_timeout_seconds: float = 30.0
+    database_statement_cache_size: int = 500
+    export_batch_size: int = 1000
+    bulk_ingest_chunk_size: int = 1000
     redis_url: str = "redis://localhost:6379/0"
     
     salesforce_username: str = ""
@@ -20,14 +26,67 @@ class Settings(BaseSettings):
     hubspot_portal_id: str = ""
     
     clearbit_api_key: str = ""
+    apollo_api_key: str = ""
+    enrichment_providers: List[str] = ["clearbit", "apollo"]  # in priority order
+    enrichment_mode: str = "sequential"  # sequential, hedged
+    enrichment_hedge_budget_seconds: float = 1.0  # until a provider has a measured p95
+    enrichment_latency_window: int = 200
+    enrichment_cache_size: int = 10000  # entries in the in-process LRU
+    enrichment_cache_redis_enabled: bool = True
+    enrichment_cache_ttl_seconds: int = 604800
+    enrichment_negative_cache_ttl_seconds: int = 3600
+    cache_redis_retry_seconds: float = 30.0
+    enrichment_queue_size: int = 100000
+    enrichment_workers: int = 4
+    enrichment_batch_size: int = 50
+    enrichment_batch_wait_seconds: float = 0.05  # time to fill a micro-batch
+    
+    http_http2_enabled: bool = True
+    http_max_connections: int = 20  # per vendor
+    http_keepalive_expiry_seconds: float = 30.0
+    http_timeout_seconds: float = 30.0
+    http_max_retries: int = 3  # retries after a 429
+    http_default_rate_limit_per_second: float = 5.0
+    salesforce_rate_limit_per_second: float = 20.0
+    hubspot_rate_limit_per_second: float = 10.0
+    clearbit_rate_limit_per_second: float = 10.0
+    apollo_rate_limit_per_second: float = 5.0
+    
+    forecast_simulations: int = 20000
+    forecast_exact_deals: int = 500  # largest deals simulated individually
+    
+    deal_rot_threshold_days: float = 14.0
+    deal_rot_sweep_interval_seconds: float = 60.0
+    deal_rot_alert_history: int = 1000  # recent rot alerts kept in memory
     
     sync_interval_seconds: int = 300
     sync_batch_size: int = 100
+    sync_queue_depth: int = 4  # pages buffered between pipeline stages
+    sync_upsert_workers: int = 4
+    sync_history_size: int = 100
     conflict_resolution: str = "source_wins"
     
+    dedup_match_threshold: float = 0.8
+    dedup_max_block_size: int = 1000  # larger blocks are too common to compare
+    
+    webhook_buffer_size: int = 100000  # events waiting to be applied
+    webhook_batch_size: int = 1000
+    webhook_batch_wait_seconds: float = 0.05  # time to fill a micro-batch
+    webhook_dedup_window: int = 100000  # recent event IDs remembered
+    webhook_max_attempts: int = 3  # tries per batch before its events are dead-lettered
+    webhook_retry_seconds: float = 1.0  # wait before the first retry, doubled after each
+    webhook_dead_letter_size: int = 100000  # failed events kept for replay
+    
+    account_rollup_debounce_seconds: float = 2.0  # changes gathered before an account is recomputed
+    account_at_risk_score: int = 50  # health scores below this are at risk
+    
     lifecycle_automation_enabled: bool = True
+    engagement_half_life_days: float = 30.0
     engagement_score_threshold_mql: int = 30
     engagement_score_threshold_sql: int = 60
+    lifecycle_action_concurrency: int = 20  # per action type
+    lifecycle_action_timeout_seconds: float = 10.0
+    lifecycle_transition_workers: int = 8
     
     allowed_origins: List[str] = ["*"]
     
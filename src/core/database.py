@@ -0,0 +1,127 @@
+"""
+Async database engine and connection pool.
+"""
+
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Dict, Optional
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.core.config import settings
+from src.core.tables import metadata
+
+
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    checkins: int = 0
+    connections_opened: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    
+    def record_wait(self, seconds: float):
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class Database:
+    """
+    Shared async engine with a size-tunable connection pool.
+    
+    Statements are executed with bound parameters, so SQLAlchemy's compiled
+    cache and asyncpg's per-connection prepared statement cache turn repeat
+    queries into prepared statement executions.
+    """
+    
+    def __init__(self, url: Optional[str] = None):
+        self.url = url or settings.database_url
+        self.engine: Optional[AsyncEngine] = None
+        self.pool_metrics = PoolMetrics()
+    
+    def _engine_options(self) -> Dict[str, Any]:
+        if self.url.startswith("sqlite"):
+            if ":memory:" in self.url or self.url.endswith("://"):
+                # An in-memory database only exists inside one connection.
+                return {"poolclass": StaticPool}
+            return {}
+        
+        options: Dict[str, Any] = {
+            "pool_size": settings.database_pool_size,
+            "max_overflow": settings.database_max_overflow,
+            "pool_timeout": settings.database_pool_timeout_seconds,
+            "pool_pre_ping": True,
+        }
+        if "+asyncpg" in self.url:
+            options["connect_args"] = {
+                "prepared_statement_cache_size": settings.database_statement_cache_size,
+            }
+        return options
+    
+    async def connect(self, create_tables: bool = True):
+        """Create the engine and, optionally, any missing tables."""
+        if self.engine is not None:
+            return
+        
+        self.engine = create_async_engine(self.url, **self._engine_options())
+        sync_engine = self.engine.sync_engine
+        event.listen(sync_engine, "connect", self._on_connect)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "checkin", self._on_checkin)
+        
+        if create_tables:
+            async with self.engine.begin() as conn:
+                await conn.run_sync(metadata.create_all)
+    
+    async def disconnect(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+    
+    def _require_engine(self) -> AsyncEngine:
+        if self.engine is None:
+            raise RuntimeError("Database is not connected")
+        return self.engine
+    
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[AsyncConnection]:
+        """Check out a pooled connection without starting a transaction."""
+        engine = self._require_engine()
+        started = time.perf_counter()
+        async with engine.connect() as conn:
+            self.pool_metrics.record_wait(time.perf_counter() - started)
+            yield conn
+    
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[AsyncConnection]:
+        """Check out a pooled connection inside a transaction."""
+        engine = self._require_engine()
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            self.pool_metrics.record_wait(time.perf_counter() - started)
+            yield conn
+    
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.pool_metrics.connections_opened += 1
+    
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.pool_metrics.checkouts += 1
+    
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.pool_metrics.checkins += 1
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Pool counters and current pool occupancy."""
+        data: Dict[str, Any] = asdict(self.pool_metrics)
+        if self.engine is not None:
+            pool = self.engine.pool
+            for name in ("size", "checkedout", "overflow"):
+                if hasattr(pool, name):
+                    data[f"pool_{name}"] = getattr(pool, name)()
+        return data
+
+
+database = Database()
@@ -0,0 +1,56 @@
+"""
+Streaming row encoders for bulk exports.
+"""
+
+from datetime import date, datetime
+from typing import Any, AsyncIterator, List, Sequence
+import csv
+import io
+import json
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def encode_ndjson(
+    columns: Sequence[str],
+    partitions: AsyncIterator[List[Sequence[Any]]],
+) -> AsyncIterator[str]:
+    """Encode row partitions as NDJSON, one chunk per partition."""
+    dumps = json.JSONEncoder(default=_json_default, separators=(",", ":")).encode
+    async for rows in partitions:
+        yield "".join(dumps(dict(zip(columns, row))) + "\n" for row in rows)
+
+
+async def encode_csv(
+    columns: Sequence[str],
+    partitions: AsyncIterator[List[Sequence[Any]]],
+) -> AsyncIterator[str]:
+    """Encode row partitions as CSV with a header row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [json.dumps(v) if isinstance(v, (dict, list)) else v for v in row]
+            for row in rows
+        )
+        yield buffer.getvalue()
+
+
+ENCODERS = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
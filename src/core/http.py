@@ -0,0 +1,204 @@
+"""
+Shared HTTP client pool and adaptive rate limiting for vendor APIs.
+"""
+
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import time
+
+import httpx
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts to the vendor's throttling.
+    
+    Every 429 halves the rate and blocks the bucket for the Retry-After
+    period; every successful call adds back a twentieth of the configured
+    rate, so throughput climbs back to the limit once the vendor recovers.
+    """
+    
+    def __init__(self, rate: float, burst: Optional[int] = None, min_rate: float = 0.1):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.capacity = float(burst or max(int(rate), 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self) -> float:
+        """Take one token, waiting as needed; returns the seconds waited."""
+        started = time.monotonic()
+        # Waiters queue on the lock, so tokens are handed out in order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                delay = self.blocked_until - now
+                if delay <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return now - started
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+    
+    def on_success(self):
+        self._refill(time.monotonic())
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+    
+    def on_throttled(self, retry_after: Optional[float] = None):
+        now = time.monotonic()
+        self._refill(now)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        pause = retry_after if retry_after is not None else 1 / self.rate
+        self.blocked_until = max(self.blocked_until, now + pause)
+
+
+@dataclass
+class HTTPMetrics:
+    requests: int = 0
+    in_flight: int = 0
+    in_flight_max: int = 0
+    throttled: int = 0
+    retries: int = 0
+    throttle_wait_seconds_total: float = 0.0
+    throttle_wait_seconds_max: float = 0.0
+    
+    def record_wait(self, seconds: float):
+        self.throttle_wait_seconds_total += seconds
+        self.throttle_wait_seconds_max = max(self.throttle_wait_seconds_max, seconds)
+
+
+def vendor_rate_limits() -> Dict[str, float]:
+    """Configured requests per second for each vendor."""
+    return {
+        "salesforce": settings.salesforce_rate_limit_per_second,
+        "hubspot": settings.hubspot_rate_limit_per_second,
+        "clearbit": settings.clearbit_rate_limit_per_second,
+        "apollo": settings.apollo_rate_limit_per_second,
+    }
+
+
+class HTTPClientPool:
+    """
+    One keep-alive httpx client and rate limiter per vendor.
+    
+    Clients are created on first use and shared by every caller in the
+    process, so connections (HTTP/2 where the vendor supports it) and TLS
+    sessions are reused, and all callers draw from the same quota.
+    """
+    
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.transport = transport
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self.vendor_metrics: Dict[str, HTTPMetrics] = {}
+    
+    def client(self, vendor: str) -> httpx.AsyncClient:
+        if vendor not in self.clients:
+            self.clients[vendor] = httpx.AsyncClient(
+                http2=settings.http_http2_enabled,
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_connections,
+                    keepalive_expiry=settings.http_keepalive_expiry_seconds,
+                ),
+                timeout=settings.http_timeout_seconds,
+                transport=self.transport,
+            )
+        return self.clients[vendor]
+    
+    def limiter(self, vendor: str) -> AdaptiveRateLimiter:
+        if vendor not in self.limiters:
+            rate = vendor_rate_limits().get(vendor, settings.http_default_rate_limit_per_second)
+            self.limiters[vendor] = AdaptiveRateLimiter(rate)
+        return self.limiters[vendor]
+    
+    def _metrics(self, vendor: str) -> HTTPMetrics:
+        return self.vendor_metrics.setdefault(vendor, HTTPMetrics())
+    
+    async def request(self, vendor: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request through the vendor's client and rate limiter.
+        
+        429 responses slow the limiter down and are retried up to
+        http_max_retries times; the last response is returned either way.
+        5xx responses leave the limiter's rate unchanged.
+        """
+        client = self.client(vendor)
+        limiter = self.limiter(vendor)
+        metrics = self._metrics(vendor)
+        
+        attempt = 0
+        while True:
+            metrics.record_wait(await limiter.acquire())
+            metrics.requests += 1
+            metrics.in_flight += 1
+            metrics.in_flight_max = max(metrics.in_flight_max, metrics.in_flight)
+            try:
+                response = await client.request(method, url, **kwargs)
+            finally:
+                metrics.in_flight -= 1
+            
+            if response.status_code != 429:
+                # A failing upstream is no reason to speed up.
+                if response.status_code < 500:
+                    limiter.on_success()
+                return response
+            
+            metrics.throttled += 1
+            limiter.on_throttled(parse_retry_after(response.headers.get("Retry-After")))
+            if attempt >= settings.http_max_retries:
+                return response
+            attempt += 1
+            metrics.retries += 1
+            logger.info("%s throttled %s %s, retry %d", vendor, method, url, attempt)
+    
+    async def close(self):
+        clients, self.clients = self.clients, {}
+        for client in clients.values():
+            await client.aclose()
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Per-vendor request counters and current limiter rate."""
+        data: Dict[str, Any] = {}
+        for vendor, metrics in self.vendor_metrics.items():
+            data[vendor] = asdict(metrics)
+            if vendor in self.limiters:
+                data[vendor]["rate_limit_per_second"] = round(self.limiters[vendor].rate, 3)
+        return data
+
+
+http_pool = HTTPClientPool()
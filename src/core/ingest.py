@@ -0,0 +1,111 @@
+"""
+Streaming record decoders for bulk imports.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import codecs
+import csv
+import json
+
+INGEST_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "ndjson",
+    "text/csv": "csv",
+}
+
+# (record number, decoded record or None, decode error or None)
+DecodedRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def decode_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[DecodedRecord]:
+    """Decode one JSON object per line; blank lines are skipped."""
+    index = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            yield index, record, None
+        except ValueError as e:
+            yield index, None, f"invalid JSON: {e}"
+        index += 1
+
+
+async def _csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Join physical lines into CSV rows.
+    
+    A quoted cell may span lines, so lines are buffered until the row's
+    quotes balance; escaped quotes ("") count twice and keep the balance.
+    """
+    pending: List[str] = []
+    quotes = 0
+    async for line in lines:
+        if not pending and not line.strip():
+            continue
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield "\n".join(pending)
+            pending, quotes = [], 0
+    if pending:
+        yield "\n".join(pending)
+
+
+async def decode_csv(lines: AsyncIterator[str]) -> AsyncIterator[DecodedRecord]:
+    """
+    Decode CSV with a header row, one record per row.
+    
+    Quoted cells may contain newlines. Empty cells are treated as missing
+    values.
+    """
+    header: Optional[List[str]] = None
+    index = 0
+    async for row in _csv_rows(lines):
+        cells = next(csv.reader([row]))
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+        if len(cells) != len(header):
+            yield index, None, f"expected {len(header)} columns, got {len(cells)}"
+        else:
+            yield index, {k: v for k, v in zip(header, cells) if v != ""}, None
+        index += 1
+
+
+DECODERS = {
+    "ndjson": decode_ndjson,
+    "csv": decode_csv,
+}
+
+
+async def chunked(
+    records: AsyncIterator[DecodedRecord],
+    size: int,
+) -> AsyncIterator[List[DecodedRecord]]:
+    """Group decoded records into lists of at most size items."""
+    chunk: List[DecodedRecord] = []
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,34 @@
+"""
+Keyset pagination helpers.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+
+# Response header carrying the continuation token for list endpoints.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class Page:
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(updated_at: datetime, record_id: str) -> str:
+    """Encode a (updated_at, id) position as an opaque continuation token."""
+    raw = json.dumps([updated_at.isoformat(), record_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    """Decode a continuation token; raises ValueError if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        updated_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(updated_at), str(record_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
@@ -0,0 +1,158 @@
+"""
+Database table definitions.
+"""
+
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    String,
+    Integer,
+    Float,
+    DateTime,
+    JSON,
+    Index,
+)
+
+metadata = MetaData()
+
+
+contacts = Table(
+    "contacts",
+    metadata,
+    Column("id", String(32), primary_key=True),
+    Column("email", String(320), nullable=False, unique=True),
+    Column("first_name", String(255), nullable=False),
+    Column("last_name", String(255), nullable=False),
+    Column("company", String(255)),
+    Column("title", String(255)),
+    Column("phone", String(64)),
+    Column("account_id", String(32), index=True),
+    Column("custom_fields", JSON, nullable=False, default=dict),
+    Column("lifecycle_stage", String(32), nullable=False, default="lead"),
+    Column("engagement_score", Integer, nullable=False, default=0),
+    # Decayed engagement as of engagement_at; see src/services/engagement.py
+    Column("engagement_raw", Float, nullable=False, default=0),
+    Column("engagement_at", DateTime),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Index("ix_contacts_stage_score", "lifecycle_stage", "engagement_score"),
+    Index("ix_contacts_score", "engagement_score"),
+    # Keyset pagination order, optionally behind the stage filter
+    Index("ix_contacts_updated", "updated_at", "id"),
+    Index("ix_contacts_stage_updated", "lifecycle_stage", "updated_at", "id"),
+)
+
+
+# Append-only; every read is scoped to one contact, in time order.
+contact_activities = Table(
+    "contact_activities",
+    metadata,
+    Column("id", String(32), primary_key=True),
+    Column("contact_id", String(32), nullable=False),
+    Column("activity_type", String(64), nullable=False),
+    Column("points", Float, nullable=False),
+    Column("details", JSON, nullable=False, default=dict),
+    Column("occurred_at", DateTime, nullable=False),
+    Index("ix_contact_activities_contact_time", "contact_id", "occurred_at", "id"),
+)
+
+
+deals = Table(
+    "deals",
+    metadata,
+    Column("id", String(32), primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("contact_id", String(32), nullable=False, index=True),
+    Column("account_id", String(32), index=True),
+    Column("owner_id", String(64)),
+    Column("value", Float, nullable=False),
+    Column("currency", String(3), nullable=False, default="USD"),
+    Column("stage", String(32), nullable=False, default="qualification"),
+    Column("probability", Integer, nullable=False),
+    Column("close_date", String(32)),
+    Column("custom_fields", JSON, nullable=False, default=dict),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Index("ix_deals_updated", "updated_at", "id"),
+    Index("ix_deals_stage_updated", "stage", "updated_at", "id"),
+)
+
+
+accounts = Table(
+    "accounts",
+    metadata,
+    Column("id", String(32), primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("domain", String(255), index=True),
+    Column("industry", String(128)),
+    Column("size", String(32)),
+    Column("annual_revenue", Float),
+    Column("custom_fields", JSON, nullable=False, default=dict),
+    Column("health_score", Integer, nullable=False, default=75),
+    Column("total_deal_value", Float, nullable=False, default=0),
+    Column("contact_count", Integer, nullable=False, default=0),
+    # Health inputs rolled up from contact activity; see src/services/account_rollups.py
+    Column("engagement_raw", Float, nullable=False, default=0),
+    Column("engagement_at", DateTime),
+    Column("nps_promoters", Integer, nullable=False, default=0),
+    Column("nps_detractors", Integer, nullable=False, default=0),
+    Column("nps_responses", Integer, nullable=False, default=0),
+    Column("open_tickets", Integer, nullable=False, default=0),
+    Column("last_usage_at", DateTime),
+    Column("health_factors", JSON, nullable=False, default=dict),
+    Column("health_at", DateTime),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Index("ix_accounts_updated", "updated_at", "id"),
+    Index("ix_accounts_industry_size_updated", "industry", "size", "updated_at", "id"),
+)
+
+
+sync_watermarks = Table(
+    "sync_watermarks",
+    metadata,
+    Column("source", String(32), primary_key=True),
+    Column("target", String(32), primary_key=True),
+    Column("object_type", String(32), primary_key=True),
+    Column("high_water_mark", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+sync_record_state = Table(
+    "sync_record_state",
+    metadata,
+    Column("system", String(32), primary_key=True),
+    Column("peer_system", String(32), primary_key=True),
+    Column("object_type", String(32), primary_key=True),
+    Column("record_id", String(64), primary_key=True),
+    Column("peer_id", String(64)),
+    Column("synced", JSON, nullable=False, default=dict),
+    Column("observed", JSON, nullable=False, default=dict),
+    Column("changed", JSON, nullable=False, default=dict),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+sync_conflicts = Table(
+    "sync_conflicts",
+    metadata,
+    Column("id", String(32), primary_key=True),
+    Column("sync_id", String(32), nullable=False),
+    Column("source", String(32), nullable=False),
+    Column("target", String(32), nullable=False),
+    Column("object_type", String(32), nullable=False),
+    Column("source_id", String(64), nullable=False),
+    Column("target_id", String(64), nullable=False),
+    Column("field", String(255), nullable=False),
+    Column("target_field", String(255), nullable=False),
+    Column("source_value", JSON),
+    Column("target_value", JSON),
+    Column("status", String(16), nullable=False),
+    Column("resolution", String(32)),
+    Column("resolved_value", JSON),
+    Column("created_at", DateTime, nullable=False),
+    Column("resolved_at", DateTime),
+    Index("ix_sync_conflicts_status_created", "status", "created_at"),
+)
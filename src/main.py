@@ -1,15 +1,50 @@
 """Main application entry point."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.api import contacts, deals, accounts, sync, lifecycle
+from src.api import contacts, deals, accounts, sync, lifecycle, webhooks
 from src.core.config import settings
+from src.core.database import database
+from src.core.http import http_pool
+from src.core.pagination import NEXT_CURSOR_HEADER
+from src.services.account_rollups import account_rollups
+from src.services.dedup import dedup_service
+from src.services.enrichment import enrichment_service
+from src.services.enrichment_queue import enrichment_queue
+from src.services.pipeline import pipeline_aggregates
+from src.services.stale_deals import stale_deal_index
+from src.services.webhook_events import webhook_buffer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await database.connect()
+    await pipeline_aggregates.rebuild()
+    await stale_deal_index.rebuild()
+    await account_rollups.rebuild()
+    dedup_service.start_rebuild()
+    stale_deal_index.start_sweeper()
+    enrichment_queue.start()
+    webhook_buffer.start()
+    yield
+    await webhook_buffer.stop()
+    await stale_deal_index.stop_sweeper()
+    await enrichment_queue.stop()
+    await account_rollups.stop()
+    await dedup_service.stop()
+    await http_pool.close()
+    await enrichment_service.cache.close()
+    await database.disconnect()
+
 
 app = FastAPI(
     title="CRM Automation System",
     description="End-to-end CRM automation with pipeline management and integrations",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -18,6 +53,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(contacts.router, prefix="/api/contacts", tags=["contacts"])
@@ -25,8 +61,21 @@ app.include_router(deals.router, prefix="/api/deals", tags=["deals"])
 app.include_router(accounts.router, prefix="/api/accounts", tags=["accounts"])
 app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
 app.include_router(lifecycle.router, prefix="/api/lifecycle", tags=["lifecycle"])
+app.include_router(webhooks.router, prefix="/api/webhooks", tags=["webhooks"])
 
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
+
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "database": database.metrics(),
+        "http": http_pool.metrics(),
+        "enrichment": enrichment_service.metrics(),
+        "enrichment_queue": enrichment_queue.metrics(),
+        "webhooks": webhook_buffer.metrics(),
+        "account_rollups": account_rollups.metrics(),
+    }
@@ -0,0 +1,310 @@
+"""
+Incremental account rollups and health scoring.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+import asyncio
+import logging
+
+from src.core.config import settings
+from src.services.engagement import accumulate, score_at
+from src.services.repositories import AccountRepository, account_repository
+
+logger = logging.getLogger(__name__)
+
+# Weight of each factor in the health score; factors without data for an
+# account are left out and the rest reweighted.
+HEALTH_WEIGHTS: Dict[str, float] = {
+    "engagement": 0.35,
+    "nps": 0.25,
+    "support_tickets": 0.20,
+    "product_usage": 0.20,
+}
+
+# Health score of an account with no data for any factor.
+DEFAULT_HEALTH_SCORE = 75
+
+# Decayed engagement points per contact that count as fully engaged.
+ENGAGEMENT_POINTS_PER_CONTACT = 20.0
+
+# Open tickets per contact at which the support factor reaches zero.
+MAX_TICKETS_PER_CONTACT = 0.2
+
+# Product usage counts fully within the first window and not at all after
+# the second, in days since last use.
+USAGE_FRESH_DAYS = 7
+USAGE_STALE_DAYS = 60
+
+# Factor score change that counts as a trend rather than noise.
+TREND_THRESHOLD = 2
+
+# Activity types feeding the activity-based factors.
+NPS_ACTIVITY = "nps_response"
+TICKET_OPENED_ACTIVITY = "support_ticket_opened"
+TICKET_CLOSED_ACTIVITY = "support_ticket_closed"
+USAGE_ACTIVITIES = frozenset({"product_login", "feature_used"})
+
+# Only deals in this stage drop out of total_deal_value.
+LOST_STAGE = "closed_lost"
+
+
+def _deal_value(deal: Dict[str, Any]) -> float:
+    if not deal.get("account_id") or deal["stage"] == LOST_STAGE:
+        return 0.0
+    return float(deal["value"])
+
+
+@dataclass
+class AccountChange:
+    """Changes to one account gathered since its last recompute."""
+    contacts: int = 0
+    deal_value: float = 0.0
+    engagement_raw: float = 0.0
+    engagement_at: Optional[datetime] = None
+    nps_promoters: int = 0
+    nps_detractors: int = 0
+    nps_responses: int = 0
+    open_tickets: int = 0
+    last_usage_at: Optional[datetime] = None
+    
+    def add_activity(self, activity: Dict[str, Any]):
+        occurred_at = activity["occurred_at"]
+        self.engagement_raw, self.engagement_at = accumulate(
+            self.engagement_raw, self.engagement_at, activity["points"], occurred_at
+        )
+        activity_type = activity["activity_type"]
+        if activity_type == NPS_ACTIVITY:
+            score = (activity.get("details") or {}).get("score")
+            if isinstance(score, (int, float)) and 0 <= score <= 10:
+                self.nps_responses += 1
+                self.nps_promoters += int(score >= 9)
+                self.nps_detractors += int(score <= 6)
+        elif activity_type == TICKET_OPENED_ACTIVITY:
+            self.open_tickets += 1
+        elif activity_type == TICKET_CLOSED_ACTIVITY:
+            self.open_tickets -= 1
+        elif activity_type in USAGE_ACTIVITIES:
+            if self.last_usage_at is None or occurred_at > self.last_usage_at:
+                self.last_usage_at = occurred_at
+
+
+def health_factors(account: Dict[str, Any], now: datetime) -> Dict[str, float]:
+    """Score (0-100) of every factor the account has data for."""
+    factors = {}
+    contacts = account["contact_count"]
+    if contacts > 0:
+        per_contact = score_at(account["engagement_raw"] or 0.0, account["engagement_at"], now) / contacts
+        factors["engagement"] = min(100.0, 100.0 * per_contact / ENGAGEMENT_POINTS_PER_CONTACT)
+    if account["nps_responses"] > 0:
+        nps = 100.0 * (account["nps_promoters"] - account["nps_detractors"]) / account["nps_responses"]
+        factors["nps"] = (nps + 100.0) / 2
+    if contacts > 0 or account["open_tickets"] > 0:
+        per_contact = account["open_tickets"] / max(contacts, 1)
+        factors["support_tickets"] = 100.0 * (1 - min(1.0, per_contact / MAX_TICKETS_PER_CONTACT))
+    if account["last_usage_at"] is not None:
+        idle_days = (now - account["last_usage_at"]).total_seconds() / 86400
+        stale = (idle_days - USAGE_FRESH_DAYS) / (USAGE_STALE_DAYS - USAGE_FRESH_DAYS)
+        factors["product_usage"] = 100.0 * (1 - min(1.0, max(0.0, stale)))
+    return factors
+
+
+def account_health(
+    account: Dict[str, Any], now: datetime
+) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+    """
+    Weighted health score and per-factor {score, trend}, the trend taken
+    against the factors stored on the account.
+    """
+    scores = health_factors(account, now)
+    if not scores:
+        return DEFAULT_HEALTH_SCORE, {}
+    previous = account.get("health_factors") or {}
+    factors = {}
+    for factor, score in scores.items():
+        score = round(score)
+        before = previous.get(factor, {}).get("score", score)
+        if score - before >= TREND_THRESHOLD:
+            trend = "up"
+        elif before - score >= TREND_THRESHOLD:
+            trend = "down"
+        else:
+            trend = "stable"
+        factors[factor] = {"score": score, "trend": trend}
+    weight = sum(HEALTH_WEIGHTS[factor] for factor in scores)
+    total = sum(HEALTH_WEIGHTS[factor] * score for factor, score in scores.items())
+    return round(total / weight), factors
+
+
+def current_health(account: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    The account with its health recomputed as of now from the stored
+    rollup columns, so engagement decay and usage staleness show on an
+    account that has gone quiet. Factors unchanged since the last rollup
+    keep their stored trend.
+    """
+    now = now or datetime.utcnow()
+    score, factors = account_health(account, now)
+    stored = account.get("health_factors") or {}
+    for factor, values in factors.items():
+        if stored.get(factor, {}).get("score") == values["score"]:
+            factors[factor] = stored[factor]
+    return {**account, "health_score": score, "health_factors": factors, "health_at": now}
+
+
+class AccountRollups:
+    """
+    Keeps account contact_count, total_deal_value and health score up to
+    date from contact, deal and activity writes.
+    
+    Writes record their difference in memory, so a bulk import or webhook
+    batch costs one entry per account, never a scan of the account's
+    contacts or deals. Changes are held for ACCOUNT_ROLLUP_DEBOUNCE_SECONDS
+    and then folded into the account rows, and their health recomputed, in
+    one transaction; a failed flush keeps the changes and is retried after
+    the same delay. Reads go through current_health() so the time-based
+    factors stay current between changes. rebuild() recounts contacts and
+    deals from the database on startup.
+    """
+    
+    def __init__(self, repository: Optional[AccountRepository] = None):
+        self.repository = repository or account_repository
+        self.pending: Dict[str, AccountChange] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.accounts_updated = 0
+    
+    def _change(self, account_id: str) -> AccountChange:
+        change = self.pending.get(account_id)
+        if change is None:
+            change = self.pending[account_id] = AccountChange()
+        self._schedule()
+        return change
+    
+    def _schedule(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+    
+    def record_contact_created(self, contact: Dict[str, Any]):
+        if contact.get("account_id"):
+            self._change(contact["account_id"]).contacts += 1
+    
+    def record_contact_updated(self, before: Dict[str, Any], after: Dict[str, Any]):
+        if before.get("account_id") == after.get("account_id"):
+            return
+        if before.get("account_id"):
+            self._change(before["account_id"]).contacts -= 1
+        self.record_contact_created(after)
+    
+    def record_deal_created(self, deal: Dict[str, Any]):
+        if _deal_value(deal):
+            self._change(deal["account_id"]).deal_value += _deal_value(deal)
+    
+    def record_deal_updated(self, before: Dict[str, Any], after: Dict[str, Any]):
+        if _deal_value(before):
+            self._change(before["account_id"]).deal_value -= _deal_value(before)
+        self.record_deal_created(after)
+    
+    def record_activities(
+        self,
+        contacts: Dict[str, Dict[str, Any]],
+        activities: Dict[str, List[Dict[str, Any]]],
+    ):
+        """Fold activities of the given contacts into their accounts."""
+        for contact_id, contact in contacts.items():
+            if contact.get("account_id"):
+                change = self._change(contact["account_id"])
+                for activity in activities.get(contact_id, ()):
+                    change.add_activity(activity)
+    
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(settings.account_rollup_debounce_seconds)
+            self._flush_task = None
+            await self.flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Account rollup flush failed")
+            if self.pending:
+                self._schedule()
+    
+    @staticmethod
+    def _fold(account: Dict[str, Any], change: AccountChange) -> Dict[str, Any]:
+        engagement_raw, engagement_at = account["engagement_raw"] or 0.0, account["engagement_at"]
+        if change.engagement_at is not None:
+            engagement_raw, engagement_at = accumulate(
+                engagement_raw, engagement_at, change.engagement_raw, change.engagement_at
+            )
+        last_usage_at = account["last_usage_at"]
+        if change.last_usage_at and (last_usage_at is None or change.last_usage_at > last_usage_at):
+            last_usage_at = change.last_usage_at
+        values = {
+            "contact_count": max(0, account["contact_count"] + change.contacts),
+            "total_deal_value": round(max(0.0, account["total_deal_value"] + change.deal_value), 2),
+            "engagement_raw": engagement_raw,
+            "engagement_at": engagement_at,
+            "nps_promoters": account["nps_promoters"] + change.nps_promoters,
+            "nps_detractors": account["nps_detractors"] + change.nps_detractors,
+            "nps_responses": account["nps_responses"] + change.nps_responses,
+            "open_tickets": max(0, account["open_tickets"] + change.open_tickets),
+            "last_usage_at": last_usage_at,
+        }
+        now = datetime.utcnow()
+        health_score, factors = account_health({**account, **values}, now)
+        return {**values, "health_score": health_score, "health_factors": factors, "health_at": now}
+    
+    async def flush(self) -> Dict[str, Dict[str, Any]]:
+        """Apply every pending change now; returns the updated accounts by ID."""
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return {}
+        try:
+            updated = await self.repository.apply_rollups(pending, self._fold)
+        except BaseException:
+            for account_id, change in pending.items():
+                self.pending.setdefault(account_id, AccountChange())
+                self._merge(self.pending[account_id], change)
+            raise
+        self.flushes += 1
+        self.accounts_updated += len(updated)
+        return updated
+    
+    @staticmethod
+    def _merge(into: AccountChange, change: AccountChange):
+        into.contacts += change.contacts
+        into.deal_value += change.deal_value
+        if change.engagement_at is not None:
+            into.engagement_raw, into.engagement_at = accumulate(
+                into.engagement_raw, into.engagement_at, change.engagement_raw, change.engagement_at
+            )
+        into.nps_promoters += change.nps_promoters
+        into.nps_detractors += change.nps_detractors
+        into.nps_responses += change.nps_responses
+        into.open_tickets += change.open_tickets
+        if change.last_usage_at and (into.last_usage_at is None or change.last_usage_at > into.last_usage_at):
+            into.last_usage_at = change.last_usage_at
+    
+    async def rebuild(self):
+        """Apply pending changes, then recount every account's contacts and deals."""
+        await self.flush()
+        await self.repository.recount(LOST_STAGE)
+    
+    async def stop(self):
+        """Cancel the scheduled flush and apply what is pending."""
+        task, self._flush_task = self._flush_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush()
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "pending_accounts": len(self.pending),
+            "flushes": self.flushes,
+            "accounts_updated": self.accounts_updated,
+        }
+
+
+account_rollups = AccountRollups()
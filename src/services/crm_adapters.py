@@ -2,13 +2,160 @@
 CRM adapter base and implementations.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import httpx
+
+from src.core.config import settings
+from src.core.http import HTTPClientPool, http_pool
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse a CRM timestamp into a naive UTC datetime."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)):
+        # Epoch milliseconds, as used by HubSpot
+        parsed = datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    else:
+        text = str(value).replace("Z", "+00:00")
+        # Salesforce uses +0000 offsets without a colon
+        if len(text) > 5 and text[-5] in "+-" and text[-3] != ":":
+            text = f"{text[:-2]}:{text[-2:]}"
+        parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}: {error.response.text[:200]}"
+    return str(error) or type(error).__name__
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of a batch write.
+    
+    ids is aligned with the input records and holds None where a record
+    failed; errors maps those input positions to the CRM's error message.
+    """
+    ids: List[Optional[str]] = field(default_factory=list)
+    errors: Dict[int, str] = field(default_factory=dict)
+    requests: int = 0
+    
+    @classmethod
+    def for_size(cls, size: int) -> "BatchResult":
+        return cls(ids=[None] * size)
+    
+    @property
+    def succeeded(self) -> int:
+        return len(self.ids) - len(self.errors)
+    
+    def ok(self, index: int, record_id: Optional[str]):
+        self.ids[index] = record_id
+        self.errors.pop(index, None)
+    
+    def fail(self, index: int, message: str):
+        self.ids[index] = None
+        self.errors[index] = message
 
 
 class BaseCRMAdapter(ABC):
     """Abstract base class for CRM adapters."""
     
+    # Whether get_*_modified_since queries the CRM server-side, paging by
+    # the (modified_field, id_field) key of the last record read.
+    supports_delta: bool = False
+    # Record field holding the last-modified timestamp.
+    modified_field: str = "updated_at"
+    # Record field holding the CRM's own ID; records carrying it are updates.
+    id_field: str = "id"
+    # Key of this CRM's client and rate limiter in the HTTP pool.
+    vendor: str = ""
+    
+    http: HTTPClientPool = http_pool
+    
+    def _auth_headers(self) -> Dict[str, str]:
+        return {}
+    
+    async def _send(
+        self, result: BatchResult, method: str, url: str, **kwargs
+    ) -> httpx.Response:
+        """Send one API request for a batch write, counting it on the result."""
+        result.requests += 1
+        response = await self.http.request(
+            self.vendor, method, url, headers=self._auth_headers(), **kwargs
+        )
+        response.raise_for_status()
+        return response
+    
+    async def upsert_contacts(self, records: List[Dict[str, Any]]) -> BatchResult:
+        """
+        Create or update contacts in as few API calls as the CRM allows.
+        
+        Records carrying id_field update that contact, the rest are created.
+        This fallback writes one record per call; adapters with batch
+        endpoints override it. Failures are reported per record, never raised.
+        """
+        result = BatchResult.for_size(len(records))
+        for index, record in enumerate(records):
+            try:
+                contact_id = record.get(self.id_field)
+                if contact_id:
+                    data = {k: v for k, v in record.items() if k != self.id_field}
+                    if not await self.update_contact(contact_id, data):
+                        result.fail(index, f"Update of contact {contact_id} was rejected")
+                        continue
+                else:
+                    contact_id = await self.create_contact(record)
+                result.ok(index, contact_id)
+            except Exception as e:
+                result.fail(index, _error_message(e))
+        return result
+    
+    async def upsert_deals(self, records: List[Dict[str, Any]]) -> BatchResult:
+        """
+        Create deals in as few API calls as the CRM allows.
+        
+        There is no per-record deal update, so this fallback creates every
+        record; adapters with batch endpoints override it.
+        """
+        result = BatchResult.for_size(len(records))
+        for index, record in enumerate(records):
+            try:
+                result.ok(index, await self.create_deal(record))
+            except Exception as e:
+                result.fail(index, _error_message(e))
+        return result
+    
+    def record_modified_at(self, record: Dict[str, Any]) -> Optional[datetime]:
+        """Return when a fetched record was last modified, if known."""
+        return parse_timestamp(record.get(self.modified_field))
+    
+    async def get_contacts_modified_since(
+        self, since: datetime, limit: int = 100, after_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch contacts modified at or after since, ordered by (modified, ID).
+        With after_id, only those after the record (since, after_id) in that
+        order, so pages follow on from their last record.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support delta queries")
+    
+    async def get_deals_modified_since(
+        self, since: datetime, limit: int = 100, after_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch deals as get_contacts_modified_since fetches contacts."""
+        raise NotImplementedError(f"{type(self).__name__} does not support delta queries")
+    
     @abstractmethod
     async def get_contacts(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """Fetch contacts from CRM."""
@@ -38,12 +185,33 @@ class BaseCRMAdapter(ABC):
 class SalesforceAdapter(BaseCRMAdapter):
     """Salesforce CRM adapter."""
     
-    def __init__(self, username: str, password: str, security_token: str, domain: str = "login"):
+    supports_delta = True
+    modified_field = "SystemModstamp"
+    id_field = "Id"
+    vendor = "salesforce"
+    
+    API_VERSION = "v59.0"
+    # sObject Collections accept at most 200 records per request.
+    BATCH_LIMIT = 200
+    
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        security_token: str,
+        domain: str = "login",
+        instance_url: str = "",
+        access_token: str = "",
+        http: Optional[HTTPClientPool] = None,
+    ):
         self.username = username
         self.password = password
         self.security_token = security_token
         self.domain = domain
-        self.client = None
+        # Set from the login response by connect().
+        self.instance_url = instance_url
+        self.access_token = access_token
+        self.http = http or http_pool
     
     async def connect(self):
         """Establish connection to Salesforce."""
@@ -66,23 +234,98 @@ class SalesforceAdapter(BaseCRMAdapter):
         # Implementation placeholder
         return True
     
+    async def get_contacts_modified_since(
+        self, since: datetime, limit: int = 100, after_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch contacts changed since a point in time from Salesforce."""
+        # SELECT ... FROM Contact WHERE SystemModstamp > :since
+        # OR (SystemModstamp = :since AND Id > :after_id)  -- >= :since without after_id
+        # ORDER BY SystemModstamp, Id LIMIT :limit
+        # Implementation placeholder
+        return []
+    
     async def get_deals(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """Fetch opportunities from Salesforce."""
         # Implementation placeholder
         return []
     
+    async def get_deals_modified_since(
+        self, since: datetime, limit: int = 100, after_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch opportunities changed since a point in time from Salesforce."""
+        # SELECT ... FROM Opportunity WHERE SystemModstamp > :since
+        # OR (SystemModstamp = :since AND Id > :after_id)  -- >= :since without after_id
+        # ORDER BY SystemModstamp, Id LIMIT :limit
+        # Implementation placeholder
+        return []
+    
     async def create_deal(self, data: Dict[str, Any]) -> str:
         """Create an opportunity in Salesforce."""
         # Implementation placeholder
         return "sf_opp_123"
+    
+    def _auth_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.access_token}"}
+    
+    async def upsert_contacts(self, records: List[Dict[str, Any]]) -> BatchResult:
+        """Create or update contacts through the sObject Collections API."""
+        return await self._upsert_collection("Contact", records)
+    
+    async def upsert_deals(self, records: List[Dict[str, Any]]) -> BatchResult:
+        """Create or update opportunities through the sObject Collections API."""
+        return await self._upsert_collection("Opportunity", records)
+    
+    async def _upsert_collection(
+        self, sobject: str, records: List[Dict[str, Any]]
+    ) -> BatchResult:
+        """
+        Write records in chunks of BATCH_LIMIT without allOrNone, so one bad
+        record does not roll back the rest of its chunk. Records with an Id
+        are PATCHed, the others POSTed.
+        """
+        result = BatchResult.for_size(len(records))
+        url = f"{self.instance_url}/services/data/{self.API_VERSION}/composite/sobjects"
+        creates = [(i, r) for i, r in enumerate(records) if not r.get(self.id_field)]
+        updates = [(i, r) for i, r in enumerate(records) if r.get(self.id_field)]
+        
+        for method, group in (("POST", creates), ("PATCH", updates)):
+            for start in range(0, len(group), self.BATCH_LIMIT):
+                chunk = group[start:start + self.BATCH_LIMIT]
+                payload = {
+                    "allOrNone": False,
+                    "records": [{"attributes": {"type": sobject}, **record} for _, record in chunk],
+                }
+                try:
+                    response = await self._send(result, method, url, json=payload)
+                except httpx.HTTPError as e:
+                    for index, _ in chunk:
+                        result.fail(index, _error_message(e))
+                    continue
+                
+                # Results come back in request order.
+                for (index, record), outcome in zip(chunk, response.json()):
+                    if outcome.get("success"):
+                        result.ok(index, outcome.get("id") or record.get(self.id_field))
+                    else:
+                        messages = [e.get("message", "") for e in outcome.get("errors", [])]
+                        result.fail(index, "; ".join(filter(None, messages)) or "Rejected by Salesforce")
+        return result
 
 
 class HubSpotAdapter(BaseCRMAdapter):
     """HubSpot CRM adapter."""
     
-    def __init__(self, api_key: str):
+    supports_delta = True
+    modified_field = "updatedAt"
+    vendor = "hubspot"
+    
+    BASE_URL = "https://api.hubapi.com"
+    # Batch endpoints accept at most 100 inputs per request.
+    BATCH_LIMIT = 100
+    
+    def __init__(self, api_key: str, http: Optional[HTTPClientPool] = None):
         self.api_key = api_key
-        self.client = None
+        self.http = http or http_pool
     
     async def get_contacts(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """Fetch contacts from HubSpot."""
@@ -99,12 +342,164 @@ class HubSpotAdapter(BaseCRMAdapter):
         # Implementation placeholder
         return True
     
+    async def get_contacts_modified_since(
+        self, since: datetime, limit: int = 100, after_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch contacts changed since a point in time from HubSpot."""
+        # POST /crm/v3/objects/contacts/search with filter groups
+        # (lastmodifieddate GT since) OR (lastmodifieddate EQ since AND
+        # hs_object_id GT after_id), or lastmodifieddate GTE since without
+        # after_id, sorted by lastmodifieddate then hs_object_id ascending
+        # Implementation placeholder
+        return []
+    
     async def get_deals(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """Fetch deals from HubSpot."""
         # Implementation placeholder
         return []
     
+    async def get_deals_modified_since(
+        self, since: datetime, limit: int = 100, after_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch deals changed since a point in time from HubSpot."""
+        # POST /crm/v3/objects/deals/search with filter groups as for
+        # contacts on hs_lastmodifieddate, sorted by it then hs_object_id
+        # Implementation placeholder
+        return []
+    
     async def create_deal(self, data: Dict[str, Any]) -> str:
         """Create a deal in HubSpot."""
         # Implementation placeholder
         return "hs_deal_123"
+    
+    def _auth_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+    
+    async def upsert_contacts(self, records: List[Dict[str, Any]]) -> BatchResult:
+        """Create or update contacts by email through the batch upsert endpoint."""
+        result = BatchResult.for_size(len(records))
+        keyed = []
+        for index, record in enumerate(records):
+            if record.get("email"):
+                keyed.append((index, record))
+            else:
+                result.fail(index, "email is required to upsert a HubSpot contact")
+        
+        for start in range(0, len(keyed), self.BATCH_LIMIT):
+            chunk = keyed[start:start + self.BATCH_LIMIT]
+            inputs = [
+                {
+                    "idProperty": "email",
+                    "id": record["email"],
+                    "objectWriteTraceId": str(index),
+                    "properties": record,
+                }
+                for index, record in chunk
+            ]
+            await self._write_batch(
+                result, "/crm/v3/objects/contacts/batch/upsert", chunk, inputs,
+                lambda item: str(item.get("properties", {}).get("email", "")).lower(),
+                lambda record: str(record["email"]).lower(),
+            )
+        return result
+    
+    async def upsert_deals(self, records: List[Dict[str, Any]]) -> BatchResult:
+        """Create new deals and update deals carrying an id, in batches."""
+        result = BatchResult.for_size(len(records))
+        creates = [(i, r) for i, r in enumerate(records) if not r.get(self.id_field)]
+        updates = [(i, r) for i, r in enumerate(records) if r.get(self.id_field)]
+        
+        for start in range(0, len(creates), self.BATCH_LIMIT):
+            chunk = creates[start:start + self.BATCH_LIMIT]
+            inputs = [
+                {"objectWriteTraceId": str(index), "properties": record}
+                for index, record in chunk
+            ]
+            await self._write_batch(
+                result, "/crm/v3/objects/deals/batch/create", chunk, inputs,
+                lambda item: None, lambda record: None,
+            )
+        
+        for start in range(0, len(updates), self.BATCH_LIMIT):
+            chunk = updates[start:start + self.BATCH_LIMIT]
+            inputs = [
+                {
+                    "id": str(record[self.id_field]),
+                    "objectWriteTraceId": str(index),
+                    "properties": {k: v for k, v in record.items() if k != self.id_field},
+                }
+                for index, record in chunk
+            ]
+            await self._write_batch(
+                result, "/crm/v3/objects/deals/batch/update", chunk, inputs,
+                lambda item: str(item.get("id")),
+                lambda record: str(record[self.id_field]),
+            )
+        return result
+    
+    async def _write_batch(
+        self,
+        result: BatchResult,
+        path: str,
+        chunk: List[Tuple[int, Dict[str, Any]]],
+        inputs: List[Dict[str, Any]],
+        result_key: Callable[[Dict[str, Any]], Optional[str]],
+        record_key: Callable[[Dict[str, Any]], Optional[str]],
+    ):
+        """
+        Send one batch request and attribute its results to input positions.
+        
+        A 207 response carries both results and errors. Results are matched
+        by the echoed objectWriteTraceId, falling back to result_key; inputs
+        with no matching result are failed with the batch error message.
+        """
+        try:
+            response = await self._send(result, "POST", f"{self.BASE_URL}{path}", json={"inputs": inputs})
+        except httpx.HTTPError as e:
+            for index, _ in chunk:
+                result.fail(index, _error_message(e))
+            return
+        
+        body = response.json()
+        by_key: Dict[str, List[int]] = {}
+        for index, record in chunk:
+            key = record_key(record)
+            if key:
+                by_key.setdefault(key, []).append(index)
+        
+        pending = {index for index, _ in chunk}
+        for item in body.get("results", []):
+            trace_id = item.get("objectWriteTraceId")
+            if trace_id is not None and int(trace_id) in pending:
+                matched = [int(trace_id)]
+            else:
+                matched = by_key.get(result_key(item) or "", [])
+            for index in matched:
+                result.ok(index, str(item.get("id")))
+                pending.discard(index)
+        
+        errors = body.get("errors", [])
+        messages: Dict[int, str] = {}
+        for error in errors:
+            context = error.get("context") or {}
+            for trace_id in context.get("objectWriteTraceId", []):
+                messages[int(trace_id)] = error.get("message", "")
+            for key in context.get("ids", []):
+                for index in by_key.get(str(key).lower(), []):
+                    messages[index] = error.get("message", "")
+        fallback = errors[0].get("message", "") if errors else "No result returned by HubSpot"
+        for index in pending:
+            result.fail(index, messages.get(index) or fallback)
+
+
+def create_adapter(name: str) -> BaseCRMAdapter:
+    """Build an adapter for a CRM from configured credentials."""
+    if name == "salesforce":
+        return SalesforceAdapter(
+            username=settings.salesforce_username,
+            password=settings.salesforce_password,
+            security_token=settings.salesforce_security_token,
+        )
+    if name == "hubspot":
+        return HubSpotAdapter(api_key=settings.hubspot_api_key)
+    raise ValueError(f"Unsupported CRM: {name}")
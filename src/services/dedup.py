@@ -0,0 +1,353 @@
+"""
+Contact deduplication.
+"""
+
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+from dataclasses import dataclass, asdict
+from difflib import SequenceMatcher
+import asyncio
+import logging
+import re
+import time
+
+from src.core.config import settings
+from src.services.enrichment import FREE_EMAIL_DOMAINS
+from src.services.repositories import ContactRepository, contact_repository, CONTACT_EXPORT_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Weight of each field in the similarity score; only fields present on
+# both contacts count.
+FIELD_WEIGHTS: Dict[str, float] = {
+    "email": 0.35,
+    "phone": 0.25,
+    "last_name": 0.15,
+    "first_name": 0.15,
+    "company": 0.10,
+}
+
+# Phone numbers with fewer digits are too ambiguous to block on.
+MIN_PHONE_DIGITS = 7
+
+# Domains whose dots are ignored in the local part of an address.
+_DOTLESS_DOMAINS = frozenset({"gmail.com", "googlemail.com"})
+
+_NON_WORD = re.compile(r"[\W_]+")
+_NON_DIGIT = re.compile(r"\D+")
+
+
+@dataclass(frozen=True)
+class DedupRecord:
+    """The normalized fields of a contact that deduplication compares."""
+    id: str
+    email: str
+    domain: str
+    first_name: str
+    last_name: str
+    phone: str
+    company: str
+
+
+def canonical_email(email: str) -> str:
+    """Lowercase, drop a +tag, and drop dots where the provider ignores them."""
+    email = email.strip().lower()
+    if "@" not in email:
+        return email
+    local, _, domain = email.rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in _DOTLESS_DOMAINS:
+        local = local.replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}"
+
+
+def _name(value: Optional[str]) -> str:
+    return _NON_WORD.sub("", (value or "").casefold())
+
+
+def _phone(value: Optional[str]) -> str:
+    digits = _NON_DIGIT.sub("", value or "")
+    return digits[-10:] if len(digits) >= MIN_PHONE_DIGITS else ""
+
+
+def normalize_contact(contact: Dict[str, Any]) -> DedupRecord:
+    email = canonical_email(contact.get("email") or "")
+    return DedupRecord(
+        id=contact["id"],
+        email=email,
+        domain=email.rpartition("@")[2],
+        first_name=_name(contact.get("first_name")),
+        last_name=_name(contact.get("last_name")),
+        phone=_phone(contact.get("phone")),
+        company=_name(contact.get("company")),
+    )
+
+
+def blocking_keys(record: DedupRecord) -> List[str]:
+    """
+    Keys that put likely duplicates in a common block.
+    
+    Canonical email, email domain plus last name (skipped for free mail
+    domains, where it says nothing about the person), and phone digits.
+    """
+    keys = []
+    if record.email:
+        keys.append(f"e:{record.email}")
+    if record.domain and record.last_name and record.domain not in FREE_EMAIL_DOMAINS:
+        keys.append(f"d:{record.domain}|{record.last_name}")
+    if record.phone:
+        keys.append(f"p:{record.phone}")
+    return keys
+
+
+def _text_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def similarity(a: DedupRecord, b: DedupRecord) -> Tuple[float, List[str]]:
+    """Weighted similarity (0-1) of two contacts, and the fields that matched."""
+    total = weight = 0.0
+    matched = []
+    for field, field_weight in FIELD_WEIGHTS.items():
+        left, right = getattr(a, field), getattr(b, field)
+        if not left or not right:
+            continue
+        if field in ("email", "phone"):
+            score = 1.0 if left == right else 0.0
+        else:
+            score = _text_similarity(left, right)
+        total += field_weight * score
+        weight += field_weight
+        if score >= 0.9:
+            matched.append(field)
+    return (total / weight if weight else 0.0), matched
+
+
+@dataclass
+class DuplicateMatch:
+    contact_id: str
+    duplicate_id: str
+    score: float
+    matched_on: List[str]
+    
+    @property
+    def pair(self) -> Tuple[str, str]:
+        return min(self.contact_id, self.duplicate_id), max(self.contact_id, self.duplicate_id)
+
+
+class DedupIndex:
+    """
+    Contacts grouped by blocking key, so only contacts sharing a block
+    are ever compared.
+    
+    Blocks larger than DEDUP_MAX_BLOCK_SIZE (a shared office phone line, a
+    placeholder email) stop producing candidates: they would add a
+    quadratic number of pairs with little signal.
+    """
+    
+    def __init__(self, max_block_size: Optional[int] = None):
+        self.max_block_size = max_block_size or settings.dedup_max_block_size
+        self.records: Dict[str, DedupRecord] = {}
+        self.blocks: Dict[str, List[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def add(self, contact: Dict[str, Any]) -> DedupRecord:
+        """Index a contact, replacing its previous entry."""
+        self.remove(contact["id"])
+        record = normalize_contact(contact)
+        self.records[record.id] = record
+        for key in blocking_keys(record):
+            self.blocks.setdefault(key, []).append(record.id)
+        return record
+    
+    def remove(self, contact_id: str):
+        record = self.records.pop(contact_id, None)
+        if record is None:
+            return
+        for key in blocking_keys(record):
+            block = self.blocks.get(key)
+            if block is not None:
+                block.remove(contact_id)
+                if not block:
+                    del self.blocks[key]
+    
+    def candidates(self, record: DedupRecord) -> Set[str]:
+        """IDs of indexed contacts sharing a usable block with record."""
+        found: Set[str] = set()
+        for key in blocking_keys(record):
+            block = self.blocks.get(key, ())
+            if len(block) <= self.max_block_size:
+                found.update(block)
+        found.discard(record.id)
+        return found
+    
+    def match(self, contact: Dict[str, Any], threshold: Optional[float] = None) -> List[DuplicateMatch]:
+        """Incremental mode: score a new contact against its candidates, then index it."""
+        threshold = settings.dedup_match_threshold if threshold is None else threshold
+        record = normalize_contact(contact)
+        matches = []
+        for other_id in self.candidates(record):
+            score, matched_on = similarity(record, self.records[other_id])
+            if score >= threshold:
+                matches.append(DuplicateMatch(record.id, other_id, round(score, 4), matched_on))
+        self.add(contact)
+        return sorted(matches, key=lambda m: -m.score)
+    
+    def pairs(self) -> Iterator[Tuple[str, str]]:
+        """Every distinct pair of contacts sharing a usable block."""
+        seen: Set[Tuple[str, str]] = set()
+        for block in self.blocks.values():
+            if len(block) < 2 or len(block) > self.max_block_size:
+                continue
+            for i, left in enumerate(block):
+                for right in block[i + 1:]:
+                    pair = (left, right) if left < right else (right, left)
+                    if pair not in seen:
+                        seen.add(pair)
+                        yield pair
+    
+    def scan(self, threshold: Optional[float] = None) -> Tuple[List[DuplicateMatch], int]:
+        """Full mode: score every candidate pair; returns (matches, pairs compared)."""
+        threshold = settings.dedup_match_threshold if threshold is None else threshold
+        matches, compared = [], 0
+        for left, right in self.pairs():
+            compared += 1
+            score, matched_on = similarity(self.records[left], self.records[right])
+            if score >= threshold:
+                matches.append(DuplicateMatch(left, right, round(score, 4), matched_on))
+        return matches, compared
+
+
+class DedupService:
+    """
+    Keeps the dedup index in step with the contacts table and collects
+    suspected duplicates for review.
+    
+    New and changed contacts are checked incrementally as they are written,
+    replacing the contact's earlier matches. The index is loaded from the
+    database, built off the event loop, by start_rebuild() at startup;
+    until it is ready checks find nothing. scan() loads a fresh index and
+    re-scores every block, also off the event loop. Contacts written while
+    an index loads are replayed onto it before it replaces the live one.
+    """
+    
+    def __init__(self, repository: Optional[ContactRepository] = None):
+        self.repository = repository or contact_repository
+        self.index = DedupIndex()
+        self.ready = False
+        self.matches: Dict[Tuple[str, str], DuplicateMatch] = {}
+        self._pairs: Dict[str, Set[Tuple[str, str]]] = {}
+        self.last_scan: Optional[Dict[str, Any]] = None
+        self._written_during_load: Optional[List[Dict[str, Any]]] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+    
+    def check(self, contact: Dict[str, Any]) -> List[DuplicateMatch]:
+        """Index a new or changed contact and record the duplicates found in place of its earlier ones."""
+        if self._written_during_load is not None:
+            self._written_during_load.append(contact)
+        if not self.ready:
+            return []
+        found = self.index.match(contact)
+        self._forget(contact["id"])
+        for match in found:
+            self._store(match)
+        return found
+    
+    def _store(self, match: DuplicateMatch):
+        self.matches[match.pair] = match
+        for contact_id in match.pair:
+            self._pairs.setdefault(contact_id, set()).add(match.pair)
+    
+    def _forget(self, contact_id: str):
+        for pair in self._pairs.pop(contact_id, ()):
+            self.matches.pop(pair, None)
+            other = pair[1] if pair[0] == contact_id else pair[0]
+            if other in self._pairs:
+                self._pairs[other].discard(pair)
+    
+    async def _load(self) -> DedupIndex:
+        index = DedupIndex()
+        async for rows in self.repository.stream():
+            await asyncio.to_thread(self._add_rows, index, rows)
+        return index
+    
+    @staticmethod
+    def _add_rows(index: DedupIndex, rows: List[Tuple]):
+        for row in rows:
+            index.add(dict(zip(CONTACT_EXPORT_COLUMNS, row)))
+    
+    def _install(self, index: DedupIndex):
+        written, self._written_during_load = self._written_during_load or [], None
+        self.index = index
+        self.ready = True
+        for contact in written:
+            self.check(contact)
+    
+    def start_rebuild(self):
+        """Rebuild the index in the background."""
+        if self._rebuild_task is None:
+            self._rebuild_task = asyncio.create_task(self._run_rebuild())
+    
+    async def stop(self):
+        task, self._rebuild_task = self._rebuild_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
+    async def _run_rebuild(self):
+        try:
+            await self.rebuild()
+        except Exception:
+            logger.exception("Dedup index rebuild failed")
+    
+    async def rebuild(self):
+        """Replace the index with every contact in the database."""
+        self._written_during_load = []
+        try:
+            index = await self._load()
+        except BaseException:
+            self._written_during_load = None
+            raise
+        self._install(index)
+    
+    async def scan(self) -> Dict[str, Any]:
+        """Rebuild the index and score every candidate pair."""
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            await asyncio.shield(self._rebuild_task)
+        started = time.perf_counter()
+        self._written_during_load = []
+        try:
+            index = await self._load()
+            loaded = time.perf_counter()
+            matches, compared = await asyncio.to_thread(index.scan)
+        except BaseException:
+            self._written_during_load = None
+            raise
+        self.matches, self._pairs = {}, {}
+        for match in matches:
+            self._store(match)
+        self._install(index)
+        self.last_scan = {
+            "contacts": len(index),
+            "blocks": len(index.blocks),
+            "pairs_compared": compared,
+            "duplicates": len(self.matches),
+            "load_seconds": round(loaded - started, 3),
+            "scan_seconds": round(time.perf_counter() - loaded, 3),
+        }
+        return self.last_scan
+    
+    def pending(self, min_score: float = 0.0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Suspected duplicates, best match first."""
+        ranked = sorted(
+            (m for m in self.matches.values() if m.score >= min_score),
+            key=lambda m: (-m.score, m.pair),
+        )
+        return [asdict(m) for m in ranked[:limit]]
+
+
+dedup_service = DedupService()
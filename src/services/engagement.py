@@ -0,0 +1,144 @@
+"""
+Time-decayed engagement scoring.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+
+from src.core.config import settings
+from src.services.repositories import ActivityRepository, activity_repository
+
+# Points an activity adds to the engagement score before decay.
+ACTIVITY_POINTS: Dict[str, float] = {
+    "email_open": 1,
+    "email_click": 3,
+    "page_view": 1,
+    "content_download": 5,
+    "form_submit": 10,
+    "webinar_attended": 10,
+    "meeting_scheduled": 20,
+    "budget_confirmed": 15,
+}
+
+# Points for activity types outside ACTIVITY_POINTS.
+DEFAULT_ACTIVITY_POINTS = 1.0
+
+# Lifecycle-relevant fields an activity sets, beyond the engagement score.
+ACTIVITY_FIELD_EFFECTS: Dict[str, Dict[str, Any]] = {
+    "meeting_scheduled": {"meeting_scheduled": True},
+    "budget_confirmed": {"budget_confirmed": True},
+}
+
+
+def activity_points(activity_type: str) -> float:
+    return float(ACTIVITY_POINTS.get(activity_type, DEFAULT_ACTIVITY_POINTS))
+
+
+def decay(value: float, elapsed_seconds: float) -> float:
+    """value after elapsed_seconds of exponential decay at the configured half-life."""
+    half_life = settings.engagement_half_life_days * 86400
+    return value * 0.5 ** (elapsed_seconds / half_life)
+
+
+def accumulate(
+    raw: float, raw_at: Optional[datetime], points: float, occurred_at: datetime
+) -> Tuple[float, datetime]:
+    """
+    Fold one activity into a decayed score in O(1); returns (raw, raw_at).
+    
+    raw is the score as of raw_at. Activities arriving out of order are
+    decayed to raw_at instead of moving it backwards.
+    """
+    if raw_at is None:
+        return points, occurred_at
+    if occurred_at >= raw_at:
+        return decay(raw, (occurred_at - raw_at).total_seconds()) + points, occurred_at
+    return raw + decay(points, (raw_at - occurred_at).total_seconds()), raw_at
+
+
+def score_at(raw: float, raw_at: Optional[datetime], now: datetime) -> float:
+    if raw_at is None:
+        return 0.0
+    return decay(raw, max(0.0, (now - raw_at).total_seconds()))
+
+
+def recompute(events: List[Tuple[float, datetime]], now: datetime) -> float:
+    """Score from a full replay of (points, occurred_at) events."""
+    return sum(decay(points, max(0.0, (now - occurred_at).total_seconds())) for points, occurred_at in events)
+
+
+class EngagementService:
+    """
+    Engagement scores kept as an exponentially decayed running value.
+    
+    Every activity is appended to the contact's log and folded into
+    (engagement_raw, engagement_at) on the contact, so neither writes nor
+    reads replay the history. Activities in ACTIVITY_FIELD_EFFECTS also set
+    their fields in custom_fields in the same write. engagement_score holds the rounded score as
+    of the latest activity, for filtering and lifecycle conditions; use
+    current_score() for the value decayed to now.
+    """
+    
+    def __init__(self, repository: Optional[ActivityRepository] = None):
+        self.repository = repository or activity_repository
+    
+    @staticmethod
+    def _fold(contact: Dict[str, Any], activities: List[Dict[str, Any]]) -> Dict[str, Any]:
+        raw, raw_at = contact["engagement_raw"], contact["engagement_at"]
+        custom_fields = contact["custom_fields"]
+        for activity in activities:
+            raw, raw_at = accumulate(raw, raw_at, activity["points"], activity["occurred_at"])
+            effects = ACTIVITY_FIELD_EFFECTS.get(activity["activity_type"])
+            if effects:
+                custom_fields = {**custom_fields, **effects}
+        return {
+            "engagement_raw": raw,
+            "engagement_at": raw_at,
+            "engagement_score": round(score_at(raw, raw_at, max(raw_at, datetime.utcnow()))),
+            "custom_fields": custom_fields,
+        }
+    
+    @staticmethod
+    def activity(
+        activity_type: str,
+        details: Optional[Dict[str, Any]] = None,
+        occurred_at: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "activity_type": activity_type,
+            "points": activity_points(activity_type),
+            "details": details or {},
+            "occurred_at": occurred_at or datetime.utcnow(),
+        }
+    
+    async def record(
+        self,
+        contact_id: str,
+        activity_type: str,
+        details: Optional[Dict[str, Any]] = None,
+        occurred_at: Optional[datetime] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Log an activity and update the score; returns (activity, contact)."""
+        activity = self.activity(activity_type, details, occurred_at)
+        contact = (await self.repository.append({contact_id: [activity]}, self._fold)).get(contact_id)
+        return (activity, contact) if contact else (None, None)
+    
+    async def record_many(self, activities: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Log activities for many contacts in one transaction.
+        
+        Each contact's score is updated once for all of its activities.
+        Returns the updated contacts by ID; unknown contacts are skipped.
+        """
+        return await self.repository.append(activities, self._fold)
+    
+    @staticmethod
+    def current_score(contact: Dict[str, Any], now: Optional[datetime] = None) -> float:
+        return score_at(contact.get("engagement_raw") or 0.0, contact.get("engagement_at"), now or datetime.utcnow())
+    
+    async def recompute(self, contact_id: str, now: Optional[datetime] = None) -> float:
+        """Score from a full replay of the contact's log, for verification."""
+        return recompute(await self.repository.points(contact_id), now or datetime.utcnow())
+
+
+engagement_service = EngagementService()
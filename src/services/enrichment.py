@@ -2,11 +2,23 @@
 Contact enrichment service.
 """
 
-from typing import Dict, Any, Optional
-from dataclasses import dataclass
-import httpx
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+from dataclasses import dataclass, asdict, field
+import asyncio
+import time
 
+from src.core.cache import SingleFlight, TwoTierCache
 from src.core.config import settings
+from src.core.http import HTTPClientPool, http_pool
+from src.services.enrichment_providers import EnrichmentProvider, build_providers
+
+ENRICHMENT_MODES = ("sequential", "hedged")
+
+# Mailbox providers whose domain says nothing about the contact's company.
+FREE_EMAIL_DOMAINS = frozenset({
+    "gmail.com", "googlemail.com", "yahoo.com", "hotmail.com", "outlook.com",
+    "live.com", "icloud.com", "me.com", "aol.com", "proton.me", "protonmail.com", "gmx.com",
+})
 
 
 @dataclass
@@ -15,88 +27,277 @@ class EnrichmentResult:
     data: Dict[str, Any]
     source: str
     error: Optional[str] = None
+    # field -> provider that supplied it, when several providers answered
+    field_sources: Dict[str, str] = field(default_factory=dict)
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def normalize_domain(domain: str) -> str:
+    domain = domain.strip().lower().rstrip(".")
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def merge_by_confidence(
+    answers: List[Tuple[EnrichmentProvider, Dict[str, Any]]],
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Merge provider answers field by field.
+    
+    Each field takes the non-empty value from the provider with the highest
+    confidence for it; ties go to the earlier answer. Returns the merged
+    data and the provider each field came from.
+    """
+    data: Dict[str, Any] = {}
+    sources: Dict[str, str] = {}
+    best: Dict[str, float] = {}
+    for provider, answer in answers:
+        for name, value in answer.items():
+            if value is None or value == "":
+                data.setdefault(name, value)
+                continue
+            confidence = provider.field_confidence(name)
+            if name not in best or confidence > best[name]:
+                data[name] = value
+                sources[name] = provider.name
+                best[name] = confidence
+    return data, sources
 
 
 class EnrichmentService:
-    """Service for enriching contact data from external sources."""
+    """
+    Service for enriching contact data from external sources.
+    
+    Lookups are cached by normalized email or domain. Failed lookups are
+    cached too, for the shorter negative TTL, so a bad address is not
+    retried against the provider on every request. Concurrent misses for
+    the same key share a single upstream call.
+    
+    Configured providers are queried in order. In sequential mode the next
+    provider is only tried when the previous one fails. In hedged mode the
+    next provider is also started once the previous one has been running
+    longer than its p95 latency. After the first answer, providers still in
+    flight get one more hedge window, and the answers are merged field by
+    field.
+    """
+    
+    def __init__(
+        self,
+        http: Optional[HTTPClientPool] = None,
+        cache: Optional[TwoTierCache] = None,
+        providers: Optional[List[EnrichmentProvider]] = None,
+        mode: Optional[str] = None,
+    ):
+        self.http = http or http_pool
+        self.providers = providers if providers is not None else build_providers(
+            settings.enrichment_providers, self.http
+        )
+        self.mode = mode or settings.enrichment_mode
+        if self.mode not in ENRICHMENT_MODES:
+            raise ValueError(f"Unknown enrichment mode: {self.mode}")
+        self.cache = cache or TwoTierCache(
+            "enrichment",
+            maxsize=settings.enrichment_cache_size,
+            use_redis=settings.enrichment_cache_redis_enabled,
+        )
+        self.flights = SingleFlight()
+        self.upstream_calls = 0
+        self.negative_hits = 0
+        self.hedges = 0
+    
+    async def _lookup(
+        self, key: str, fetch: Callable[[], Awaitable[EnrichmentResult]]
+    ) -> EnrichmentResult:
+        """Serve key from cache, or fetch it once for all concurrent callers."""
+        cached = await self._cached(key)
+        if cached is not None:
+            return cached
+        return await self.flights.do(key, lambda: self._fetch(key, fetch))
+    
+    async def _fetch(
+        self, key: str, fetch: Callable[[], Awaitable[EnrichmentResult]]
+    ) -> EnrichmentResult:
+        # The previous flight for key may have finished while the caller was
+        # missing the cache; its result is in the local tier by now.
+        cached = self.cache.peek(key)
+        if cached is not None:
+            return self._result(cached)
+        result = await fetch()
+        await self._remember(key, result)
+        return result
+    
+    async def _cached(self, key: str) -> Optional[EnrichmentResult]:
+        cached = await self.cache.get(key)
+        if cached is None:
+            return None
+        return self._result(cached)
+    
+    def _result(self, cached: Dict[str, Any]) -> EnrichmentResult:
+        result = EnrichmentResult(**cached)
+        if not result.success:
+            self.negative_hits += 1
+        return result
+    
+    async def _remember(self, key: str, result: EnrichmentResult):
+        if result.success:
+            ttl = settings.enrichment_cache_ttl_seconds
+        else:
+            ttl = settings.enrichment_negative_cache_ttl_seconds
+        await self.cache.set(key, asdict(result), ttl)
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "negative_hits": self.negative_hits,
+            "coalesced": self.flights.shared,
+            "in_flight": len(self.flights),
+            "hedges": self.hedges,
+            "providers": {
+                p.name: {"p95_seconds": p.latency.percentile(95), "samples": len(p.latency.samples)}
+                for p in self.providers
+            },
+            "cache": self.cache.stats(),
+        }
     
     async def enrich_by_email(self, email: str) -> EnrichmentResult:
         """
         Enrich contact data using email address.
         
-        Sources:
+        Sources, in settings.enrichment_providers order:
         - Clearbit
         - Apollo
-        - LinkedIn (if available)
+        
+        The person lookup runs alongside a company lookup for the email's
+        domain, which goes through enrich_by_domain and so is shared with
+        every other contact at that company.
         """
-        try:
-            # Clearbit enrichment
-            clearbit_data = await self._clearbit_enrich(email)
-            
-            return EnrichmentResult(
-                success=True,
-                data=clearbit_data,
-                source="clearbit",
-            )
-        except Exception as e:
-            return EnrichmentResult(
-                success=False,
-                data={},
-                source="clearbit",
-                error=str(e),
-            )
+        email = normalize_email(email)
+        return await self._lookup(f"email:{email}", lambda: self._lookup_email(email))
+    
+    async def _lookup_email(self, email: str) -> EnrichmentResult:
+        domain = email.rpartition("@")[2]
+        if not domain or domain in FREE_EMAIL_DOMAINS:
+            return await self._lookup_person(email)
+        
+        person, company = await asyncio.gather(
+            self._lookup_person(email),
+            self.enrich_by_domain(domain),
+        )
+        return self._merge_company(person, company)
+    
+    def _merge_company(self, person: EnrichmentResult, company: EnrichmentResult) -> EnrichmentResult:
+        """Fill company fields the person record lacks from the domain lookup."""
+        if not company.success:
+            return person
+        data = dict(person.data)
+        data["company"] = data.get("company") or company.data.get("name")
+        data["company_domain"] = data.get("company_domain") or company.data.get("domain")
+        data["company_industry"] = company.data.get("industry")
+        data["company_size"] = company.data.get("size")
+        return EnrichmentResult(success=True, data=data, source=person.source)
+    
+    async def _lookup_person(self, email: str) -> EnrichmentResult:
+        return await self._query("person", email)
     
     async def enrich_by_domain(self, domain: str) -> EnrichmentResult:
         """Enrich company data using domain."""
+        domain = normalize_domain(domain)
+        return await self._lookup(f"domain:{domain}", lambda: self._lookup_domain(domain))
+    
+    async def _lookup_domain(self, domain: str) -> EnrichmentResult:
+        return await self._query("company", domain)
+    
+    def _budget(self, provider: EnrichmentProvider) -> float:
+        """How long to wait on a provider before hedging to the next one."""
+        p95 = provider.latency.percentile(95)
+        return p95 if p95 is not None else settings.enrichment_hedge_budget_seconds
+    
+    async def _call(self, provider: EnrichmentProvider, kind: str, key: str) -> Dict[str, Any]:
+        """
+        Call one provider, sampling its latency whatever the outcome. A call
+        cancelled after a hedge won is sampled at its elapsed time, a lower
+        bound, so slow calls keep the p95 budget honest.
+        """
+        self.upstream_calls += 1
+        started = time.perf_counter()
         try:
-            company_data = await self._clearbit_company(domain)
-            
+            return await getattr(provider, kind)(key)
+        finally:
+            provider.latency.record(time.perf_counter() - started)
+    
+    async def _query(self, kind: str, key: str) -> EnrichmentResult:
+        """
+        Run a person or company lookup across the configured providers.
+        
+        Once one provider answers, providers still in flight get one more
+        hedge window to answer too, and every answer is merged field by
+        field; providers slower than that are cancelled.
+        """
+        providers = [p for p in self.providers if p.configured]
+        if not providers:
             return EnrichmentResult(
-                success=True,
-                data=company_data,
-                source="clearbit",
+                success=False, data={}, source="", error="No enrichment provider configured"
             )
-        except Exception as e:
+        
+        waiting = list(providers)
+        running: Dict[asyncio.Task, EnrichmentProvider] = {}
+        answers: List[Tuple[EnrichmentProvider, Dict[str, Any]]] = []
+        errors: List[str] = []
+        
+        def launch():
+            provider = waiting.pop(0)
+            running[asyncio.ensure_future(self._call(provider, kind, key))] = provider
+        
+        launch()
+        try:
+            while running and not answers:
+                latest = list(running.values())[-1]
+                timeout = self._budget(latest) if self.mode == "hedged" and waiting else None
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is not None:
+                        errors.append(f"{provider.name}: {task.exception()}")
+                    else:
+                        answers.append((provider, task.result()))
+                if answers or not waiting:
+                    continue
+                if not done:
+                    # Budget exceeded: hedge with the next provider.
+                    self.hedges += 1
+                    launch()
+                elif not running:
+                    launch()
+            if answers and running:
+                grace = max(self._budget(provider) for provider in running.values())
+                done, _ = await asyncio.wait(running, timeout=grace)
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None:
+                        answers.append((provider, task.result()))
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+        
+        if not answers:
             return EnrichmentResult(
                 success=False,
                 data={},
-                source="clearbit",
-                error=str(e),
+                source=",".join(p.name for p in providers),
+                error="; ".join(errors),
             )
-    
-    async def _clearbit_enrich(self, email: str) -> Dict[str, Any]:
-        """Call Clearbit Person API."""
-        if not settings.clearbit_api_key:
-            raise ValueError("Clearbit API key not configured")
-        
-        # Implementation placeholder
-        return {
-            "first_name": None,
-            "last_name": None,
-            "title": None,
-            "company": None,
-            "company_domain": None,
-            "linkedin": None,
-            "twitter": None,
-            "location": None,
-        }
-    
-    async def _clearbit_company(self, domain: str) -> Dict[str, Any]:
-        """Call Clearbit Company API."""
-        if not settings.clearbit_api_key:
-            raise ValueError("Clearbit API key not configured")
-        
-        # Implementation placeholder
-        return {
-            "name": None,
-            "domain": domain,
-            "industry": None,
-            "size": None,
-            "annual_revenue": None,
-            "founded_year": None,
-            "location": None,
-            "linkedin": None,
-        }
+        data, sources = merge_by_confidence(answers)
+        return EnrichmentResult(
+            success=True,
+            data=data,
+            source=",".join(p.name for p, _ in answers),
+            field_sources=sources if len(answers) > 1 else {},
+        )
 
 
 enrichment_service = EnrichmentService()
@@ -0,0 +1,217 @@
+"""
+Enrichment data providers.
+"""
+
+from typing import Dict, Any, List, Optional
+from abc import ABC, abstractmethod
+from collections import deque
+import math
+
+from src.core.config import settings
+from src.core.http import HTTPClientPool
+
+# Latency samples needed before a provider's percentiles are trusted.
+MIN_LATENCY_SAMPLES = 20
+
+
+class LatencyTracker:
+    """Rolling window of call latencies."""
+    
+    def __init__(self, window: int):
+        self.samples: deque = deque(maxlen=window)
+    
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-th percentile (0-100), or None until enough samples exist."""
+        if len(self.samples) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class EnrichmentProvider(ABC):
+    """
+    A source of person and company data.
+    
+    Both lookups return a flat field map and raise when the provider has
+    no match or the call fails. confidence rates how much each field from
+    this provider is trusted when results from several providers are merged.
+    """
+    
+    name: str = ""
+    confidence: Dict[str, float] = {}
+    default_confidence: float = 0.5
+    
+    def __init__(self):
+        self.latency = LatencyTracker(settings.enrichment_latency_window)
+    
+    @property
+    def configured(self) -> bool:
+        return True
+    
+    def field_confidence(self, field: str) -> float:
+        return self.confidence.get(field, self.default_confidence)
+    
+    @abstractmethod
+    async def person(self, email: str) -> Dict[str, Any]:
+        """Look a person up by email."""
+        pass
+    
+    @abstractmethod
+    async def company(self, domain: str) -> Dict[str, Any]:
+        """Look a company up by domain."""
+        pass
+
+
+class ClearbitProvider(EnrichmentProvider):
+    """Clearbit Person and Company APIs."""
+    
+    name = "clearbit"
+    confidence = {
+        "company": 0.9,
+        "company_domain": 0.9,
+        "name": 0.9,
+        "domain": 0.9,
+        "industry": 0.8,
+        "size": 0.8,
+        "title": 0.7,
+    }
+    
+    PERSON_URL = "https://person.clearbit.com/v2/combined/find"
+    COMPANY_URL = "https://company.clearbit.com/v2/companies/find"
+    
+    def __init__(self, http: HTTPClientPool):
+        super().__init__()
+        self.http = http
+    
+    @property
+    def configured(self) -> bool:
+        return bool(settings.clearbit_api_key)
+    
+    async def _get(self, url: str, **params: str) -> Dict[str, Any]:
+        response = await self.http.request(
+            "clearbit",
+            "GET",
+            url,
+            params=params,
+            headers={"Authorization": f"Bearer {settings.clearbit_api_key}"},
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    async def person(self, email: str) -> Dict[str, Any]:
+        body = await self._get(self.PERSON_URL, email=email)
+        person = body.get("person") or {}
+        name = person.get("name") or {}
+        employment = person.get("employment") or {}
+        return {
+            "first_name": name.get("givenName"),
+            "last_name": name.get("familyName"),
+            "title": employment.get("title"),
+            "company": employment.get("name"),
+            "company_domain": employment.get("domain"),
+            "linkedin": (person.get("linkedin") or {}).get("handle"),
+            "twitter": (person.get("twitter") or {}).get("handle"),
+            "location": person.get("location"),
+        }
+    
+    async def company(self, domain: str) -> Dict[str, Any]:
+        company = await self._get(self.COMPANY_URL, domain=domain)
+        metrics = company.get("metrics") or {}
+        return {
+            "name": company.get("name"),
+            "domain": company.get("domain") or domain,
+            "industry": (company.get("category") or {}).get("industry"),
+            "size": metrics.get("employeesRange"),
+            "annual_revenue": metrics.get("estimatedAnnualRevenue"),
+            "founded_year": company.get("foundedYear"),
+            "location": company.get("location"),
+            "linkedin": (company.get("linkedin") or {}).get("handle"),
+        }
+
+
+class ApolloProvider(EnrichmentProvider):
+    """Apollo people match and organization enrichment APIs."""
+    
+    name = "apollo"
+    confidence = {
+        "title": 0.85,
+        "first_name": 0.8,
+        "last_name": 0.8,
+        "linkedin": 0.8,
+        "company": 0.7,
+        "size": 0.6,
+    }
+    
+    PERSON_URL = "https://api.apollo.io/api/v1/people/match"
+    COMPANY_URL = "https://api.apollo.io/api/v1/organizations/enrich"
+    
+    def __init__(self, http: HTTPClientPool):
+        super().__init__()
+        self.http = http
+    
+    @property
+    def configured(self) -> bool:
+        return bool(settings.apollo_api_key)
+    
+    async def _request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        response = await self.http.request(
+            "apollo", method, url, headers={"X-Api-Key": settings.apollo_api_key}, **kwargs
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    @staticmethod
+    def _location(record: Dict[str, Any]) -> Optional[str]:
+        parts = [record.get(k) for k in ("city", "state", "country")]
+        return ", ".join(p for p in parts if p) or None
+    
+    async def person(self, email: str) -> Dict[str, Any]:
+        body = await self._request("POST", self.PERSON_URL, json={"email": email})
+        person = body.get("person")
+        if not person:
+            raise LookupError(f"No Apollo match for {email}")
+        organization = person.get("organization") or {}
+        return {
+            "first_name": person.get("first_name"),
+            "last_name": person.get("last_name"),
+            "title": person.get("title"),
+            "company": organization.get("name"),
+            "company_domain": organization.get("primary_domain"),
+            "linkedin": person.get("linkedin_url"),
+            "twitter": person.get("twitter_url"),
+            "location": self._location(person),
+        }
+    
+    async def company(self, domain: str) -> Dict[str, Any]:
+        body = await self._request("GET", self.COMPANY_URL, params={"domain": domain})
+        organization = body.get("organization")
+        if not organization:
+            raise LookupError(f"No Apollo match for {domain}")
+        employees = organization.get("estimated_num_employees")
+        return {
+            "name": organization.get("name"),
+            "domain": organization.get("primary_domain") or domain,
+            "industry": organization.get("industry"),
+            "size": str(employees) if employees else None,
+            "annual_revenue": organization.get("annual_revenue"),
+            "founded_year": organization.get("founded_year"),
+            "location": self._location(organization),
+            "linkedin": organization.get("linkedin_url"),
+        }
+
+
+PROVIDERS = {
+    "clearbit": ClearbitProvider,
+    "apollo": ApolloProvider,
+}
+
+
+def build_providers(names: List[str], http: HTTPClientPool) -> List[EnrichmentProvider]:
+    """Instantiate providers by name, in priority order."""
+    unknown = [name for name in names if name not in PROVIDERS]
+    if unknown:
+        raise ValueError(f"Unknown enrichment providers: {', '.join(unknown)}")
+    return [PROVIDERS[name](http) for name in names]
@@ -0,0 +1,202 @@
+"""
+Background enrichment queue.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from dataclasses import dataclass, field
+from enum import IntEnum
+import asyncio
+import itertools
+import logging
+import time
+
+from src.core.config import settings
+from src.services.enrichment import FREE_EMAIL_DOMAINS, EnrichmentResult, EnrichmentService, enrichment_service
+from src.services.repositories import contact_repository
+
+logger = logging.getLogger(__name__)
+
+# Contact fields filled in from enrichment results when present.
+ENRICHABLE_FIELDS = ("company", "title")
+
+ResultHandler = Callable[[str, EnrichmentResult], Awaitable[None]]
+
+
+class EnrichmentPriority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+
+
+@dataclass(order=True)
+class EnrichmentJob:
+    priority: int
+    sequence: int
+    contact_id: str = field(compare=False)
+    email: str = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+    
+    @property
+    def domain(self) -> str:
+        return self.email.rpartition("@")[2].lower()
+
+
+async def store_enrichment(contact_id: str, result: EnrichmentResult):
+    """Fill the enrichable fields a successful lookup returned, where the contact has none."""
+    if not result.success:
+        return
+    fields = {f: result.data[f] for f in ENRICHABLE_FIELDS if result.data.get(f)}
+    if fields:
+        await contact_repository.fill_missing(contact_id, fields)
+
+
+class EnrichmentQueue:
+    """
+    Enriches contacts off the request path.
+    
+    Contacts wait in a bounded priority queue, so single-contact requests
+    overtake bulk backfills, and each contact is queued at most once.
+    Workers drain micro-batches of up to ENRICHMENT_BATCH_SIZE contacts,
+    group them by email domain and look each company up once per batch
+    before the per-person lookups.
+    """
+    
+    def __init__(
+        self,
+        service: Optional[EnrichmentService] = None,
+        on_result: Optional[ResultHandler] = None,
+    ):
+        self.service = service or enrichment_service
+        self.on_result = on_result or store_enrichment
+        self.queue: "asyncio.PriorityQueue[EnrichmentJob]" = asyncio.PriorityQueue(
+            maxsize=settings.enrichment_queue_size
+        )
+        self.pending: Dict[str, EnrichmentJob] = {}
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.lag_seconds_last = 0.0
+        self.lag_seconds_max = 0.0
+    
+    def enqueue(
+        self,
+        contact: Dict[str, Any],
+        priority: EnrichmentPriority = EnrichmentPriority.BULK,
+    ) -> bool:
+        """
+        Queue a contact for enrichment; returns False if the queue is full.
+        
+        A contact already waiting is not queued twice, but a higher priority
+        request moves it forward.
+        """
+        existing = self.pending.get(contact["id"])
+        if existing is not None and existing.priority <= priority:
+            return True
+        
+        job = EnrichmentJob(priority, next(self._sequence), contact["id"], contact["email"])
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        if existing is not None:
+            job.enqueued_at = existing.enqueued_at
+        self.pending[job.contact_id] = job
+        return True
+    
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(settings.enrichment_workers)
+        ]
+    
+    async def stop(self):
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def join(self):
+        """Wait until every queued contact has been processed."""
+        await self.queue.join()
+    
+    async def _next_batch(self) -> List[EnrichmentJob]:
+        """Wait for one job, then take whatever else arrives within the batch window."""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + settings.enrichment_batch_wait_seconds
+        while len(batch) < settings.enrichment_batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                # Jobs superseded by a higher priority copy are dropped.
+                live = [job for job in batch if self.pending.get(job.contact_id) is job]
+                if live:
+                    await self._process(live)
+            except Exception:
+                logger.exception("Enrichment batch failed")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    
+    async def _process(self, batch: List[EnrichmentJob]):
+        self.batches += 1
+        by_domain: Dict[str, List[EnrichmentJob]] = {}
+        for job in batch:
+            by_domain.setdefault(job.domain, []).append(job)
+        await asyncio.gather(*(self._process_domain(domain, jobs) for domain, jobs in by_domain.items()))
+    
+    async def _process_domain(self, domain: str, jobs: List[EnrichmentJob]):
+        if len(jobs) > 1 and domain not in FREE_EMAIL_DOMAINS:
+            # Warm the company cache once before the person lookups fan out to it.
+            await self.service.enrich_by_domain(domain)
+        await asyncio.gather(*(self._enrich(job) for job in jobs))
+    
+    async def _enrich(self, job: EnrichmentJob):
+        try:
+            result = await self.service.enrich_by_email(job.email)
+            await self.on_result(job.contact_id, result)
+            self.processed += 1
+        except Exception:
+            self.failed += 1
+            logger.exception("Enrichment of contact %s failed", job.contact_id)
+        finally:
+            if self.pending.get(job.contact_id) is job:
+                del self.pending[job.contact_id]
+            self.lag_seconds_last = time.monotonic() - job.enqueued_at
+            self.lag_seconds_max = max(self.lag_seconds_max, self.lag_seconds_last)
+    
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest = min((job.enqueued_at for job in self.pending.values()), default=now)
+        return {
+            "depth": len(self.pending),
+            "workers": len(self._workers),
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "oldest_pending_seconds": round(now - oldest, 3),
+            "lag_seconds_last": round(self.lag_seconds_last, 3),
+            "lag_seconds_max": round(self.lag_seconds_max, 3),
+        }
+
+
+enrichment_queue = EnrichmentQueue()
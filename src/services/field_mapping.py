@@ -0,0 +1,169 @@
+"""
+Compiled field mappings for CRM sync.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple
+from dataclasses import dataclass
+import functools
+
+from src.services.crm_adapters import parse_timestamp
+
+Record = Dict[str, Any]
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1", "y", "on")
+    return bool(value)
+
+
+def _to_datetime(value: Any) -> Optional[str]:
+    parsed = parse_timestamp(value)
+    return parsed.isoformat() if parsed else None
+
+
+# Coercions a mapping target may name as "Field:type".
+COERCIONS: Dict[str, Callable[[Any], Any]] = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": _to_bool,
+    "datetime": _to_datetime,
+}
+
+
+def parse_target(target: str) -> Tuple[str, Optional[str]]:
+    """Split "Field:type" into the field and its coercion; raises ValueError for an unknown type."""
+    name, sep, kind = target.rpartition(":")
+    if not sep:
+        return target, None
+    if kind not in COERCIONS:
+        raise ValueError(f"Unknown coercion {kind!r} for field {name!r}")
+    return name, kind
+
+
+@dataclass(frozen=True)
+class CompiledMapping:
+    """
+    A field mapping compiled into one function that maps a whole page.
+    
+    transform(records) renames (and coerces) the mapped fields of every
+    record; unmapped fields are dropped. The generated code builds each
+    output record in a single dict display, and only falls back to per-field
+    membership tests for records missing a mapped field, so pages of
+    partial records should go through subset(). A failed coercion raises
+    ValueError naming the field.
+    """
+    fields: Dict[str, str]
+    coercions: Dict[str, str]
+    transform: Callable[[List[Record]], List[Record]]
+    
+    def target_name(self, source_field: str) -> str:
+        return self.fields[source_field]
+    
+    def subset(self, names: Iterable[str]) -> "CompiledMapping":
+        """The mapping of only the given source fields, compiled on its own and cached."""
+        names = set(names)
+        return compile_mapping({
+            source_field: f"{target}:{self.coercions[source_field]}" if source_field in self.coercions else target
+            for source_field, target in self.fields.items()
+            if source_field in names
+        })
+
+
+def _expression(index: int, source_field: str, kind: Optional[str]) -> str:
+    value = f"record[{source_field!r}]"
+    if kind is None:
+        return value
+    return f"_coerce({index}, {source_field!r}, {value})"
+
+
+def _compile(items: Tuple[Tuple[str, str], ...]) -> CompiledMapping:
+    fields: Dict[str, str] = {}
+    coercions: Dict[str, str] = {}
+    for source_field, target in items:
+        name, kind = parse_target(target)
+        fields[source_field] = name
+        if kind:
+            coercions[source_field] = kind
+    converters = [COERCIONS[coercions[f]] if f in coercions else None for f in fields]
+    
+    def _coerce(index: int, source_field: str, value: Any) -> Any:
+        if value is None:
+            return None
+        try:
+            return converters[index](value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Cannot convert {source_field!r} to {coercions[source_field]}: {e}") from None
+    
+    entries = [
+        (target, _expression(index, source_field, coercions.get(source_field)), source_field)
+        for index, (source_field, target) in enumerate(fields.items())
+    ]
+    lines = [
+        "def transform(records):",
+        "    result = []",
+        "    append = result.append",
+        "    for record in records:",
+        "        try:",
+        "            append({" + ", ".join(f"{target!r}: {expression}" for target, expression, _ in entries) + "})",
+        "        except KeyError:",
+        "            mapped = {}",
+    ]
+    for target, expression, source_field in entries:
+        lines.append(f"            if {source_field!r} in record:")
+        lines.append(f"                mapped[{target!r}] = {expression}")
+    lines.append("            append(mapped)")
+    lines.append("    return result")
+    
+    namespace: Dict[str, Any] = {"_coerce": _coerce}
+    exec(compile("\n".join(lines), "<field mapping>", "exec"), namespace)
+    return CompiledMapping(fields=fields, coercions=coercions, transform=namespace["transform"])
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_cached(items: Tuple[Tuple[str, str], ...]) -> CompiledMapping:
+    return _compile(items)
+
+
+def compile_mapping(mapping: Dict[str, str]) -> CompiledMapping:
+    """Compile a {source field: "TargetField[:type]"} mapping; raises ValueError for an unknown type."""
+    return _compile_cached(tuple(mapping.items()))
+
+
+class FieldMappingRegistry:
+    """
+    Field mappings configured per (source, target, object type), with
+    their compiled transforms cached until the mapping is reconfigured.
+    """
+    
+    def __init__(self):
+        self.mappings: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+        self._compiled: Dict[Tuple[str, str, str], CompiledMapping] = {}
+    
+    def configure(self, source: str, target: str, object_type: str, mapping: Dict[str, str]) -> CompiledMapping:
+        """Replace a mapping; raises ValueError, keeping the old one, if it does not compile."""
+        compiled = compile_mapping(mapping)
+        key = (source, target, object_type)
+        self.mappings[key] = dict(mapping)
+        self._compiled[key] = compiled
+        return compiled
+    
+    def get(self, source: str, target: str, object_type: str) -> Optional[Dict[str, str]]:
+        return self.mappings.get((source, target, object_type))
+    
+    def compiled(
+        self,
+        source: str,
+        target: str,
+        object_type: str,
+        mapping: Optional[Dict[str, str]] = None,
+    ) -> Optional[CompiledMapping]:
+        """
+        The compiled transform for a sync, from the mapping given for the
+        run or else the configured one; None when neither exists.
+        """
+        key = (source, target, object_type)
+        if mapping and mapping != self.mappings.get(key):
+            return compile_mapping(mapping)
+        return self._compiled.get(key)
@@ -0,0 +1,153 @@
+"""
+Monte Carlo revenue forecast.
+"""
+
+from typing import Dict, Any, Optional, Tuple
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.core.config import settings
+from src.services.pipeline import CLOSED_STAGES, PipelineAggregates, StageTotals, pipeline_aggregates
+from src.services.repositories import DealRepository, deal_repository
+
+FORECAST_PERIODS = ("month", "quarter", "year")
+FORECAST_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+# Upper bound on random draws held in memory at once by simulate_revenue.
+_DRAWS_PER_CHUNK = 4_000_000
+
+
+def period_end(period: str, today: date) -> date:
+    """Last day of the month, quarter or year containing today."""
+    if period not in FORECAST_PERIODS:
+        raise ValueError(f"Unknown forecast period: {period}")
+    if period == "year":
+        return date(today.year, 12, 31)
+    last_month = today.month if period == "month" else 3 * ((today.month - 1) // 3 + 1)
+    if last_month == 12:
+        return date(today.year, 12, 31)
+    return date(today.year, last_month + 1, 1) - timedelta(days=1)
+
+
+def simulate_revenue(
+    values: np.ndarray,
+    probabilities: np.ndarray,
+    simulations: int,
+    exact_deals: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Won value per simulated outcome of the given open deals.
+    
+    Each deal closes with its probability (0-1). The exact_deals largest
+    deals are drawn as independent Bernoulli trials; the remaining deals
+    are summed through their normal approximation, whose error shrinks as
+    no single deal dominates the tail.
+    """
+    totals = np.zeros(simulations)
+    if len(values) > exact_deals:
+        split = len(values) - exact_deals
+        order = np.argpartition(values, split)
+        tail_values, tail_probabilities = values[order[:split]], probabilities[order[:split]]
+        values, probabilities = values[order[split:]], probabilities[order[split:]]
+        mean = float(tail_values @ tail_probabilities)
+        std = float(np.sqrt((tail_values ** 2) @ (tail_probabilities * (1 - tail_probabilities))))
+        totals += np.clip(rng.normal(mean, std, simulations), 0, tail_values.sum())
+    
+    if len(values):
+        chunk = max(1, _DRAWS_PER_CHUNK // len(values))
+        thresholds = probabilities.astype(np.float32)
+        for start in range(0, simulations, chunk):
+            stop = min(start + chunk, simulations)
+            won = rng.random((stop - start, len(values)), dtype=np.float32) < thresholds
+            totals[start:stop] += won @ values
+    return totals
+
+
+@dataclass
+class ForecastInputs:
+    values: np.ndarray
+    probabilities: np.ndarray
+    close_dates: np.ndarray  # ISO dates, "" when unset
+
+
+class RevenueForecaster:
+    """
+    Revenue percentiles from simulated outcomes of the open pipeline.
+    
+    Open deals closing by the end of the period, or with no close date, are
+    simulated FORECAST_SIMULATIONS times on top of the closed-won value.
+    Deal columns and results are cached against the pipeline aggregates'
+    version, so repeated requests are served without touching the
+    database until a deal is written.
+    """
+    
+    def __init__(
+        self,
+        repository: Optional[DealRepository] = None,
+        aggregates: Optional[PipelineAggregates] = None,
+        seed: Optional[int] = None,
+    ):
+        self.repository = repository or deal_repository
+        self.aggregates = aggregates or pipeline_aggregates
+        self.seed = seed
+        self._inputs: Optional[Tuple[int, ForecastInputs]] = None
+        self._results: Dict[str, Tuple[Tuple[int, date], Dict[str, Any]]] = {}
+        self.runs = 0
+    
+    async def _load(self, version: int) -> ForecastInputs:
+        if self._inputs is not None and self._inputs[0] == version:
+            return self._inputs[1]
+        rows = await self.repository.forecast_inputs(exclude_stages=CLOSED_STAGES)
+        inputs = ForecastInputs(
+            values=np.fromiter((row[0] for row in rows), dtype=np.float64, count=len(rows)),
+            probabilities=np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows)) / 100,
+            close_dates=np.array([(row[2] or "")[:10] for row in rows], dtype="U10"),
+        )
+        self._inputs = (version, inputs)
+        return inputs
+    
+    async def forecast(self, period: str, today: Optional[date] = None) -> Dict[str, Any]:
+        today = today or date.today()
+        end = period_end(period, today)
+        version = self.aggregates.version
+        key = (version, today)
+        cached = self._results.get(period)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        inputs = await self._load(version)
+        in_period = (inputs.close_dates == "") | (inputs.close_dates <= end.isoformat())
+        values = inputs.values[in_period]
+        probabilities = inputs.probabilities[in_period]
+        outcomes = simulate_revenue(
+            values,
+            probabilities,
+            settings.forecast_simulations,
+            settings.forecast_exact_deals,
+            np.random.default_rng(self.seed),
+        )
+        self.runs += 1
+        
+        closed = self.aggregates.stages.get("closed_won", StageTotals()).value
+        percentiles = np.percentile(outcomes, FORECAST_PERCENTILES) + closed
+        by_percentile = {f"p{q}": round(float(v), 2) for q, v in zip(FORECAST_PERCENTILES, percentiles)}
+        result = {
+            "period": period,
+            "period_end": end.isoformat(),
+            "expected_revenue": round(closed + float(values @ probabilities), 2),
+            "best_case": by_percentile["p90"],
+            "worst_case": by_percentile["p10"],
+            "closed_to_date": round(closed, 2),
+            "percentiles": by_percentile,
+            "open_deals": int(len(values)),
+            "simulations": settings.forecast_simulations,
+            "version": version,
+        }
+        self._results[period] = (key, result)
+        return result
+
+
+revenue_forecaster = RevenueForecaster()
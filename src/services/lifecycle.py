@@ -2,10 +2,15 @@
 Lifecycle automation service.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Iterable, Set, Awaitable
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
+import asyncio
+import operator
+import time
+
+import numpy as np
 
 from src.core.config import settings
 
@@ -19,6 +24,12 @@ class LifecycleStage(Enum):
     ADVOCATE = "advocate"
 
 
+# Integer codes used by the columnar batch API.
+STAGE_ORDER: List[LifecycleStage] = list(LifecycleStage)
+STAGE_CODES: Dict[LifecycleStage, int] = {stage: i for i, stage in enumerate(STAGE_ORDER)}
+_STAGE_VALUES = np.array([stage.value for stage in STAGE_ORDER])
+
+
 @dataclass
 class StageTransition:
     contact_id: str
@@ -36,16 +47,167 @@ class StageConfig:
     actions: List[Dict[str, Any]]
 
 
+ActionHandler = Callable[[StageTransition, Dict[str, Any]], Awaitable[Any]]
+Predicate = Callable[[Dict[str, Any]], bool]
+VectorPredicate = Callable[[Dict[str, np.ndarray], np.ndarray], np.ndarray]
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": operator.eq,
+    "neq": operator.ne,
+    "gte": operator.ge,
+    "gt": operator.gt,
+    "lte": operator.le,
+    "lt": operator.lt,
+}
+
+_VECTOR_OPERATORS: Dict[str, Callable[[np.ndarray, Any], np.ndarray]] = {
+    "eq": np.equal,
+    "neq": np.not_equal,
+    "gte": np.greater_equal,
+    "gt": np.greater,
+    "lte": np.less_equal,
+    "lt": np.less,
+}
+
+# Ordering operators never match a missing field.
+_NULL_SAFE_OPERATORS = {"eq", "neq"}
+
+
+@dataclass
+class CompiledStage:
+    config: StageConfig
+    predicate: Predicate
+    vector_predicate: VectorPredicate
+    trigger: str
+
+
+@dataclass
+class BatchEvaluation:
+    """Result of a columnar evaluation; arrays are aligned with the input rows."""
+    next_stage: np.ndarray
+    transitioned: np.ndarray
+
+
+def encode_stages(values: Any) -> np.ndarray:
+    """Convert stage names to integer stage codes."""
+    values = np.asarray(values)
+    if values.size == 0:
+        return np.zeros(0, dtype=np.int8)
+    
+    unique, inverse = np.unique(values, return_inverse=True)
+    lookup = np.empty(len(unique), dtype=np.int8)
+    for i, value in enumerate(unique.tolist()):
+        try:
+            lookup[i] = STAGE_CODES[LifecycleStage(value)]
+        except ValueError:
+            raise ValueError(f"Unknown lifecycle stage: {value}")
+    return lookup[inverse.reshape(-1)]
+
+
+def decode_stages(codes: np.ndarray) -> np.ndarray:
+    """Convert integer stage codes back to stage names."""
+    return _STAGE_VALUES[codes]
+
+
+def compile_condition(condition: Dict[str, Any]) -> Predicate:
+    """Compile a single condition dict into a predicate over contact data."""
+    field = condition["field"]
+    op = condition["operator"]
+    expected = condition["value"]
+    
+    compare = _OPERATORS.get(op)
+    if compare is None:
+        raise ValueError(f"Unsupported operator: {op}")
+    
+    if op in _NULL_SAFE_OPERATORS:
+        def predicate(data: Dict[str, Any]) -> bool:
+            return compare(data.get(field), expected)
+    else:
+        def predicate(data: Dict[str, Any]) -> bool:
+            actual = data.get(field)
+            return actual is not None and compare(actual, expected)
+    
+    return predicate
+
+
+def compile_vector_condition(condition: Dict[str, Any]) -> VectorPredicate:
+    """
+    Compile a condition into a vectorized predicate over columnar data.
+    
+    Missing values should be encoded as NaN so that ordering comparisons
+    fail, matching the scalar semantics for None.
+    """
+    field = condition["field"]
+    op = condition["operator"]
+    expected = condition["value"]
+    
+    compare = _VECTOR_OPERATORS.get(op)
+    if compare is None:
+        raise ValueError(f"Unsupported operator: {op}")
+    # Result for rows where the column is absent entirely.
+    if_missing = compile_condition(condition)({})
+    
+    def predicate(columns: Dict[str, np.ndarray], rows: np.ndarray) -> np.ndarray:
+        column = columns.get(field)
+        if column is None:
+            return np.full(len(rows), if_missing)
+        return np.asarray(compare(column[rows], expected), dtype=bool)
+    
+    return predicate
+
+
+def compile_stage(config: StageConfig) -> CompiledStage:
+    """Compile a stage's conditions into a single conjunctive predicate."""
+    predicates = tuple(compile_condition(c) for c in config.conditions)
+    
+    if not predicates:
+        def predicate(data: Dict[str, Any]) -> bool:
+            return True
+    elif len(predicates) == 1:
+        predicate = predicates[0]
+    else:
+        def predicate(data: Dict[str, Any]) -> bool:
+            for check in predicates:
+                if not check(data):
+                    return False
+            return True
+    
+    vector_predicates = tuple(compile_vector_condition(c) for c in config.conditions)
+    
+    def vector_predicate(columns: Dict[str, np.ndarray], rows: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(rows), dtype=bool)
+        for check in vector_predicates:
+            mask &= check(columns, rows)
+        return mask
+    
+    return CompiledStage(
+        config=config,
+        predicate=predicate,
+        vector_predicate=vector_predicate,
+        trigger=f"conditions_met:{config.conditions}",
+    )
+
+
 class LifecycleService:
     """Service for managing contact lifecycle automation."""
     
     def __init__(self):
         self.stage_configs: Dict[LifecycleStage, StageConfig] = {}
+        self._compiled: Dict[LifecycleStage, CompiledStage] = {}
+        # field name -> stages whose conditions read that field
+        self._field_index: Dict[str, Set[LifecycleStage]] = {}
+        self.action_handlers: Dict[str, ActionHandler] = {
+            "notify": self._notify,
+            "assign": self._assign,
+            "create_deal": self._create_deal,
+        }
+        # Created lazily so the service can be built outside an event loop.
+        self._action_limits: Dict[str, asyncio.Semaphore] = {}
         self._configure_default_stages()
     
     def _configure_default_stages(self):
         """Configure default lifecycle stages."""
-        self.stage_configs[LifecycleStage.LEAD] = StageConfig(
+        self.configure_stage(StageConfig(
             stage=LifecycleStage.LEAD,
             next_stage=LifecycleStage.MQL,
             conditions=[
@@ -54,9 +216,9 @@ class LifecycleService:
             actions=[
                 {"type": "notify", "config": {"team": "marketing"}},
             ],
-        )
+        ))
         
-        self.stage_configs[LifecycleStage.MQL] = StageConfig(
+        self.configure_stage(StageConfig(
             stage=LifecycleStage.MQL,
             next_stage=LifecycleStage.SQL,
             conditions=[
@@ -66,9 +228,9 @@ class LifecycleService:
                 {"type": "assign", "config": {"to": "sales_team"}},
                 {"type": "notify", "config": {"team": "sales"}},
             ],
-        )
+        ))
         
-        self.stage_configs[LifecycleStage.SQL] = StageConfig(
+        self.configure_stage(StageConfig(
             stage=LifecycleStage.SQL,
             next_stage=LifecycleStage.OPPORTUNITY,
             conditions=[
@@ -77,7 +239,67 @@ class LifecycleService:
             actions=[
                 {"type": "create_deal", "config": {}},
             ],
-        )
+        ))
+    
+    def configure_stage(self, config: StageConfig) -> CompiledStage:
+        """
+        Install a stage configuration and compile its conditions.
+        
+        Raises ValueError if a condition uses an unsupported operator; the
+        previous configuration is left in place in that case.
+        """
+        compiled = compile_stage(config)
+        self.stage_configs[config.stage] = config
+        self._compiled[config.stage] = compiled
+        self._rebuild_field_index()
+        return compiled
+    
+    def _rebuild_field_index(self):
+        index: Dict[str, Set[LifecycleStage]] = {}
+        for stage, compiled in self._compiled.items():
+            if self.stage_configs.get(stage) is not compiled.config:
+                continue
+            for condition in compiled.config.conditions:
+                index.setdefault(condition["field"], set()).add(stage)
+        self._field_index = index
+    
+    def _get_compiled(self, stage: LifecycleStage) -> Optional[CompiledStage]:
+        """Return the compiled stage, recompiling if its config was replaced."""
+        config = self.stage_configs.get(stage)
+        if config is None:
+            return None
+        
+        compiled = self._compiled.get(stage)
+        if compiled is None or compiled.config is not config:
+            compiled = self.configure_stage(config)
+        return compiled
+    
+    def stages_for_fields(self, fields: Iterable[str]) -> Set[LifecycleStage]:
+        """Return the stages whose conditions read any of the given fields."""
+        for stage in list(self.stage_configs):
+            self._get_compiled(stage)
+        
+        stages: Set[LifecycleStage] = set()
+        for field in fields:
+            stages |= self._field_index.get(field, set())
+        return stages
+    
+    async def reevaluate_on_change(
+        self,
+        contact_id: str,
+        current_stage: LifecycleStage,
+        changed_fields: Iterable[str],
+        contact_data: Dict[str, Any]
+    ) -> Optional[StageTransition]:
+        """
+        Re-check a contact after a write that touched changed_fields.
+        
+        Skips evaluation entirely unless the current stage's conditions
+        read one of the changed fields.
+        """
+        if current_stage not in self.stages_for_fields(changed_fields):
+            return None
+        return await self.evaluate_transition(contact_id, current_stage, contact_data)
     
     async def evaluate_transition(
         self,
@@ -93,33 +315,62 @@ class LifecycleService:
         if not settings.lifecycle_automation_enabled:
             return None
         
-        config = self.stage_configs.get(current_stage)
-        if not config or not config.next_stage:
+        compiled = self._get_compiled(current_stage)
+        if not compiled or not compiled.config.next_stage:
             return None
         
-        # Evaluate conditions
-        all_conditions_met = True
-        for condition in config.conditions:
-            field = condition["field"]
-            operator = condition["operator"]
-            expected = condition["value"]
-            actual = contact_data.get(field)
-            
-            if not self._evaluate_condition(actual, operator, expected):
-                all_conditions_met = False
-                break
-        
-        if all_conditions_met:
+        if compiled.predicate(contact_data):
             return StageTransition(
                 contact_id=contact_id,
                 from_stage=current_stage,
-                to_stage=config.next_stage,
-                trigger=f"conditions_met:{config.conditions}",
+                to_stage=compiled.config.next_stage,
+                trigger=compiled.trigger,
                 timestamp=datetime.utcnow(),
             )
         
         return None
     
+    def evaluate_batch(
+        self,
+        current_stage: np.ndarray,
+        columns: Dict[str, np.ndarray],
+    ) -> BatchEvaluation:
+        """
+        Evaluate transitions for a whole batch of contacts in columnar form.
+        
+        current_stage holds stage codes (see STAGE_CODES) or stage names;
+        columns maps condition fields to arrays aligned with it. Returns the
+        next stage code per row and a mask of rows that transitioned.
+        """
+        current = np.asarray(current_stage)
+        if current.dtype.kind in "UO":
+            current = encode_stages(current)
+        
+        next_stage = current.copy()
+        transitioned = np.zeros(len(current), dtype=bool)
+        if not settings.lifecycle_automation_enabled:
+            return BatchEvaluation(next_stage=next_stage, transitioned=transitioned)
+        
+        columns = {field: np.asarray(values) for field, values in columns.items()}
+        for field, values in columns.items():
+            if len(values) != len(current):
+                raise ValueError(f"Column '{field}' has {len(values)} rows, expected {len(current)}")
+        
+        for stage in list(self.stage_configs):
+            compiled = self._get_compiled(stage)
+            if not compiled.config.next_stage:
+                continue
+            
+            rows = np.flatnonzero(current == STAGE_CODES[stage])
+            if not rows.size:
+                continue
+            
+            hits = rows[compiled.vector_predicate(columns, rows)]
+            next_stage[hits] = STAGE_CODES[compiled.config.next_stage]
+            transitioned[hits] = True
+        
+        return BatchEvaluation(next_stage=next_stage, transitioned=transitioned)
+    
     def _evaluate_condition(self, actual: Any, operator: str, expected: Any) -> bool:
         """Evaluate a single condition."""
         if operator == "eq":
@@ -141,21 +392,99 @@ class LifecycleService:
         transition: StageTransition,
         config: StageConfig
     ) -> List[Dict[str, Any]]:
-        """Execute actions associated with a stage transition."""
-        results = []
+        """
+        Execute actions associated with a stage transition.
         
-        for action in config.actions:
-            action_type = action["type"]
-            action_config = action.get("config", {})
-            
-            # Execute action (placeholder)
-            results.append({
-                "action": action_type,
-                "config": action_config,
-                "executed": True,
-            })
+        Actions run concurrently, each bounded by its type's concurrency
+        limit and the action timeout. Results are returned in config order
+        with per-action latency; a failed action does not cancel the others.
+        """
+        return list(await asyncio.gather(*(
+            self._run_action(transition, action) for action in config.actions
+        )))
+    
+    async def execute_transitions(
+        self,
+        transitions: List[StageTransition],
+        workers: Optional[int] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Execute actions for many transitions through a bounded worker pool.
         
+        Returns action results aligned with the input transitions.
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in transitions]
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(transitions):
+            queue.put_nowait(item)
+        
+        async def worker():
+            while True:
+                try:
+                    index, transition = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                config = self.stage_configs.get(transition.from_stage)
+                if config:
+                    results[index] = await self.execute_transition_actions(transition, config)
+        
+        pool_size = min(workers or settings.lifecycle_transition_workers, len(transitions))
+        await asyncio.gather(*(worker() for _ in range(pool_size)))
         return results
+    
+    def _action_limit(self, action_type: str) -> asyncio.Semaphore:
+        limit = self._action_limits.get(action_type)
+        if limit is None:
+            limit = asyncio.Semaphore(settings.lifecycle_action_concurrency)
+            self._action_limits[action_type] = limit
+        return limit
+    
+    async def _run_action(self, transition: StageTransition, action: Dict[str, Any]) -> Dict[str, Any]:
+        action_type = action["type"]
+        action_config = action.get("config", {})
+        result = {
+            "action": action_type,
+            "config": action_config,
+            "executed": False,
+            "wait_ms": 0.0,
+            "latency_ms": 0.0,
+            "error": None,
+        }
+        
+        handler = self.action_handlers.get(action_type)
+        if handler is None:
+            result["error"] = f"Unknown action type: {action_type}"
+            return result
+        
+        queued_at = time.perf_counter()
+        async with self._action_limit(action_type):
+            started_at = time.perf_counter()
+            result["wait_ms"] = (started_at - queued_at) * 1000
+            try:
+                await asyncio.wait_for(
+                    handler(transition, action_config),
+                    timeout=settings.lifecycle_action_timeout_seconds,
+                )
+                result["executed"] = True
+            except asyncio.TimeoutError:
+                result["error"] = "timeout"
+            except Exception as e:
+                result["error"] = str(e)
+            result["latency_ms"] = (time.perf_counter() - started_at) * 1000
+        
+        return result
+    
+    async def _notify(self, transition: StageTransition, config: Dict[str, Any]):
+        """Notify a team about the transition (placeholder)."""
+        pass
+    
+    async def _assign(self, transition: StageTransition, config: Dict[str, Any]):
+        """Assign the contact to an owner or team (placeholder)."""
+        pass
+    
+    async def _create_deal(self, transition: StageTransition, config: Dict[str, Any]):
+        """Create a deal for the contact (placeholder)."""
+        pass
 
 
 lifecycle_service = LifecycleService()
@@ -0,0 +1,122 @@
+"""
+Materialized deal pipeline aggregates.
+"""
+
+from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, asdict
+from datetime import datetime
+import math
+
+from src.services.repositories import DealRepository, deal_repository
+
+STAGE_PROBABILITIES: Dict[str, int] = {
+    "qualification": 20,
+    "discovery": 40,
+    "proposal": 60,
+    "negotiation": 80,
+    "closed_won": 100,
+    "closed_lost": 0,
+}
+
+CLOSED_STAGES = ("closed_won", "closed_lost")
+
+# Probability for stages outside STAGE_PROBABILITIES.
+DEFAULT_PROBABILITY = 50
+
+
+def stage_probability(stage: str) -> int:
+    return STAGE_PROBABILITIES.get(stage, DEFAULT_PROBABILITY)
+
+
+@dataclass
+class StageTotals:
+    count: int = 0
+    value: float = 0.0
+    weighted_value: float = 0.0
+    
+    def add(self, deal: Dict[str, Any], sign: int = 1):
+        self.count += sign
+        self.value += sign * deal["value"]
+        self.weighted_value += sign * deal["value"] * deal["probability"] / 100
+    
+    def matches(self, other: "StageTotals") -> bool:
+        return (
+            self.count == other.count
+            and math.isclose(self.value, other.value, rel_tol=1e-9, abs_tol=0.01)
+            and math.isclose(self.weighted_value, other.weighted_value, rel_tol=1e-9, abs_tol=0.01)
+        )
+
+
+class PipelineAggregates:
+    """
+    Per-stage deal count, value and weighted value kept in memory.
+    
+    Deal writes apply their difference as they happen, so summaries cost
+    O(stages) instead of a scan of the deals table. version increases on
+    every change, for caches derived from the pipeline. The totals are
+    rebuilt from the database on startup; check() compares them with a
+    full recompute to catch drift, e.g. from writes made by another process.
+    """
+    
+    def __init__(self, repository: Optional[DealRepository] = None):
+        self.repository = repository or deal_repository
+        self.stages: Dict[str, StageTotals] = {}
+        self.version = 0
+        self.rebuilt_at: Optional[datetime] = None
+    
+    def record_created(self, deal: Dict[str, Any]):
+        self.stages.setdefault(deal["stage"], StageTotals()).add(deal)
+        self.version += 1
+    
+    def record_updated(self, before: Dict[str, Any], after: Dict[str, Any]):
+        self.stages.setdefault(before["stage"], StageTotals()).add(before, -1)
+        self.stages.setdefault(after["stage"], StageTotals()).add(after)
+        self.version += 1
+    
+    async def _recompute(self) -> Dict[str, StageTotals]:
+        return {
+            row["stage"]: StageTotals(row["count"], float(row["value"]), float(row["weighted_value"]))
+            for row in await self.repository.stage_totals()
+        }
+    
+    async def rebuild(self):
+        """Replace the running totals with a full recompute."""
+        self.stages = await self._recompute()
+        self.rebuilt_at = datetime.utcnow()
+        self.version += 1
+    
+    async def check(self) -> Dict[str, Any]:
+        """Compare the running totals with a full recompute."""
+        expected = await self._recompute()
+        drift = {}
+        for stage in sorted(expected.keys() | self.stages.keys()):
+            actual = self.stages.get(stage, StageTotals())
+            wanted = expected.get(stage, StageTotals())
+            if not actual.matches(wanted):
+                drift[stage] = {"expected": asdict(wanted), "actual": asdict(actual)}
+        return {"consistent": not drift, "version": self.version, "drift": drift}
+    
+    def _open_stages(self) -> List[str]:
+        known = [s for s in STAGE_PROBABILITIES if s not in CLOSED_STAGES]
+        extra = sorted(s for s in self.stages if s not in STAGE_PROBABILITIES)
+        return known + extra
+    
+    def summary(self) -> Dict[str, Any]:
+        stages = []
+        for stage in self._open_stages():
+            totals = self.stages.get(stage, StageTotals())
+            stages.append({
+                "stage": stage,
+                "count": totals.count,
+                "value": round(totals.value, 2),
+                "weighted_value": round(totals.weighted_value, 2),
+            })
+        return {
+            "stages": stages,
+            "total_pipeline_value": round(sum(s["value"] for s in stages), 2),
+            "weighted_value": round(sum(s["weighted_value"] for s in stages), 2),
+            "version": self.version,
+        }
+
+
+pipeline_aggregates = PipelineAggregates()
@@ -0,0 +1,773 @@
+"""
+Async repositories for contacts, deals and accounts.
+"""
+
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable, Tuple
+from datetime import datetime
+import uuid
+
+from sqlalchemy import Insert, Select, Table, select, insert, update, bindparam, tuple_, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from src.core.config import settings
+from src.core.database import Database, database
+from src.core.pagination import Page, encode_cursor, decode_cursor
+from src.core.tables import (
+    contacts, contact_activities, deals, accounts, sync_watermarks, sync_record_state, sync_conflicts,
+)
+
+
+class DuplicateRecordError(Exception):
+    """Raised when a write violates a uniqueness constraint."""
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:12]}"
+
+
+def _keyset(
+    query: Select,
+    table: Table,
+    cursor: Optional[str],
+    limit: int,
+    time_column: str = "updated_at",
+) -> Select:
+    """
+    Order newest-first on (time_column, id) and seek past the cursor.
+    
+    Fetches one extra row so the caller can tell whether another page exists.
+    """
+    column = table.c[time_column]
+    if cursor:
+        position, record_id = decode_cursor(cursor)
+        query = query.where(tuple_(column, table.c.id) < tuple_(position, record_id))
+    return query.order_by(column.desc(), table.c.id.desc()).limit(limit + 1)
+
+
+def _page(rows: List[Dict[str, Any]], limit: int, time_column: str = "updated_at") -> Page:
+    if len(rows) <= limit:
+        return Page(items=rows)
+    items = rows[:limit]
+    last = items[-1]
+    return Page(items=items, next_cursor=encode_cursor(last[time_column], last["id"]))
+
+
+async def _stream_partitions(
+    db: Database,
+    query: Select,
+    batch_size: Optional[int],
+) -> AsyncIterator[List[Tuple]]:
+    """Yield raw row tuples in fixed-size partitions over a server-side cursor."""
+    size = batch_size or settings.export_batch_size
+    async with db.connection() as conn:
+        result = await conn.stream(query.execution_options(yield_per=size))
+        async for rows in result.partitions(size):
+            yield [tuple(row) for row in rows]
+
+
+def _upsert_insert(db: Database, table: Table) -> Insert:
+    """Dialect-specific INSERT that supports ON CONFLICT."""
+    dialect = db.engine.dialect.name if db.engine else None
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"Upsert is not supported for dialect: {dialect}")
+
+
+# Columns an upsert overwrites on an existing contact; stage, score,
+# account and timestamps of creation are left alone.
+_CONTACT_UPSERT_COLUMNS = (
+    "first_name", "last_name", "company", "title", "phone", "custom_fields", "updated_at",
+)
+
+CONTACT_EXPORT_COLUMNS: Tuple[str, ...] = (
+    "id", "email", "first_name", "last_name", "company", "title", "phone", "account_id",
+    "lifecycle_stage", "engagement_score", "custom_fields", "created_at", "updated_at",
+)
+DEAL_EXPORT_COLUMNS: Tuple[str, ...] = (
+    "id", "name", "contact_id", "account_id", "owner_id", "value", "currency",
+    "stage", "probability", "close_date", "custom_fields", "created_at", "updated_at",
+)
+
+
+# Hot lookups are defined once with explicit bind parameters so every call
+# reuses the same compiled statement (and asyncpg prepared statement).
+_GET_CONTACT = select(contacts).where(contacts.c.id == bindparam("contact_id"))
+_GET_CONTACT_BY_EMAIL = select(contacts).where(contacts.c.email == bindparam("email"))
+_GET_DEAL = select(deals).where(deals.c.id == bindparam("deal_id"))
+_GET_ACCOUNT = select(accounts).where(accounts.c.id == bindparam("account_id"))
+
+
+class ContactRepository:
+    """Persistence for contacts."""
+    
+    def __init__(self, db: Database):
+        self.db = db
+    
+    async def get(self, contact_id: str) -> Optional[Dict[str, Any]]:
+        async with self.db.connection() as conn:
+            result = await conn.execute(_GET_CONTACT, {"contact_id": contact_id})
+            row = result.mappings().first()
+        return dict(row) if row else None
+    
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        async with self.db.connection() as conn:
+            result = await conn.execute(_GET_CONTACT_BY_EMAIL, {"email": email})
+            row = result.mappings().first()
+        return dict(row) if row else None
+    
+    async def ids_by_email(self, emails: List[str]) -> Dict[str, str]:
+        """Map each known email to its contact ID."""
+        if not emails:
+            return {}
+        query = select(contacts.c.email, contacts.c.id).where(contacts.c.email.in_(emails))
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return {email: contact_id for email, contact_id in result}
+    
+    async def set_lifecycle_stages(self, stages: Dict[str, str]):
+        """Write new lifecycle stages for many contacts in one statement."""
+        if not stages:
+            return
+        query = (
+            update(contacts)
+            .where(contacts.c.id == bindparam("_id"))
+            .values(lifecycle_stage=bindparam("lifecycle_stage"), updated_at=datetime.utcnow())
+        )
+        async with self.db.transaction() as conn:
+            await conn.execute(
+                query, [{"_id": contact_id, "lifecycle_stage": stage} for contact_id, stage in stages.items()]
+            )
+    
+    async def list(
+        self,
+        lifecycle_stage: Optional[str] = None,
+        min_score: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Page:
+        """List contacts newest-first; raises ValueError for a bad cursor."""
+        query = select(contacts)
+        if lifecycle_stage is not None:
+            query = query.where(contacts.c.lifecycle_stage == lifecycle_stage)
+        if min_score is not None:
+            query = query.where(contacts.c.engagement_score >= min_score)
+        query = _keyset(query, contacts, cursor, limit)
+        
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return _page([dict(row) for row in result.mappings()], limit)
+    
+    def stream(
+        self,
+        lifecycle_stage: Optional[str] = None,
+        min_score: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ) -> AsyncIterator[List[Tuple]]:
+        """Stream contacts as partitions of CONTACT_EXPORT_COLUMNS tuples."""
+        query = select(*(contacts.c[name] for name in CONTACT_EXPORT_COLUMNS))
+        if lifecycle_stage is not None:
+            query = query.where(contacts.c.lifecycle_stage == lifecycle_stage)
+        if min_score is not None:
+            query = query.where(contacts.c.engagement_score >= min_score)
+        return _stream_partitions(self.db, query, batch_size)
+    
+    async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        row = {
+            "id": _new_id("con"),
+            "lifecycle_stage": "lead",
+            "engagement_score": 0,
+            "engagement_raw": 0.0,
+            **data,
+            "created_at": now,
+            "updated_at": now,
+        }
+        try:
+            async with self.db.transaction() as conn:
+                await conn.execute(insert(contacts).values(**row))
+        except IntegrityError:
+            raise DuplicateRecordError(f"Contact with email {data.get('email')} already exists")
+        return row
+    
+    async def upsert_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insert or update contacts by email using batched multi-row statements.
+        
+        Later records win when a batch repeats an email. Returns the id,
+        email and account_id of every affected contact, and whether it was
+        created.
+        """
+        if not records:
+            return []
+        
+        now = datetime.utcnow()
+        by_email: Dict[str, Dict[str, Any]] = {}
+        for data in records:
+            by_email[data["email"]] = {
+                "id": _new_id("con"),
+                "lifecycle_stage": "lead",
+                "engagement_score": 0,
+                "engagement_raw": 0.0,
+                **data,
+                "created_at": now,
+                "updated_at": now,
+            }
+        
+        # Executed as executemany: SQLAlchemy batches the parameter sets into
+        # multi-row INSERT ... VALUES statements ("insertmanyvalues") while
+        # reusing one cached compiled statement.
+        query = _upsert_insert(self.db, contacts)
+        query = query.on_conflict_do_update(
+            index_elements=[contacts.c.email],
+            set_={name: query.excluded[name] for name in _CONTACT_UPSERT_COLUMNS},
+        ).returning(contacts.c.id, contacts.c.email, contacts.c.account_id, contacts.c.created_at)
+        
+        async with self.db.transaction() as conn:
+            result = await conn.execute(query, list(by_email.values()))
+            # created_at is never overwritten, so only new rows carry this call's timestamp.
+            return [
+                {"id": row.id, "email": row.email, "account_id": row.account_id, "created": row.created_at == now}
+                for row in result
+            ]
+    
+    async def update(self, contact_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        values = {**data, "updated_at": datetime.utcnow()}
+        query = (
+            update(contacts)
+            .where(contacts.c.id == contact_id)
+            .values(**values)
+            .returning(*contacts.c)
+        )
+        try:
+            async with self.db.transaction() as conn:
+                result = await conn.execute(query)
+                row = result.mappings().first()
+        except IntegrityError:
+            raise DuplicateRecordError(f"Contact with email {data.get('email')} already exists")
+        return dict(row) if row else None
+    
+    
+    async def fill_missing(self, contact_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Write fields only where the stored contact has no value.
+        
+        Values users entered or synced in are never overwritten. Returns the
+        updated contact, or None when nothing was missing.
+        """
+        empty = [or_(contacts.c[name].is_(None), contacts.c[name] == "") for name in data]
+        values = {
+            name: func.coalesce(func.nullif(contacts.c[name], ""), value)
+            for name, value in data.items()
+        }
+        query = (
+            update(contacts)
+            .where(contacts.c.id == contact_id, or_(*empty))
+            .values(**values, updated_at=datetime.utcnow())
+            .returning(*contacts.c)
+        )
+        async with self.db.transaction() as conn:
+            result = await conn.execute(query)
+            row = result.mappings().first()
+        return dict(row) if row else None
+
+
+class ActivityRepository:
+    """Append-only contact activity log."""
+    
+    def __init__(self, db: Database):
+        self.db = db
+    
+    async def append(
+        self,
+        activities: Dict[str, List[Dict[str, Any]]],
+        fold: Callable[[Dict[str, Any], List[Dict[str, Any]]], Dict[str, Any]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Log activities and fold them into their contacts in one transaction.
+        
+        activities maps contact ID to activity rows. fold(contact, rows)
+        returns the contact columns to write, and must return the same
+        columns for every contact. Contact rows are locked in ID order while
+        folding, so concurrent writers for a contact apply in turn. Each
+        activity is given its ID in place. Returns the updated contacts by
+        ID; activities for unknown contacts are dropped.
+        """
+        if not activities:
+            return {}
+        now = datetime.utcnow()
+        async with self.db.transaction() as conn:
+            result = await conn.execute(
+                select(contacts)
+                .where(contacts.c.id.in_(list(activities)))
+                .order_by(contacts.c.id)
+                .with_for_update()
+            )
+            locked = {row["id"]: dict(row) for row in result.mappings()}
+            changes = {
+                contact_id: {**fold(contact, activities[contact_id]), "updated_at": now}
+                for contact_id, contact in locked.items()
+            }
+            if not changes:
+                return {}
+            
+            rows = []
+            for contact_id in changes:
+                for activity in activities[contact_id]:
+                    activity.setdefault("id", _new_id("act"))
+                    activity.setdefault("details", {})
+                    rows.append({**activity, "contact_id": contact_id})
+            await conn.execute(insert(contact_activities), rows)
+            
+            columns = list(next(iter(changes.values())))
+            await conn.execute(
+                update(contacts)
+                .where(contacts.c.id == bindparam("_id"))
+                .values({name: bindparam(name) for name in columns}),
+                [{"_id": contact_id, **values} for contact_id, values in changes.items()],
+            )
+        return {contact_id: {**locked[contact_id], **values} for contact_id, values in changes.items()}
+    
+    async def timeline(self, contact_id: str, cursor: Optional[str] = None, limit: int = 50) -> Page:
+        """A contact's activities newest-first; raises ValueError for a bad cursor."""
+        query = select(contact_activities).where(contact_activities.c.contact_id == contact_id)
+        query = _keyset(query, contact_activities, cursor, limit, time_column="occurred_at")
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return _page([dict(row) for row in result.mappings()], limit, time_column="occurred_at")
+    
+    async def points(self, contact_id: str) -> List[Tuple[float, datetime]]:
+        """(points, occurred_at) for every activity of a contact, oldest first."""
+        query = (
+            select(contact_activities.c.points, contact_activities.c.occurred_at)
+            .where(contact_activities.c.contact_id == contact_id)
+            .order_by(contact_activities.c.occurred_at, contact_activities.c.id)
+        )
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return [tuple(row) for row in result]
+
+
+class DealRepository:
+    """Persistence for deals."""
+    
+    def __init__(self, db: Database):
+        self.db = db
+    
+    async def get(self, deal_id: str) -> Optional[Dict[str, Any]]:
+        async with self.db.connection() as conn:
+            result = await conn.execute(_GET_DEAL, {"deal_id": deal_id})
+            row = result.mappings().first()
+        return dict(row) if row else None
+    
+    async def list(
+        self,
+        stage: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        min_value: Optional[float] = None,
+        account_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Page:
+        """List deals newest-first; raises ValueError for a bad cursor."""
+        query = select(deals)
+        if stage is not None:
+            query = query.where(deals.c.stage == stage)
+        if owner_id is not None:
+            query = query.where(deals.c.owner_id == owner_id)
+        if min_value is not None:
+            query = query.where(deals.c.value >= min_value)
+        if account_id is not None:
+            query = query.where(deals.c.account_id == account_id)
+        query = _keyset(query, deals, cursor, limit)
+        
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return _page([dict(row) for row in result.mappings()], limit)
+    
+    def stream(
+        self,
+        stage: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        min_value: Optional[float] = None,
+        batch_size: Optional[int] = None,
+    ) -> AsyncIterator[List[Tuple]]:
+        """Stream deals as partitions of DEAL_EXPORT_COLUMNS tuples."""
+        query = select(*(deals.c[name] for name in DEAL_EXPORT_COLUMNS))
+        if stage is not None:
+            query = query.where(deals.c.stage == stage)
+        if owner_id is not None:
+            query = query.where(deals.c.owner_id == owner_id)
+        if min_value is not None:
+            query = query.where(deals.c.value >= min_value)
+        return _stream_partitions(self.db, query, batch_size)
+    
+    async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        row = {
+            "id": _new_id("deal"),
+            **data,
+            "created_at": now,
+            "updated_at": now,
+        }
+        async with self.db.transaction() as conn:
+            await conn.execute(insert(deals).values(**row))
+        return row
+    
+    async def update(self, deal_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        values = {**data, "updated_at": datetime.utcnow()}
+        query = (
+            update(deals)
+            .where(deals.c.id == deal_id)
+            .values(**values)
+            .returning(*deals.c)
+        )
+        async with self.db.transaction() as conn:
+            result = await conn.execute(query)
+            row = result.mappings().first()
+        return dict(row) if row else None
+    
+    async def update_with_previous(
+        self, deal_id: str, data: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Update a deal and return its (before, after) rows, or (None, None).
+        
+        The row is locked between the read and the write, so callers keeping
+        derived state can apply the exact difference.
+        """
+        values = {**data, "updated_at": datetime.utcnow()}
+        async with self.db.transaction() as conn:
+            result = await conn.execute(
+                select(deals).where(deals.c.id == deal_id).with_for_update()
+            )
+            before = result.mappings().first()
+            if before is None:
+                return None, None
+            result = await conn.execute(
+                update(deals).where(deals.c.id == deal_id).values(**values).returning(*deals.c)
+            )
+            after = result.mappings().first()
+        return dict(before), dict(after)
+    
+    async def get_many(self, deal_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch deals by ID, in the order given; missing IDs are skipped."""
+        if not deal_ids:
+            return []
+        async with self.db.connection() as conn:
+            result = await conn.execute(select(deals).where(deals.c.id.in_(deal_ids)))
+            rows = {row["id"]: dict(row) for row in result.mappings()}
+        return [rows[deal_id] for deal_id in deal_ids if deal_id in rows]
+    
+    async def activity_times(self, exclude_stages: Tuple[str, ...] = ()) -> List[Tuple[datetime, str]]:
+        """(updated_at, id) for every deal outside exclude_stages."""
+        query = select(deals.c.updated_at, deals.c.id)
+        if exclude_stages:
+            query = query.where(deals.c.stage.not_in(exclude_stages))
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return [tuple(row) for row in result]
+    
+    async def forecast_inputs(self, exclude_stages: Tuple[str, ...] = ()) -> List[Tuple[float, int, Optional[str]]]:
+        """(value, probability, close_date) for every deal outside exclude_stages."""
+        query = select(deals.c.value, deals.c.probability, deals.c.close_date)
+        if exclude_stages:
+            query = query.where(deals.c.stage.not_in(exclude_stages))
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return [tuple(row) for row in result]
+    
+    async def stage_totals(self) -> List[Dict[str, Any]]:
+        """Per-stage deal count, total value and probability-weighted value."""
+        query = select(
+            deals.c.stage,
+            func.count().label("count"),
+            func.coalesce(func.sum(deals.c.value), 0.0).label("value"),
+            func.coalesce(func.sum(deals.c.value * deals.c.probability / 100.0), 0.0).label("weighted_value"),
+        ).group_by(deals.c.stage)
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return [dict(row) for row in result.mappings()]
+
+
+class AccountRepository:
+    """Persistence for accounts."""
+    
+    def __init__(self, db: Database):
+        self.db = db
+    
+    async def get(self, account_id: str) -> Optional[Dict[str, Any]]:
+        async with self.db.connection() as conn:
+            result = await conn.execute(_GET_ACCOUNT, {"account_id": account_id})
+            row = result.mappings().first()
+        return dict(row) if row else None
+    
+    async def list(
+        self,
+        industry: Optional[str] = None,
+        size: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Page:
+        """List accounts newest-first; raises ValueError for a bad cursor."""
+        query = select(accounts)
+        if industry is not None:
+            query = query.where(accounts.c.industry == industry)
+        if size is not None:
+            query = query.where(accounts.c.size == size)
+        query = _keyset(query, accounts, cursor, limit)
+        
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return _page([dict(row) for row in result.mappings()], limit)
+    
+    async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        row = {
+            "id": _new_id("acc"),
+            "health_score": 75,
+            "total_deal_value": 0.0,
+            "contact_count": 0,
+            "engagement_raw": 0.0,
+            "nps_promoters": 0,
+            "nps_detractors": 0,
+            "nps_responses": 0,
+            "open_tickets": 0,
+            "health_factors": {},
+            **data,
+            "created_at": now,
+            "updated_at": now,
+        }
+        async with self.db.transaction() as conn:
+            await conn.execute(insert(accounts).values(**row))
+        return row
+    
+    async def apply_rollups(
+        self,
+        changes: Dict[str, Any],
+        fold: Callable[[Dict[str, Any], Any], Dict[str, Any]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Fold pending rollup changes into their accounts in one transaction.
+        
+        changes maps account ID to whatever fold(account, change) needs to
+        return the account columns to write; fold must return the same
+        columns for every account. Account rows are locked in ID order while
+        folding. Returns the updated accounts by ID; unknown IDs are skipped.
+        """
+        if not changes:
+            return {}
+        async with self.db.transaction() as conn:
+            result = await conn.execute(
+                select(accounts)
+                .where(accounts.c.id.in_(list(changes)))
+                .order_by(accounts.c.id)
+                .with_for_update()
+            )
+            locked = {row["id"]: dict(row) for row in result.mappings()}
+            values = {account_id: fold(account, changes[account_id]) for account_id, account in locked.items()}
+            if not values:
+                return {}
+            columns = list(next(iter(values.values())))
+            await conn.execute(
+                update(accounts)
+                .where(accounts.c.id == bindparam("_id"))
+                .values({name: bindparam(name) for name in columns}),
+                [{"_id": account_id, **row} for account_id, row in values.items()],
+            )
+        return {account_id: {**locked[account_id], **row} for account_id, row in values.items()}
+    
+    async def recount(self, lost_stage: str = "closed_lost") -> int:
+        """
+        Recompute contact_count and total_deal_value of every account from
+        the contacts and deals tables; deals in lost_stage do not count.
+        Returns the number of accounts updated.
+        """
+        contact_count = (
+            select(func.count())
+            .where(contacts.c.account_id == accounts.c.id)
+            .scalar_subquery()
+        )
+        deal_value = (
+            select(func.coalesce(func.sum(deals.c.value), 0.0))
+            .where(deals.c.account_id == accounts.c.id, deals.c.stage != lost_stage)
+            .scalar_subquery()
+        )
+        async with self.db.transaction() as conn:
+            result = await conn.execute(
+                update(accounts).values(contact_count=contact_count, total_deal_value=deal_value)
+            )
+            return result.rowcount
+
+
+class SyncWatermarkRepository:
+    """Persistent sync high-water marks per (source, target, object type)."""
+    
+    def __init__(self, db: Database):
+        self.db = db
+    
+    async def get(self, source: str, target: str, object_type: str) -> Optional[datetime]:
+        query = select(sync_watermarks.c.high_water_mark).where(
+            sync_watermarks.c.source == source,
+            sync_watermarks.c.target == target,
+            sync_watermarks.c.object_type == object_type,
+        )
+        async with self.db.connection() as conn:
+            return (await conn.execute(query)).scalar_one_or_none()
+    
+    async def set(self, source: str, target: str, object_type: str, mark: datetime):
+        query = _upsert_insert(self.db, sync_watermarks)
+        query = query.values(
+            source=source,
+            target=target,
+            object_type=object_type,
+            high_water_mark=mark,
+            updated_at=datetime.utcnow(),
+        ).on_conflict_do_update(
+            index_elements=[sync_watermarks.c.source, sync_watermarks.c.target, sync_watermarks.c.object_type],
+            set_={"high_water_mark": mark, "updated_at": datetime.utcnow()},
+        )
+        async with self.db.transaction() as conn:
+            await conn.execute(query)
+
+
+class SyncStateRepository:
+    """
+    Per-record sync state: the field hashes of each CRM record as of its
+    last successful sync with a peer CRM, and as last read, plus the values
+    last read of the fields changed since that sync.
+    """
+    
+    def __init__(self, db: Database):
+        self.db = db
+    
+    async def get_many(
+        self, system: str, peer_system: str, object_type: str, record_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """State by record ID; records never synced are absent."""
+        if not record_ids:
+            return {}
+        query = select(
+            sync_record_state.c.record_id,
+            sync_record_state.c.peer_id,
+            sync_record_state.c.synced,
+            sync_record_state.c.observed,
+            sync_record_state.c.changed,
+        ).where(
+            sync_record_state.c.system == system,
+            sync_record_state.c.peer_system == peer_system,
+            sync_record_state.c.object_type == object_type,
+            sync_record_state.c.record_id.in_(record_ids),
+        )
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return {
+                row["record_id"]: {
+                    "peer_id": row["peer_id"],
+                    "synced": row["synced"],
+                    "observed": row["observed"],
+                    "changed": row["changed"] or {},
+                }
+                for row in result.mappings()
+            }
+    
+    async def put_many(
+        self, system: str, peer_system: str, object_type: str, states: Dict[str, Dict[str, Any]]
+    ):
+        """Insert or replace the state of each record ID."""
+        if not states:
+            return
+        now = datetime.utcnow()
+        query = _upsert_insert(self.db, sync_record_state)
+        query = query.on_conflict_do_update(
+            index_elements=[
+                sync_record_state.c.system,
+                sync_record_state.c.peer_system,
+                sync_record_state.c.object_type,
+                sync_record_state.c.record_id,
+            ],
+            set_={name: query.excluded[name] for name in ("peer_id", "synced", "observed", "changed", "updated_at")},
+        )
+        rows = [
+            {
+                "system": system,
+                "peer_system": peer_system,
+                "object_type": object_type,
+                "record_id": record_id,
+                "peer_id": state["peer_id"],
+                "synced": state["synced"],
+                "observed": state["observed"],
+                "changed": state.get("changed", {}),
+                "updated_at": now,
+            }
+            for record_id, state in states.items()
+        ]
+        async with self.db.transaction() as conn:
+            await conn.execute(query, rows)
+
+
+class SyncConflictRepository:
+    """Field-level sync conflicts awaiting or after resolution."""
+    
+    def __init__(self, db: Database):
+        self.db = db
+    
+    async def add(self, conflicts: List[Dict[str, Any]]):
+        """Store conflicts, giving each its ID in place."""
+        if not conflicts:
+            return
+        for conflict in conflicts:
+            conflict.setdefault("id", _new_id("cfl"))
+        async with self.db.transaction() as conn:
+            await conn.execute(insert(sync_conflicts), conflicts)
+    
+    async def get(self, conflict_id: str) -> Optional[Dict[str, Any]]:
+        query = select(sync_conflicts).where(sync_conflicts.c.id == conflict_id)
+        async with self.db.connection() as conn:
+            row = (await conn.execute(query)).mappings().first()
+            return dict(row) if row else None
+    
+    async def list_open(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Unresolved conflicts, oldest first."""
+        query = (
+            select(sync_conflicts)
+            .where(sync_conflicts.c.status == "open")
+            .order_by(sync_conflicts.c.created_at, sync_conflicts.c.id)
+            .limit(limit)
+        )
+        async with self.db.connection() as conn:
+            result = await conn.execute(query)
+            return [dict(row) for row in result.mappings()]
+    
+    async def resolve(self, conflict_id: str, resolution: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Close an open conflict; returns None if it is not open."""
+        query = (
+            update(sync_conflicts)
+            .where(sync_conflicts.c.id == conflict_id, sync_conflicts.c.status == "open")
+            .values(status="resolved", resolution=resolution, resolved_value=value, resolved_at=datetime.utcnow())
+            .returning(*sync_conflicts.c)
+        )
+        async with self.db.transaction() as conn:
+            row = (await conn.execute(query)).mappings().first()
+            return dict(row) if row else None
+    
+    async def reopen(self, conflict_id: str):
+        """Return a resolved conflict to review, e.g. when applying its resolution failed."""
+        query = (
+            update(sync_conflicts)
+            .where(sync_conflicts.c.id == conflict_id, sync_conflicts.c.status == "resolved")
+            .values(status="open", resolution=None, resolved_value=None, resolved_at=None)
+        )
+        async with self.db.transaction() as conn:
+            await conn.execute(query)
+
+
+contact_repository = ContactRepository(database)
+activity_repository = ActivityRepository(database)
+deal_repository = DealRepository(database)
+account_repository = AccountRepository(database)
+sync_watermark_repository = SyncWatermarkRepository(database)
+sync_state_repository = SyncStateRepository(database)
+sync_conflict_repository = SyncConflictRepository(database)
@@ -0,0 +1,144 @@
+"""
+Stale deal index and rot alerts.
+"""
+
+from typing import Dict, Any, List, Optional, Set, Tuple
+from bisect import bisect_left, insort
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import asyncio
+import logging
+
+from src.core.config import settings
+from src.services.pipeline import CLOSED_STAGES
+from src.services.repositories import DealRepository, deal_repository
+
+logger = logging.getLogger(__name__)
+
+ActivityKey = Tuple[datetime, str]
+
+
+@dataclass
+class RotAlert:
+    deal_id: str
+    last_activity: datetime
+    days_idle: float
+    raised_at: datetime
+
+
+class StaleDealIndex:
+    """
+    Open deals ordered by last activity.
+    
+    Keys are (last_activity, deal_id) in a sorted list, so the deals idle
+    longer than a threshold are always a prefix found by bisection. Deal
+    writes move their deal within the index; closing a deal removes it.
+    
+    sweep() raises a rot alert once per period of inactivity: each run only
+    reads the slice of keys that crossed the threshold since the previous
+    run, plus deals indexed with an activity time already past it.
+    """
+    
+    def __init__(self, repository: Optional[DealRepository] = None):
+        self.repository = repository or deal_repository
+        self._keys: List[ActivityKey] = []
+        self._activity: Dict[str, datetime] = {}
+        self._swept_until: Optional[datetime] = None
+        self._late: Set[str] = set()
+        self.recent_alerts: deque = deque(maxlen=settings.deal_rot_alert_history)
+        self._sweeper: Optional[asyncio.Task] = None
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def _remove(self, deal_id: str):
+        last_activity = self._activity.pop(deal_id, None)
+        if last_activity is None:
+            return
+        index = bisect_left(self._keys, (last_activity, deal_id))
+        del self._keys[index]
+        self._late.discard(deal_id)
+    
+    def touch(self, deal: Dict[str, Any]):
+        """Re-index a deal after a write."""
+        self._remove(deal["id"])
+        if deal["stage"] in CLOSED_STAGES:
+            return
+        self._activity[deal["id"]] = deal["updated_at"]
+        insort(self._keys, (deal["updated_at"], deal["id"]))
+        if self._swept_until is not None and deal["updated_at"] < self._swept_until:
+            self._late.add(deal["id"])
+    
+    async def rebuild(self, now: Optional[datetime] = None):
+        """
+        Load every open deal's activity time from the database.
+        
+        The first rebuild seeds the sweep cursor at the current threshold:
+        deals already stale were alerted before the restart, so only deals
+        that cross it from now on raise alerts.
+        """
+        keys = await self.repository.activity_times(exclude_stages=CLOSED_STAGES)
+        keys.sort()
+        self._keys = keys
+        self._activity = {deal_id: last_activity for last_activity, deal_id in keys}
+        self._late.clear()
+        if self._swept_until is None:
+            now = now or datetime.utcnow()
+            self._swept_until = now - timedelta(days=settings.deal_rot_threshold_days)
+    
+    def stale(self, threshold_days: float, limit: int, now: Optional[datetime] = None) -> Tuple[int, List[ActivityKey]]:
+        """Count of deals idle past the threshold, and the limit most idle."""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=threshold_days)
+        end = bisect_left(self._keys, (cutoff, ""))
+        return end, self._keys[:min(end, limit)]
+    
+    def sweep(self, now: Optional[datetime] = None) -> List[RotAlert]:
+        """Raise alerts for deals that went stale since the previous sweep."""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=settings.deal_rot_threshold_days)
+        end = bisect_left(self._keys, (cutoff, ""))
+        if self._swept_until is None:
+            start = 0
+        else:
+            start = bisect_left(self._keys, (self._swept_until, ""))
+        crossed = self._keys[start:end]
+        late = [(self._activity[deal_id], deal_id) for deal_id in self._late]
+        self._late.clear()
+        self._swept_until = max(cutoff, self._swept_until or cutoff)
+        
+        alerts = [
+            RotAlert(
+                deal_id=deal_id,
+                last_activity=last_activity,
+                days_idle=round((now - last_activity).total_seconds() / 86400, 2),
+                raised_at=now,
+            )
+            for last_activity, deal_id in sorted(late) + crossed
+            if last_activity < cutoff
+        ]
+        self.recent_alerts.extend(alerts)
+        for alert in alerts:
+            logger.info("Deal %s has been idle %.1f days", alert.deal_id, alert.days_idle)
+        return alerts
+    
+    def start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._run_sweeper())
+    
+    async def stop_sweeper(self):
+        sweeper, self._sweeper = self._sweeper, None
+        if sweeper is not None:
+            sweeper.cancel()
+            await asyncio.gather(sweeper, return_exceptions=True)
+    
+    async def _run_sweeper(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Stale deal sweep failed")
+            await asyncio.sleep(settings.deal_rot_sweep_interval_seconds)
+
+
+stale_deal_index = StaleDealIndex()
@@ -0,0 +1,785 @@
+"""
+CRM sync engine.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator, Tuple, Protocol
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+
+from src.core.config import settings
+from src.services.crm_adapters import BaseCRMAdapter, BatchResult, create_adapter
+from src.services.field_mapping import CompiledMapping, FieldMappingRegistry, compile_mapping
+from src.services.repositories import sync_watermark_repository, sync_state_repository, sync_conflict_repository
+
+logger = logging.getLogger(__name__)
+
+Record = Dict[str, Any]
+PageReader = Callable[..., Awaitable[List[Record]]]
+BatchWriter = Callable[[List[Record]], Awaitable[BatchResult]]
+
+# Sentinel marking the end of a pipeline stage's output.
+_DONE = object()
+
+# Keep only the most recent error messages per job.
+_MAX_ERROR_MESSAGES = 20
+
+# object type -> (full page reader, delta page reader, target batch writer)
+_OBJECT_METHODS = {
+    "contacts": ("get_contacts", "get_contacts_modified_since", "upsert_contacts"),
+    "deals": ("get_deals", "get_deals_modified_since", "upsert_deals"),
+}
+
+# What happens to a field changed on both sides since the last sync:
+# overwrite the target, keep the target's value, or hold it for review.
+CONFLICT_POLICIES = ("source_wins", "target_wins", "manual")
+
+# Ways to settle a held conflict; custom writes a given value to both sides.
+CONFLICT_RESOLUTIONS = ("source_wins", "target_wins", "custom")
+
+
+def field_hash(value: Any) -> str:
+    """Short, stable digest of a field value."""
+    payload = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+class WatermarkStore(Protocol):
+    async def get(self, source: str, target: str, object_type: str) -> Optional[datetime]:
+        ...
+    
+    async def set(self, source: str, target: str, object_type: str, mark: datetime):
+        ...
+
+
+class InMemoryWatermarkStore:
+    """High-water marks kept for the life of the process."""
+    
+    def __init__(self):
+        self.marks: Dict[Tuple[str, str, str], datetime] = {}
+    
+    async def get(self, source: str, target: str, object_type: str) -> Optional[datetime]:
+        return self.marks.get((source, target, object_type))
+    
+    async def set(self, source: str, target: str, object_type: str, mark: datetime):
+        self.marks[(source, target, object_type)] = mark
+
+
+class SyncStateStore(Protocol):
+    async def get_many(
+        self, system: str, peer_system: str, object_type: str, record_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        ...
+    
+    async def put_many(
+        self, system: str, peer_system: str, object_type: str, states: Dict[str, Dict[str, Any]]
+    ):
+        ...
+
+
+class InMemorySyncStateStore:
+    """Per-record sync state kept for the life of the process."""
+    
+    def __init__(self):
+        self.states: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+    
+    async def get_many(
+        self, system: str, peer_system: str, object_type: str, record_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for record_id in record_ids:
+            state = self.states.get((system, peer_system, object_type, record_id))
+            if state is not None:
+                found[record_id] = {
+                    **state,
+                    "synced": dict(state["synced"]),
+                    "observed": dict(state["observed"]),
+                    "changed": dict(state.get("changed", {})),
+                }
+        return found
+    
+    async def put_many(
+        self, system: str, peer_system: str, object_type: str, states: Dict[str, Dict[str, Any]]
+    ):
+        for record_id, state in states.items():
+            self.states[(system, peer_system, object_type, record_id)] = state
+
+
+class ConflictStore(Protocol):
+    async def add(self, conflicts: List[Dict[str, Any]]):
+        ...
+    
+    async def get(self, conflict_id: str) -> Optional[Dict[str, Any]]:
+        ...
+    
+    async def list_open(self, limit: int = 50) -> List[Dict[str, Any]]:
+        ...
+    
+    async def resolve(self, conflict_id: str, resolution: str, value: Any) -> Optional[Dict[str, Any]]:
+        ...
+    
+    async def reopen(self, conflict_id: str):
+        ...
+
+
+class InMemoryConflictStore:
+    """Sync conflicts kept for the life of the process."""
+    
+    def __init__(self):
+        self.conflicts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
+    async def add(self, conflicts: List[Dict[str, Any]]):
+        for conflict in conflicts:
+            conflict.setdefault("id", f"cfl_{uuid.uuid4().hex[:12]}")
+            self.conflicts[conflict["id"]] = dict(conflict)
+    
+    async def get(self, conflict_id: str) -> Optional[Dict[str, Any]]:
+        conflict = self.conflicts.get(conflict_id)
+        return dict(conflict) if conflict else None
+    
+    async def list_open(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return [dict(c) for c in self.conflicts.values() if c["status"] == "open"][:limit]
+    
+    async def resolve(self, conflict_id: str, resolution: str, value: Any) -> Optional[Dict[str, Any]]:
+        conflict = self.conflicts.get(conflict_id)
+        if conflict is None or conflict["status"] != "open":
+            return None
+        conflict.update(status="resolved", resolution=resolution, resolved_value=value, resolved_at=datetime.utcnow())
+        return dict(conflict)
+    
+    async def reopen(self, conflict_id: str):
+        conflict = self.conflicts.get(conflict_id)
+        if conflict is not None and conflict["status"] == "resolved":
+            conflict.update(status="open", resolution=None, resolved_value=None, resolved_at=None)
+
+
+@dataclass
+class _PendingState:
+    """Sync state to store for a source record once its write succeeds."""
+    record_id: str
+    peer_id: Optional[str]
+    source: Dict[str, Any]
+    peer: Dict[str, Any]
+
+
+@dataclass
+class SyncJob:
+    sync_id: str
+    source: str
+    target: str
+    objects: List[str]
+    field_mapping: Dict[str, Dict[str, str]]
+    conflict_resolution: str
+    full_resync: bool = False
+    status: str = "pending"
+    records_read: int = 0
+    records_skipped: int = 0
+    records_synced: int = 0
+    conflicts: int = 0
+    errors: int = 0
+    error_messages: List[str] = field(default_factory=list)
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+    
+    @property
+    def throughput(self) -> float:
+        """Records synced per second so far."""
+        elapsed = ((self.completed_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return self.records_synced / elapsed if elapsed > 0 else 0.0
+    
+    def record_error(self, message: str):
+        self.errors += 1
+        self.error_messages.append(message)
+        del self.error_messages[:-_MAX_ERROR_MESSAGES]
+    
+    def to_status(self) -> Dict[str, Any]:
+        return {
+            "sync_id": self.sync_id,
+            "source": self.source,
+            "target": self.target,
+            "status": self.status,
+            "mode": "full" if self.full_resync else "incremental",
+            "records_read": self.records_read,
+            "records_skipped": self.records_skipped,
+            "records_synced": self.records_synced,
+            "conflicts": self.conflicts,
+            "errors": self.errors,
+            "throughput": round(self.throughput, 2),
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+        }
+
+
+class SyncEngine:
+    """
+    Runs sync jobs as a bounded producer/consumer pipeline.
+    
+    For each object type, source pages are fetched, mapped and upserted by
+    separate tasks connected through bounded queues. Fetching the next page
+    overlaps with writing the previous ones, and a slow target applies
+    backpressure to the source reader once the queues fill up.
+    
+    Runs are incremental by default: only records modified after the
+    high-water mark of the last clean run are read (server-side when the
+    adapter supports delta queries) and written.
+    
+    Each synced record keeps a hash per field as of its last sync, so a
+    run tells unchanged records, one-sided changes and conflicts apart by
+    comparing hashes alone; unchanged records never reach the target.
+    """
+    
+    def __init__(
+        self,
+        adapter_factory: Callable[[str], BaseCRMAdapter] = create_adapter,
+        watermarks: Optional[WatermarkStore] = None,
+        states: Optional[SyncStateStore] = None,
+        conflicts: Optional[ConflictStore] = None,
+        mappings: Optional[FieldMappingRegistry] = None,
+    ):
+        self.adapter_factory = adapter_factory
+        self.watermarks: WatermarkStore = watermarks or InMemoryWatermarkStore()
+        self.states: SyncStateStore = states or InMemorySyncStateStore()
+        self.conflicts: ConflictStore = conflicts or InMemoryConflictStore()
+        self.mappings = mappings or FieldMappingRegistry()
+        self.adapters: Dict[str, BaseCRMAdapter] = {}
+        self.jobs: "OrderedDict[str, SyncJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+    
+    def register_adapter(self, name: str, adapter: BaseCRMAdapter):
+        self.adapters[name] = adapter
+    
+    def get_adapter(self, name: str) -> BaseCRMAdapter:
+        """Return a registered adapter, building one from settings if needed."""
+        if name not in self.adapters:
+            self.adapters[name] = self.adapter_factory(name)
+        return self.adapters[name]
+    
+    def start(
+        self,
+        source: str,
+        target: str,
+        objects: List[str],
+        field_mapping: Optional[Dict[str, Dict[str, str]]] = None,
+        conflict_resolution: Optional[str] = None,
+        full_resync: bool = False,
+    ) -> SyncJob:
+        """
+        Create a sync job and run it in the background.
+        
+        field_mapping overrides the configured mapping per object type.
+        With full_resync every record is read regardless of high-water marks.
+        Raises ValueError if either CRM or the conflict policy is not
+        supported, or a field mapping does not compile.
+        """
+        self.get_adapter(source)
+        self.get_adapter(target)
+        for mapping in (field_mapping or {}).values():
+            compile_mapping(mapping)
+        conflict_resolution = conflict_resolution or settings.conflict_resolution
+        if conflict_resolution not in CONFLICT_POLICIES:
+            raise ValueError(f"Unsupported conflict resolution: {conflict_resolution}")
+        
+        job = SyncJob(
+            sync_id=f"sync_{uuid.uuid4().hex[:12]}",
+            source=source,
+            target=target,
+            objects=objects,
+            field_mapping=field_mapping or {},
+            conflict_resolution=conflict_resolution,
+            full_resync=full_resync,
+        )
+        self._remember(job)
+        
+        task = asyncio.create_task(self.run(job))
+        self._tasks[job.sync_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.sync_id, None))
+        return job
+    
+    def _remember(self, job: SyncJob):
+        self.jobs[job.sync_id] = job
+        while len(self.jobs) > settings.sync_history_size:
+            self.jobs.popitem(last=False)
+    
+    def get_job(self, sync_id: str) -> Optional[SyncJob]:
+        return self.jobs.get(sync_id)
+    
+    async def wait(self, sync_id: str) -> Optional[SyncJob]:
+        """Wait for a background job started with start() to finish."""
+        task = self._tasks.get(sync_id)
+        if task:
+            await asyncio.shield(task)
+        return self.jobs.get(sync_id)
+    
+    def history(self, limit: int = 20) -> List[SyncJob]:
+        """Most recent jobs first."""
+        return list(reversed(self.jobs.values()))[:limit]
+    
+    async def run(self, job: SyncJob) -> SyncJob:
+        """Run every object type of a job through the pipeline."""
+        source = self.get_adapter(job.source)
+        target = self.get_adapter(job.target)
+        job.status = "running"
+        
+        try:
+            for object_type in job.objects:
+                if object_type not in _OBJECT_METHODS:
+                    job.record_error(f"Unsupported object type: {object_type}")
+                    continue
+                await self._sync_object(job, source, target, object_type)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.record_error(str(e))
+            logger.exception("Sync %s failed", job.sync_id)
+        finally:
+            job.completed_at = datetime.utcnow()
+        
+        logger.info(
+            "Sync %s %s: %d read, %d synced, %d errors",
+            job.sync_id, job.status, job.records_read, job.records_synced, job.errors,
+        )
+        return job
+    
+    async def _sync_object(
+        self,
+        job: SyncJob,
+        source: BaseCRMAdapter,
+        target: BaseCRMAdapter,
+        object_type: str,
+    ):
+        write: BatchWriter = getattr(target, _OBJECT_METHODS[object_type][2])
+        mapping = self.mappings.compiled(job.source, job.target, object_type, job.field_mapping.get(object_type))
+        workers = settings.sync_upsert_workers
+        
+        since = None
+        if not job.full_resync:
+            since = await self.watermarks.get(job.source, job.target, object_type)
+        high_water_mark = since
+        errors_before = job.errors
+        await self._observe(job, target, object_type)
+        
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=settings.sync_queue_depth)
+        mapped: asyncio.Queue = asyncio.Queue(maxsize=settings.sync_queue_depth)
+        
+        async def fetch():
+            nonlocal high_water_mark
+            async for page in self._read_pages(source, object_type, since):
+                job.records_read += len(page)
+                for record in page:
+                    modified = source.record_modified_at(record)
+                    if modified and (high_water_mark is None or modified > high_water_mark):
+                        high_water_mark = modified
+                await fetched.put(page)
+            await fetched.put(_DONE)
+        
+        async def transform():
+            while (page := await fetched.get()) is not _DONE:
+                if since:
+                    changed = self._changed_since(source, page, since)
+                    job.records_skipped += len(page) - len(changed)
+                    page = changed
+                await mapped.put(await self._diff(job, source, target, object_type, page, mapping))
+            for _ in range(workers):
+                await mapped.put(_DONE)
+        
+        async def upsert():
+            while (item := await mapped.get()) is not _DONE:
+                records, pending = item
+                result = await self._write_page(job, write, records)
+                if result is not None:
+                    await self._commit(job, object_type, pending, result)
+        
+        tasks = [
+            asyncio.create_task(fetch()),
+            asyncio.create_task(transform()),
+            *(asyncio.create_task(upsert()) for _ in range(workers)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Only advance past records that all made it to the target, so
+        # failed writes are retried on the next run.
+        if job.errors == errors_before and high_water_mark and high_water_mark != since:
+            await self.watermarks.set(job.source, job.target, object_type, high_water_mark)
+    
+    async def _read_pages(
+        self, adapter: BaseCRMAdapter, object_type: str, since: Optional[datetime]
+    ) -> AsyncIterator[List[Record]]:
+        """
+        Read a CRM's records page by page: every record, or with since and
+        the CRM's delta query, those modified at or after since.
+        
+        Delta pages follow on from the (modified, ID) key of the last record
+        read, not an offset, so a record edited mid-run moves behind the
+        cursor instead of shifting unread records past it. Reading from since
+        inclusive re-reads records sharing the watermark's timestamp rather
+        than losing those not yet read; the unchanged ones are skipped by
+        their field hashes.
+        """
+        full_name, delta_name, _ = _OBJECT_METHODS[object_type]
+        batch_size = settings.sync_batch_size
+        if since is None or not adapter.supports_delta:
+            read: PageReader = getattr(adapter, full_name)
+            offset = 0
+            while page := await read(limit=batch_size, offset=offset):
+                yield page
+                if len(page) < batch_size:
+                    return
+                offset += len(page)
+            return
+        
+        read = getattr(adapter, delta_name)
+        after_id = None
+        while page := await read(since, limit=batch_size, after_id=after_id):
+            yield page
+            if len(page) < batch_size:
+                return
+            last = page[-1]
+            since, after_id = adapter.record_modified_at(last), last.get(adapter.id_field)
+            if since is None or after_id is None:
+                raise ValueError(
+                    f"{type(adapter).__name__} delta records must carry {adapter.modified_field} and {adapter.id_field}"
+                )
+            after_id = str(after_id)
+    
+    async def _observe(self, job: SyncJob, target: BaseCRMAdapter, object_type: str):
+        """
+        Record the field hashes of target records changed since the target
+        was last read as a source, so conflicts are judged on its current
+        values, and the values of fields changed since their last sync, so a
+        conflict can show both sides. Needs the target's delta query and a
+        reverse run to start from; otherwise target changes are known as of
+        that last read.
+        """
+        if not target.supports_delta:
+            return
+        since = await self.watermarks.get(job.target, job.source, object_type)
+        if since is None:
+            return
+        async for page in self._read_pages(target, object_type, since):
+            records = {
+                str(record[target.id_field]): {
+                    name: value
+                    for name, value in record.items()
+                    if name not in (target.id_field, target.modified_field)
+                }
+                for record in page
+                if record.get(target.id_field) is not None
+            }
+            states = await self.states.get_many(job.target, job.source, object_type, list(records))
+            for record_id, state in states.items():
+                values = records[record_id]
+                state["observed"] = {name: field_hash(value) for name, value in values.items()}
+                state["changed"] = {
+                    name: values[name]
+                    for name, digest in state["observed"].items()
+                    if state["synced"].get(name) != digest
+                }
+            await self.states.put_many(job.target, job.source, object_type, states)
+    
+    def _changed_since(
+        self,
+        source: BaseCRMAdapter,
+        records: List[Record],
+        since: datetime,
+    ) -> List[Record]:
+        """Drop records modified before since; undated records are kept."""
+        changed = []
+        for record in records:
+            modified = source.record_modified_at(record)
+            if modified is None or modified >= since:
+                changed.append(record)
+        return changed
+    
+    def _map_page(
+        self,
+        job: SyncJob,
+        records: List[Record],
+        mapping: Optional[CompiledMapping],
+    ) -> List[Optional[Record]]:
+        """
+        Map a page in one call. If a coercion fails, map it record by
+        record instead; records that fail become job errors and None.
+        """
+        if mapping is None:
+            return records
+        try:
+            return mapping.transform(records)
+        except ValueError:
+            pass
+        mapped: List[Optional[Record]] = []
+        for record in records:
+            try:
+                mapped.extend(mapping.transform([record]))
+            except ValueError as e:
+                job.record_error(str(e))
+                mapped.append(None)
+        return mapped
+    
+    async def _diff(
+        self,
+        job: SyncJob,
+        source: BaseCRMAdapter,
+        target: BaseCRMAdapter,
+        object_type: str,
+        records: List[Record],
+        mapping: Optional[CompiledMapping],
+    ) -> Tuple[List[Record], List[Optional[_PendingState]]]:
+        """
+        Compare a page with the field hashes of its last sync.
+        
+        Records without an ID, or not yet linked to a target record, are
+        written whole. Records whose fields all hash as last synced are
+        dropped. Otherwise only the changed fields are written to the linked
+        target record, mapped in one call per set of changed fields. A field
+        the target also changed since the last sync (see _observe) is a
+        conflict: it is stored, and under target_wins or manual it is not
+        written.
+        Returns the target records and, aligned with them, the state to
+        store once each write succeeds.
+        """
+        rename = mapping.target_name if mapping else (lambda name: name)
+        ids = [str(r[source.id_field]) for r in records if r.get(source.id_field) is not None]
+        ours = await self.states.get_many(job.source, job.target, object_type, ids)
+        theirs = await self.states.get_many(
+            job.target, job.source, object_type, [s["peer_id"] for s in ours.values() if s["peer_id"]]
+        )
+        
+        writes: List[Record] = []
+        pending: List[Optional[_PendingState]] = []
+        whole: List[Tuple[Record, Optional[_PendingState]]] = []
+        partial: Dict[Tuple[str, ...], List[Tuple[Record, Dict[str, Any], _PendingState]]] = {}
+        seen: Dict[str, Dict[str, Any]] = {}
+        settled: Dict[str, Dict[str, Any]] = {}
+        conflicts: List[Dict[str, Any]] = []
+        now = datetime.utcnow()
+        for record in records:
+            if record.get(source.id_field) is None:
+                whole.append((record, None))
+                continue
+            record_id = str(record[source.id_field])
+            hashes = {
+                name: field_hash(record[name])
+                for name in (mapping.fields if mapping else record)
+                if name in record and name not in (source.id_field, source.modified_field)
+            }
+            state = ours.get(record_id)
+            changed = [name for name, digest in hashes.items() if state is None or state["synced"].get(name) != digest]
+            if not changed:
+                # Unchanged, or no fields to write besides its ID and timestamp.
+                job.records_skipped += 1
+                if state is not None and state["observed"] != hashes:
+                    seen[record_id] = {**state, "observed": hashes}
+                continue
+            
+            peer_id = state["peer_id"] if state else None
+            if peer_id is None:
+                record = {k: v for k, v in record.items() if mapping or k != source.id_field}
+                whole.append((record, _PendingState(record_id, None, {"synced": hashes, "observed": hashes}, {})))
+                continue
+            
+            peer = theirs.get(peer_id) or {"peer_id": record_id, "synced": {}, "observed": {}, "changed": {}}
+            target_changed = {name for name, digest in peer["observed"].items() if peer["synced"].get(name) != digest}
+            clashing = [name for name in changed if rename(name) in target_changed]
+            write = changed
+            if clashing:
+                job.conflicts += len(clashing)
+                conflicts.extend(
+                    {
+                        "sync_id": job.sync_id,
+                        "source": job.source,
+                        "target": job.target,
+                        "object_type": object_type,
+                        "source_id": record_id,
+                        "target_id": peer_id,
+                        "field": name,
+                        "target_field": rename(name),
+                        "source_value": record[name],
+                        "target_value": peer.get("changed", {}).get(rename(name)),
+                        "status": "open" if job.conflict_resolution == "manual" else "resolved",
+                        "resolution": None if job.conflict_resolution == "manual" else job.conflict_resolution,
+                        "resolved_value": None,
+                        "created_at": now,
+                        "resolved_at": None if job.conflict_resolution == "manual" else now,
+                    }
+                    for name in clashing
+                )
+                if job.conflict_resolution != "source_wins":
+                    write = [name for name in changed if name not in clashing]
+                if job.conflict_resolution == "manual":
+                    # Both values are held as they are until the conflict is resolved.
+                    for name in clashing:
+                        peer["synced"][rename(name)] = peer["observed"][rename(name)]
+                        peer.get("changed", {}).pop(rename(name), None)
+                    settled[peer_id] = peer
+            
+            source_state = {"peer_id": peer_id, "synced": {**state["synced"], **hashes}, "observed": hashes}
+            if not write:
+                seen[record_id] = source_state
+                continue
+            partial.setdefault(tuple(write), []).append(
+                (record, peer, _PendingState(record_id, peer_id, source_state, {}))
+            )
+        
+        for names, group in partial.items():
+            rows = self._map_page(
+                job,
+                [{name: record[name] for name in names} for record, _, _ in group],
+                mapping.subset(names) if mapping else None,
+            )
+            for (_, peer, state), row in zip(group, rows):
+                if row is None:
+                    continue
+                written = {name: field_hash(value) for name, value in row.items()}
+                state.peer = {
+                    "peer_id": state.record_id,
+                    "synced": {**peer["synced"], **written},
+                    "observed": {**peer["observed"], **written},
+                    "changed": {k: v for k, v in peer.get("changed", {}).items() if k not in written},
+                }
+                settled.pop(state.peer_id, None)
+                writes.append({**row, target.id_field: state.peer_id})
+                pending.append(state)
+        
+        rows = self._map_page(job, [record for record, _ in whole], mapping)
+        for (_, state), row in zip(whole, rows):
+            if row is None:
+                continue
+            if state is not None:
+                written = {name: field_hash(value) for name, value in row.items()}
+                state.peer = {"peer_id": state.record_id, "synced": written, "observed": written}
+            writes.append(row)
+            pending.append(state)
+        
+        await self.conflicts.add(conflicts)
+        await self.states.put_many(job.source, job.target, object_type, seen)
+        await self.states.put_many(job.target, job.source, object_type, settled)
+        return writes, pending
+    
+    async def _commit(
+        self,
+        job: SyncJob,
+        object_type: str,
+        pending: List[Optional[_PendingState]],
+        result: BatchResult,
+    ):
+        """Store the sync state of the records a write got into the target."""
+        ours: Dict[str, Dict[str, Any]] = {}
+        theirs: Dict[str, Dict[str, Any]] = {}
+        for index, state in enumerate(pending):
+            if state is None or index in result.errors:
+                continue
+            peer_id = result.ids[index] or state.peer_id
+            ours[state.record_id] = {**state.source, "peer_id": peer_id}
+            if peer_id:
+                theirs[peer_id] = state.peer
+        await self.states.put_many(job.source, job.target, object_type, ours)
+        await self.states.put_many(job.target, job.source, object_type, theirs)
+    
+    async def _write_page(
+        self, job: SyncJob, write: BatchWriter, records: List[Record]
+    ) -> Optional[BatchResult]:
+        """Write a page with one batch call; per-record failures become job errors."""
+        if not records:
+            return None
+        try:
+            result = await write(records)
+        except Exception as e:
+            for _ in records:
+                job.record_error(str(e))
+            return None
+        job.records_synced += result.succeeded
+        for index in sorted(result.errors):
+            job.record_error(result.errors[index])
+        return result
+    
+    async def open_conflicts(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Conflicts held for manual review, oldest first."""
+        return await self.conflicts.list_open(limit)
+    
+    async def resolve_conflict(
+        self, conflict_id: str, resolution: str, value: Any = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Settle a conflict held for review.
+        
+        source_wins writes the source's value to the target, custom writes
+        value to both records, and target_wins keeps the target's value,
+        which the next run from the target copies to the source. Returns the
+        resolved conflict, or None if there is no such conflict. Raises
+        ValueError for an unknown resolution or a conflict already resolved,
+        and RuntimeError if a CRM rejects the write.
+        
+        The conflict is claimed as resolved before anything is written, so
+        concurrent resolutions write once; it is reopened if a write fails.
+        """
+        if resolution not in CONFLICT_RESOLUTIONS:
+            raise ValueError(f"Unsupported resolution: {resolution}")
+        conflict = await self.conflicts.get(conflict_id)
+        if conflict is None:
+            return None
+        if resolution == "source_wins":
+            value = conflict["source_value"]
+        elif resolution == "target_wins":
+            value = None
+        resolved = await self.conflicts.resolve(conflict_id, resolution, value)
+        if resolved is None:
+            raise ValueError(f"Conflict {conflict_id} is already resolved")
+        
+        source, target, object_type = conflict["source"], conflict["target"], conflict["object_type"]
+        try:
+            if resolution == "target_wins":
+                # Forget the target's field as synced so it reads as a change.
+                await self._update_state(target, source, object_type, conflict["target_id"], conflict["target_field"], None)
+            else:
+                await self._write_field(target, object_type, conflict["target_id"], conflict["target_field"], value)
+                await self._update_state(
+                    target, source, object_type, conflict["target_id"], conflict["target_field"], field_hash(value)
+                )
+            if resolution == "custom":
+                await self._write_field(source, object_type, conflict["source_id"], conflict["field"], value)
+                await self._update_state(source, target, object_type, conflict["source_id"], conflict["field"], field_hash(value))
+        except BaseException:
+            await self.conflicts.reopen(conflict_id)
+            raise
+        return resolved
+    
+    async def _write_field(self, system: str, object_type: str, record_id: str, name: str, value: Any):
+        adapter = self.get_adapter(system)
+        write: BatchWriter = getattr(adapter, _OBJECT_METHODS[object_type][2])
+        result = await write([{adapter.id_field: record_id, name: value}])
+        if result.errors:
+            raise RuntimeError(f"{system} rejected the update: {result.errors[0]}")
+    
+    async def _update_state(
+        self, system: str, peer_system: str, object_type: str, record_id: str, name: str, digest: Optional[str]
+    ):
+        """Mark one field of a record as synced with the given hash, or as never synced if digest is None."""
+        state = (await self.states.get_many(system, peer_system, object_type, [record_id])).get(record_id)
+        if state is None:
+            return
+        if digest is None:
+            state["synced"].pop(name, None)
+        else:
+            state["synced"][name] = state["observed"][name] = digest
+            state.get("changed", {}).pop(name, None)
+        await self.states.put_many(system, peer_system, object_type, {record_id: state})
+
+
+sync_engine = SyncEngine(
+    watermarks=sync_watermark_repository,
+    states=sync_state_repository,
+    conflicts=sync_conflict_repository,
+)
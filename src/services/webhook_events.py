@@ -0,0 +1,255 @@
+"""
+Buffered webhook event processing.
+"""
+
+from typing import Dict, Any, List, Optional, Set, Tuple
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+import asyncio
+import logging
+import math
+import time
+
+from src.core.cache import LRUCache
+from src.core.config import settings
+from src.services.account_rollups import AccountRollups, account_rollups
+from src.services.engagement import ACTIVITY_FIELD_EFFECTS, EngagementService, engagement_service
+from src.services.lifecycle import LifecycleService, LifecycleStage, StageTransition, lifecycle_service
+from src.services.repositories import ContactRepository, contact_repository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WebhookEvent:
+    """An activity reported by an external system, for a contact ID or email."""
+    event_type: str
+    contact_id: Optional[str] = None
+    email: Optional[str] = None
+    event_id: Optional[str] = None
+    occurred_at: datetime = field(default_factory=datetime.utcnow)
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+class WebhookEventBuffer:
+    """
+    Absorbs webhook bursts off the request path.
+    
+    Events wait in a bounded in-process queue and are acknowledged as soon
+    as they are queued. One consumer drains micro-batches of up to
+    WEBHOOK_BATCH_SIZE events. Redelivered events (a repeated event_id) are
+    dropped, and the rest are coalesced per contact: each contact's score
+    and fields are written once per batch, in one transaction for the whole
+    batch, and its lifecycle stage is evaluated once. Activities are passed
+    on to the account rollups.
+    
+    An event_id counts as seen only once its activity is committed. A batch
+    that fails is retried from the step that failed, up to
+    WEBHOOK_MAX_ATTEMPTS times. If its activities were never committed, its
+    events are then dead-lettered for replay_dead_letters() rather than
+    dropped.
+    """
+    
+    def __init__(
+        self,
+        engagement: Optional[EngagementService] = None,
+        contacts: Optional[ContactRepository] = None,
+        lifecycle: Optional[LifecycleService] = None,
+        rollups: Optional[AccountRollups] = None,
+    ):
+        self.engagement = engagement or engagement_service
+        self.contacts = contacts or contact_repository
+        self.lifecycle = lifecycle or lifecycle_service
+        self.rollups = rollups or account_rollups
+        self.queue: "asyncio.Queue[WebhookEvent]" = asyncio.Queue(maxsize=settings.webhook_buffer_size)
+        self._seen = LRUCache(settings.webhook_dedup_window)
+        self.dead_letters: "deque[WebhookEvent]" = deque(maxlen=settings.webhook_dead_letter_size)
+        self._consumer: Optional[asyncio.Task] = None
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.duplicates = 0
+        self.unmatched = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.transitions = 0
+    
+    def push(self, events: List[WebhookEvent]) -> bool:
+        """Queue a delivery; returns False, queuing nothing, if it does not fit."""
+        if self.queue.maxsize - self.queue.qsize() < len(events):
+            self.rejected += len(events)
+            return False
+        for event in events:
+            self.queue.put_nowait(event)
+        self.accepted += len(events)
+        return True
+    
+    def start(self):
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._consume())
+    
+    async def stop(self):
+        consumer, self._consumer = self._consumer, None
+        if consumer is not None:
+            consumer.cancel()
+            await asyncio.gather(consumer, return_exceptions=True)
+    
+    async def join(self):
+        """Wait until every queued event has been processed."""
+        await self.queue.join()
+    
+    async def _next_batch(self) -> List[WebhookEvent]:
+        """Wait for one event, then take whatever else arrives within the batch window."""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + settings.webhook_batch_wait_seconds
+        while len(batch) < settings.webhook_batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _consume(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._process_with_retries(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    
+    async def _process_with_retries(self, batch: List[WebhookEvent]):
+        """
+        Apply a batch, retrying with backoff. Once the activities are
+        committed only the lifecycle step is retried, so no activity is
+        recorded twice.
+        """
+        recorded = None
+        for attempt in range(1, settings.webhook_max_attempts + 1):
+            try:
+                if recorded is None:
+                    recorded = await self._record(batch)
+                await self._transition(*recorded)
+                return
+            except Exception:
+                logger.exception("Webhook batch of %d events failed (attempt %d)", len(batch), attempt)
+            if attempt < settings.webhook_max_attempts:
+                self.retries += 1
+                await asyncio.sleep(settings.webhook_retry_seconds * 2 ** (attempt - 1))
+        self.failed += len(batch)
+        if recorded is None:
+            self.dead_letters.extend(batch)
+    
+    def replay_dead_letters(self) -> int:
+        """Queue dead-lettered events again, as many as fit; returns how many."""
+        replayed = 0
+        while self.dead_letters and not self.queue.full():
+            self.queue.put_nowait(self.dead_letters.popleft())
+            replayed += 1
+        return replayed
+    
+    def _fresh(self, events: List[WebhookEvent]) -> List[WebhookEvent]:
+        """Drop events whose event_id was applied before or repeats within the batch."""
+        fresh = []
+        ids: Set[str] = set()
+        for event in events:
+            if event.event_id is not None:
+                if event.event_id in ids or self._seen.get(event.event_id) is not None:
+                    continue
+                ids.add(event.event_id)
+            fresh.append(event)
+        return fresh
+    
+    async def process(self, events: List[WebhookEvent]) -> List[StageTransition]:
+        """Apply a batch of events; returns the lifecycle transitions it caused."""
+        return await self._transition(*await self._record(events))
+    
+    async def _record(
+        self, events: List[WebhookEvent]
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, set]]:
+        """
+        Commit the batch's activities; returns the updated contacts and their
+        changed fields. Counters move only once the commit succeeds, so a
+        retried batch is counted once.
+        """
+        fresh = self._fresh(events)
+        duplicates = len(events) - len(fresh)
+        events = fresh
+        unmatched = 0
+        emails = sorted({e.email for e in events if e.contact_id is None and e.email})
+        ids = await self.contacts.ids_by_email(emails)
+        
+        activities: Dict[str, List[Dict[str, Any]]] = {}
+        changed: Dict[str, set] = {}
+        for event in events:
+            contact_id = event.contact_id or ids.get(event.email)
+            if contact_id is None:
+                unmatched += 1
+                continue
+            activities.setdefault(contact_id, []).append(
+                self.engagement.activity(event.event_type, event.details, event.occurred_at)
+            )
+            changed.setdefault(contact_id, {"engagement_score"}).update(
+                ACTIVITY_FIELD_EFFECTS.get(event.event_type, {})
+            )
+        
+        updated = await self.engagement.record_many(activities)
+        for event in events:
+            if event.event_id is not None:
+                self._seen.set(event.event_id, True, math.inf)
+        self.rollups.record_activities(updated, activities)
+        self.batches += 1
+        self.duplicates += duplicates
+        self.processed += sum(len(activities[contact_id]) for contact_id in updated)
+        self.unmatched += unmatched + sum(
+            len(rows) for contact_id, rows in activities.items() if contact_id not in updated
+        )
+        return updated, changed
+    
+    async def _transition(
+        self, updated: Dict[str, Dict[str, Any]], changed: Dict[str, set]
+    ) -> List[StageTransition]:
+        """Re-evaluate the lifecycle stage of each updated contact once."""
+        transitions = []
+        for contact_id, contact in updated.items():
+            transition = await self.lifecycle.reevaluate_on_change(
+                contact_id,
+                LifecycleStage(contact["lifecycle_stage"]),
+                changed[contact_id],
+                {**contact["custom_fields"], **contact},
+            )
+            if transition:
+                transitions.append(transition)
+        if transitions:
+            await self.contacts.set_lifecycle_stages({t.contact_id: t.to_stage.value for t in transitions})
+            await self.lifecycle.execute_transitions(transitions)
+            self.transitions += len(transitions)
+        return transitions
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "depth": self.queue.qsize(),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "duplicates": self.duplicates,
+            "unmatched": self.unmatched,
+            "failed": self.failed,
+            "retries": self.retries,
+            "dead_letters": len(self.dead_letters),
+            "batches": self.batches,
+            "transitions": self.transitions,
+        }
+
+
+webhook_buffer = WebhookEventBuffer()
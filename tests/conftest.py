@@ -0,0 +1,15 @@
+"""
+Shared test fixtures.
+"""
+
+import pytest_asyncio
+
+from src.core.database import Database
+
+
+@pytest_asyncio.fixture
+async def db():
+    database = Database("sqlite+aiosqlite:///:memory:")
+    await database.connect()
+    yield database
+    await database.disconnect()
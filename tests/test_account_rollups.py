@@ -0,0 +1,236 @@
+"""
+Tests for incremental account rollups and health scoring.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.api import contacts as contacts_api
+from src.api.contacts import ContactCreate
+from src.core.config import settings
+from src.services.account_rollups import DEFAULT_HEALTH_SCORE, AccountRollups, account_health, current_health
+from src.services.engagement import EngagementService
+from src.services.repositories import AccountRepository, ActivityRepository, ContactRepository, DealRepository
+
+
+def _account(**extra):
+    return {
+        "contact_count": 0,
+        "total_deal_value": 0.0,
+        "engagement_raw": 0.0,
+        "engagement_at": None,
+        "nps_promoters": 0,
+        "nps_detractors": 0,
+        "nps_responses": 0,
+        "open_tickets": 0,
+        "last_usage_at": None,
+        "health_factors": {},
+        **extra,
+    }
+
+
+def _contact(email, account_id):
+    return {"email": email, "first_name": "Ada", "last_name": "Lovelace", "account_id": account_id, "custom_fields": {}}
+
+
+def _deal(account_id, value, stage="qualification"):
+    return {
+        "name": f"Deal {value}",
+        "contact_id": "con_1",
+        "account_id": account_id,
+        "value": value,
+        "stage": stage,
+        "probability": 10,
+        "custom_fields": {},
+    }
+
+
+class TestAccountHealth:
+
+    def test_no_data_gives_default(self):
+        assert account_health(_account(), datetime.utcnow()) == (DEFAULT_HEALTH_SCORE, {})
+    
+    def test_factors_and_trends(self):
+        now = datetime.utcnow()
+        account = _account(
+            contact_count=5,
+            engagement_raw=100.0,
+            engagement_at=now,
+            nps_promoters=3,
+            nps_detractors=1,
+            nps_responses=4,
+            open_tickets=1,
+            last_usage_at=now - timedelta(days=2),
+            health_factors={"nps": {"score": 50, "trend": "stable"}, "product_usage": {"score": 99, "trend": "up"}},
+        )
+        
+        score, factors = account_health(account, now)
+        
+        assert factors == {
+            "engagement": {"score": 100, "trend": "stable"},
+            "nps": {"score": 75, "trend": "up"},
+            "support_tickets": {"score": 0, "trend": "stable"},
+            "product_usage": {"score": 100, "trend": "stable"},
+        }
+        assert score == round(0.35 * 100 + 0.25 * 75 + 0.20 * 0 + 0.20 * 100)
+    
+    def test_missing_factors_are_reweighted(self):
+        now = datetime.utcnow()
+        score, factors = account_health(_account(last_usage_at=now - timedelta(days=60)), now)
+        assert set(factors) == {"product_usage"}
+        assert score == 0
+    
+    def test_current_health_decays_a_quiet_account(self):
+        rolled_up = datetime.utcnow() - timedelta(days=90)
+        account = _account(
+            nps_promoters=1,
+            nps_responses=1,
+            last_usage_at=rolled_up,
+            health_score=100,
+            health_factors={"nps": {"score": 100, "trend": "up"}, "product_usage": {"score": 100, "trend": "up"}},
+        )
+        
+        current = current_health(account)
+        
+        assert current["health_score"] == round((0.25 * 100 + 0.20 * 0) / 0.45)
+        assert current["health_factors"] == {
+            "nps": {"score": 100, "trend": "up"},
+            "product_usage": {"score": 0, "trend": "down"},
+        }
+
+
+class TestAccountRollups:
+
+    @pytest.mark.asyncio
+    async def test_contacts_and_deals_roll_up(self, db):
+        accounts, contacts, deals = AccountRepository(db), ContactRepository(db), DealRepository(db)
+        rollups = AccountRollups(accounts)
+        acme = await accounts.create({"name": "Acme", "custom_fields": {}})
+        globex = await accounts.create({"name": "Globex", "custom_fields": {}})
+        
+        ada = await contacts.create(_contact("ada@acme.com", acme["id"]))
+        rollups.record_contact_created(ada)
+        rollups.record_contact_created(await contacts.create(_contact("alan@acme.com", acme["id"])))
+        moved = await contacts.update(ada["id"], {"account_id": globex["id"]})
+        rollups.record_contact_updated(ada, moved)
+        
+        small = await deals.create(_deal(acme["id"], 1000))
+        rollups.record_deal_created(small)
+        rollups.record_deal_created(await deals.create(_deal(acme["id"], 4000)))
+        before, lost = await deals.update_with_previous(small["id"], {"stage": "closed_lost"})
+        rollups.record_deal_updated(before, lost)
+        
+        updated = await rollups.flush()
+        
+        assert updated[acme["id"]]["contact_count"] == 1
+        assert updated[acme["id"]]["total_deal_value"] == 4000
+        assert updated[globex["id"]]["contact_count"] == 1
+        stored = await accounts.get(acme["id"])
+        assert (stored["contact_count"], stored["total_deal_value"]) == (1, 4000)
+        assert rollups.metrics() == {"pending_accounts": 0, "flushes": 1, "accounts_updated": 2}
+    
+    @pytest.mark.asyncio
+    async def test_activities_feed_health(self, db):
+        accounts, contacts = AccountRepository(db), ContactRepository(db)
+        rollups = AccountRollups(accounts)
+        engagement = EngagementService(ActivityRepository(db))
+        acme = await accounts.create({"name": "Acme", "custom_fields": {}})
+        ada = await contacts.create(_contact("ada@acme.com", acme["id"]))
+        rollups.record_contact_created(ada)
+        
+        activities = {ada["id"]: [
+            engagement.activity("nps_response", {"score": 10}),
+            engagement.activity("nps_response", {"score": 3}),
+            engagement.activity("support_ticket_opened"),
+            engagement.activity("support_ticket_opened"),
+            engagement.activity("support_ticket_closed"),
+            engagement.activity("product_login"),
+            engagement.activity("meeting_scheduled"),
+        ]}
+        rollups.record_activities(await engagement.record_many(activities), activities)
+        account = (await rollups.flush())[acme["id"]]
+        
+        assert (account["nps_promoters"], account["nps_detractors"], account["nps_responses"]) == (1, 1, 2)
+        assert account["open_tickets"] == 1
+        assert account["last_usage_at"] is not None
+        assert account["engagement_raw"] > 0
+        assert set(account["health_factors"]) == {"engagement", "nps", "support_tickets", "product_usage"}
+        assert account["health_factors"]["nps"]["score"] == 50
+        assert account["health_factors"]["support_tickets"]["score"] == 0
+        assert (await accounts.get(acme["id"]))["health_score"] == account["health_score"]
+    
+    @pytest.mark.asyncio
+    async def test_changes_are_debounced_into_one_flush(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "account_rollup_debounce_seconds", 0.01)
+        accounts, contacts = AccountRepository(db), ContactRepository(db)
+        rollups = AccountRollups(accounts)
+        acme = await accounts.create({"name": "Acme", "custom_fields": {}})
+        for i in range(5):
+            rollups.record_contact_created(
+                await contacts.create(_contact(f"user{i}@acme.com", acme["id"]))
+            )
+        
+        await rollups._flush_task
+        
+        assert rollups.flushes == 1
+        assert rollups.pending == {}
+        assert (await accounts.get(acme["id"]))["contact_count"] == 5
+    
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "account_rollup_debounce_seconds", 0.01)
+        accounts, contacts = AccountRepository(db), ContactRepository(db)
+        rollups = AccountRollups(accounts)
+        acme = await accounts.create({"name": "Acme", "custom_fields": {}})
+        apply_rollups, calls = accounts.apply_rollups, []
+        
+        async def flaky(changes, fold):
+            calls.append(len(changes))
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            return await apply_rollups(changes, fold)
+        
+        monkeypatch.setattr(accounts, "apply_rollups", flaky)
+        rollups.record_contact_created(await contacts.create(_contact("ada@acme.com", acme["id"])))
+        
+        await rollups._flush_task
+        assert rollups.pending and rollups._flush_task is not None
+        await rollups._flush_task
+        
+        assert calls == [1, 1]
+        assert rollups.pending == {}
+        assert (await accounts.get(acme["id"]))["contact_count"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_update_without_account_keeps_contact_attached(self, db, monkeypatch):
+        accounts, contacts = AccountRepository(db), ContactRepository(db)
+        rollups = AccountRollups(accounts)
+        monkeypatch.setattr(contacts_api, "contact_repository", contacts)
+        monkeypatch.setattr(contacts_api, "account_rollups", rollups)
+        acme = await accounts.create({"name": "Acme", "custom_fields": {}})
+        ada = await contacts.create({**_contact("ada@acme.com", acme["id"]), "company": "Acme"})
+        rollups.record_contact_created(ada)
+        await rollups.flush()
+        
+        body = ContactCreate(email="ada@acme.com", first_name="Augusta", last_name="Lovelace")
+        updated = await contacts_api.update_contact(ada["id"], body)
+        await rollups.flush()
+        
+        assert (updated["first_name"], updated["account_id"], updated["company"]) == ("Augusta", acme["id"], "Acme")
+        assert (await accounts.get(acme["id"]))["contact_count"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_rebuild_repairs_drift(self, db):
+        accounts, contacts, deals = AccountRepository(db), ContactRepository(db), DealRepository(db)
+        rollups = AccountRollups(accounts)
+        acme = await accounts.create({"name": "Acme", "custom_fields": {}})
+        # Writes the rollups never saw, e.g. from before a restart.
+        await contacts.create(_contact("ada@acme.com", acme["id"]))
+        await deals.create(_deal(acme["id"], 2500))
+        await deals.create(_deal(acme["id"], 900, "closed_lost"))
+        
+        await rollups.rebuild()
+        
+        account = await accounts.get(acme["id"])
+        assert (account["contact_count"], account["total_deal_value"]) == (1, 2500)
@@ -0,0 +1,222 @@
+"""
+Tests for CRM adapter batch writes against a fake HTTP server.
+"""
+
+import json
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from src.core.http import HTTPClientPool
+from src.services.crm_adapters import BaseCRMAdapter, HubSpotAdapter, SalesforceAdapter
+
+
+class FakeCRMServer:
+    """Records requests and answers them with a handler per path."""
+    
+    def __init__(self, responder):
+        self.responder = responder
+        self.requests: List[httpx.Request] = []
+    
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responder(request, json.loads(request.content or b"{}"))
+    
+    def pool(self) -> HTTPClientPool:
+        return HTTPClientPool(transport=httpx.MockTransport(self))
+    
+    def count(self, method: str, path_suffix: str) -> int:
+        return sum(
+            1 for r in self.requests
+            if r.method == method and r.url.path.endswith(path_suffix)
+        )
+
+
+def _salesforce_responder(reject: set):
+    def respond(request: httpx.Request, body: Dict[str, Any]) -> httpx.Response:
+        outcomes = []
+        for record in body["records"]:
+            if record.get("Email") in reject:
+                outcomes.append({
+                    "success": False,
+                    "errors": [{"statusCode": "INVALID_EMAIL_ADDRESS", "message": "invalid email"}],
+                })
+            else:
+                outcomes.append({"id": record.get("Id") or f"003{record['Email']}", "success": True, "errors": []})
+        return httpx.Response(200, json=outcomes)
+    return respond
+
+
+def _hubspot_responder(reject: set):
+    def respond(request: httpx.Request, body: Dict[str, Any]) -> httpx.Response:
+        results, errors = [], []
+        for item in body["inputs"]:
+            email = item["properties"].get("email", "")
+            if email in reject:
+                errors.append({
+                    "status": "error",
+                    "category": "VALIDATION_ERROR",
+                    "message": f"Property values were not valid: {email}",
+                    "context": {"ids": [item.get("id", "")]},
+                })
+            else:
+                results.append({
+                    "id": item.get("id") if item.get("id", "").isdigit() else str(len(results) + 1000),
+                    "objectWriteTraceId": item.get("objectWriteTraceId"),
+                    "properties": item["properties"],
+                })
+        return httpx.Response(207 if errors else 200, json={"status": "COMPLETE", "results": results, "errors": errors})
+    return respond
+
+
+def _salesforce(server: FakeCRMServer) -> SalesforceAdapter:
+    return SalesforceAdapter(
+        "u", "p", "t",
+        instance_url="https://acme.my.salesforce.com",
+        access_token="token",
+        http=server.pool(),
+    )
+
+
+def _contacts(n: int, email_field: str = "email") -> List[Dict[str, Any]]:
+    return [{email_field: f"user{i}@acme.com", "LastName": f"User{i}"} for i in range(n)]
+
+
+class TestSalesforceBatchWrites:
+    @pytest.mark.asyncio
+    async def test_chunks_at_collection_limit(self):
+        server = FakeCRMServer(_salesforce_responder(set()))
+        adapter = _salesforce(server)
+        
+        result = await adapter.upsert_contacts(_contacts(450, "Email"))
+        
+        assert server.count("POST", "/composite/sobjects") == 3
+        assert result.requests == 3
+        assert result.succeeded == 450
+        assert [len(json.loads(r.content)["records"]) for r in server.requests] == [200, 200, 50]
+        assert json.loads(server.requests[0].content)["allOrNone"] is False
+        assert server.requests[0].headers["Authorization"] == "Bearer token"
+    
+    @pytest.mark.asyncio
+    async def test_updates_are_patched_separately(self):
+        server = FakeCRMServer(_salesforce_responder(set()))
+        adapter = _salesforce(server)
+        records = _contacts(3, "Email")
+        records[1]["Id"] = "003EXISTING"
+        
+        result = await adapter.upsert_deals(records)
+        
+        assert server.count("POST", "/composite/sobjects") == 1
+        assert server.count("PATCH", "/composite/sobjects") == 1
+        assert result.ids[1] == "003EXISTING"
+        patched = json.loads(server.requests[1].content)["records"]
+        assert patched[0]["attributes"] == {"type": "Opportunity"}
+    
+    @pytest.mark.asyncio
+    async def test_partial_failure_is_reported_per_record(self):
+        server = FakeCRMServer(_salesforce_responder({"user2@acme.com"}))
+        adapter = _salesforce(server)
+        
+        result = await adapter.upsert_contacts(_contacts(5, "Email"))
+        
+        assert result.succeeded == 4
+        assert result.errors == {2: "invalid email"}
+        assert result.ids[2] is None
+        assert result.ids[3] == "003user3@acme.com"
+    
+    @pytest.mark.asyncio
+    async def test_failed_request_fails_its_chunk_only(self):
+        calls = []
+        
+        def respond(request, body):
+            calls.append(len(body["records"]))
+            if len(calls) == 1:
+                return httpx.Response(503, text="Service Unavailable")
+            return _salesforce_responder(set())(request, body)
+        
+        adapter = _salesforce(FakeCRMServer(respond))
+        result = await adapter.upsert_contacts(_contacts(250, "Email"))
+        
+        assert result.succeeded == 50
+        assert len(result.errors) == 200
+        assert result.errors[0].startswith("HTTP 503")
+
+
+class TestHubSpotBatchWrites:
+    @pytest.mark.asyncio
+    async def test_contacts_upsert_by_email_in_chunks(self):
+        server = FakeCRMServer(_hubspot_responder(set()))
+        adapter = HubSpotAdapter(api_key="key", http=server.pool())
+        
+        result = await adapter.upsert_contacts(_contacts(250))
+        
+        assert server.count("POST", "/contacts/batch/upsert") == 3
+        assert result.succeeded == 250
+        first = json.loads(server.requests[0].content)["inputs"][0]
+        assert first["idProperty"] == "email"
+        assert first["id"] == "user0@acme.com"
+    
+    @pytest.mark.asyncio
+    async def test_multi_status_errors_map_to_records(self):
+        server = FakeCRMServer(_hubspot_responder({"user1@acme.com"}))
+        adapter = HubSpotAdapter(api_key="key", http=server.pool())
+        records = _contacts(3) + [{"LastName": "NoEmail"}]
+        
+        result = await adapter.upsert_contacts(records)
+        
+        assert server.count("POST", "/contacts/batch/upsert") == 1
+        assert result.succeeded == 2
+        assert "user1@acme.com" in result.errors[1]
+        assert "email is required" in result.errors[3]
+    
+    @pytest.mark.asyncio
+    async def test_deals_split_into_create_and_update(self):
+        server = FakeCRMServer(_hubspot_responder(set()))
+        adapter = HubSpotAdapter(api_key="key", http=server.pool())
+        records = [{"dealname": f"Deal {i}"} for i in range(150)] + [{"id": "42", "amount": 10}]
+        
+        result = await adapter.upsert_deals(records)
+        
+        assert server.count("POST", "/deals/batch/create") == 2
+        assert server.count("POST", "/deals/batch/update") == 1
+        assert result.succeeded == 151
+        assert result.ids[150] == "42"
+
+
+class PerRecordAdapter(BaseCRMAdapter):
+    def __init__(self):
+        self.created: List[Dict[str, Any]] = []
+        self.updated: List[str] = []
+    
+    async def get_contacts(self, limit: int = 100, offset: int = 0):
+        return []
+    
+    async def create_contact(self, data):
+        if data.get("email") == "bad@acme.com":
+            raise RuntimeError("rejected")
+        self.created.append(data)
+        return f"c{len(self.created)}"
+    
+    async def update_contact(self, contact_id, data):
+        self.updated.append(contact_id)
+        return True
+    
+    async def get_deals(self, limit: int = 100, offset: int = 0):
+        return []
+    
+    async def create_deal(self, data):
+        return "d1"
+
+
+class TestFallbackBatchWrites:
+    @pytest.mark.asyncio
+    async def test_falls_back_to_per_record_calls(self):
+        adapter = PerRecordAdapter()
+        records = [{"email": "a@acme.com"}, {"email": "bad@acme.com"}, {"id": "c9", "email": "c@acme.com"}]
+        
+        result = await adapter.upsert_contacts(records)
+        
+        assert result.ids == ["c1", None, "c9"]
+        assert result.errors == {1: "rejected"}
+        assert adapter.updated == ["c9"]
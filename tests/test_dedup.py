@@ -0,0 +1,124 @@
+"""
+Tests for contact deduplication.
+"""
+
+import pytest
+
+from src.services.dedup import DedupIndex, DedupService, blocking_keys, canonical_email, normalize_contact
+from src.services.repositories import ContactRepository
+
+
+def _contact(contact_id, email, first="Ada", last="Lovelace", phone=None, company=None):
+    return {
+        "id": contact_id,
+        "email": email,
+        "first_name": first,
+        "last_name": last,
+        "phone": phone,
+        "company": company,
+    }
+
+
+class TestBlockingKeys:
+
+    def test_canonical_email(self):
+        assert canonical_email(" Ada.Lovelace+crm@GoogleMail.com ") == "adalovelace@gmail.com"
+        assert canonical_email("ada.lovelace+crm@acme.com") == "ada.lovelace@acme.com"
+    
+    def test_keys(self):
+        record = normalize_contact(_contact("c1", "ada@acme.com", last="O'Neil", phone="+1 (555) 010-2000"))
+        assert blocking_keys(record) == ["e:ada@acme.com", "d:acme.com|oneil", "p:5550102000"]
+    
+    def test_no_domain_key_for_free_mail(self):
+        record = normalize_contact(_contact("c1", "ada@gmail.com", phone="12"))
+        assert blocking_keys(record) == ["e:ada@gmail.com"]
+
+
+class TestDedupIndex:
+
+    def test_incremental_match_checks_only_shared_blocks(self):
+        index = DedupIndex()
+        index.add(_contact("c1", "ada@acme.com", phone="555-010-2000", company="Acme"))
+        index.add(_contact("c2", "grace@navy.mil", first="Grace", last="Hopper"))
+        
+        matches = index.match(_contact("c3", "Ada+news@acme.com", first="Ada", phone="(555) 010 2000"))
+        
+        assert [(m.duplicate_id, m.matched_on) for m in matches] == [("c1", ["email", "phone", "last_name", "first_name"])]
+        assert index.candidates(normalize_contact(_contact("c4", "x@y.com", last="Hopper"))) == set()
+        assert len(index) == 3
+    
+    def test_similar_coworkers_are_candidates_but_not_matches(self):
+        index = DedupIndex()
+        index.add(_contact("c1", "ada@acme.com"))
+        assert index.match(_contact("c2", "alan@acme.com", first="Alan")) == []
+        assert list(index.pairs()) == [("c1", "c2")]
+    
+    def test_scan_and_oversized_blocks(self):
+        index = DedupIndex(max_block_size=3)
+        index.add(_contact("c1", "ada@acme.com"))
+        index.add(_contact("c2", "ADA@acme.com", first="Ada L."))
+        for i in range(4):
+            index.add(_contact(f"p{i}", f"user{i}@example.org", first=f"U{i}", last=f"L{i}", phone="555-000-0000"))
+        
+        matches, compared = index.scan()
+        
+        assert [(m.contact_id, m.duplicate_id) for m in matches] == [("c1", "c2")]
+        assert compared == 1
+    
+    def test_update_replaces_index_entry(self):
+        index = DedupIndex()
+        index.add(_contact("c1", "ada@acme.com"))
+        index.add(_contact("c1", "ada@other.com"))
+        assert set(index.blocks) == {"e:ada@other.com", "d:other.com|lovelace"}
+
+
+class TestDedupService:
+
+    @pytest.mark.asyncio
+    async def test_scan_finds_duplicates_in_database(self, db):
+        repo = ContactRepository(db)
+        first = await repo.create({"email": "ada@acme.com", "first_name": "Ada", "last_name": "Lovelace", "custom_fields": {}})
+        second = await repo.create({"email": "ada+1@acme.com", "first_name": "ada", "last_name": "lovelace", "custom_fields": {}})
+        await repo.create({"email": "grace@acme.com", "first_name": "Grace", "last_name": "Hopper", "custom_fields": {}})
+        service = DedupService(repo)
+        
+        report = await service.scan()
+        
+        assert report["contacts"] == 3
+        assert report["duplicates"] == 1
+        assert {tuple(sorted((d["contact_id"], d["duplicate_id"]))) for d in service.pending()} == {
+            tuple(sorted((first["id"], second["id"])))
+        }
+        
+        third = await repo.create({"email": "Ada@Acme.com ", "first_name": "Ada", "last_name": "Lovelace", "custom_fields": {}})
+        assert {m.duplicate_id for m in service.check(third)} == {first["id"], second["id"]}
+        assert len(service.pending(min_score=0.99)) == 3
+    
+    @pytest.mark.asyncio
+    async def test_update_replaces_a_contacts_matches(self, db):
+        repo = ContactRepository(db)
+        first = await repo.create({"email": "ada@acme.com", "first_name": "Ada", "last_name": "Lovelace", "custom_fields": {}})
+        service = DedupService(repo)
+        await service.rebuild()
+        second = await repo.create({"email": "ada+1@acme.com", "first_name": "Ada", "last_name": "Lovelace", "custom_fields": {}})
+        assert [m.duplicate_id for m in service.check(second)] == [first["id"]]
+        
+        changed = await repo.update(second["id"], {"email": "grace@navy.mil", "first_name": "Grace", "last_name": "Hopper"})
+        
+        assert service.check(changed) == []
+        assert service.pending() == []
+    
+    @pytest.mark.asyncio
+    async def test_checks_wait_for_background_rebuild(self, db):
+        repo = ContactRepository(db)
+        first = await repo.create({"email": "ada@acme.com", "first_name": "Ada", "last_name": "Lovelace", "custom_fields": {}})
+        service = DedupService(repo)
+        service.start_rebuild()
+        second = await repo.create({"email": "ada+1@acme.com", "first_name": "Ada", "last_name": "Lovelace", "custom_fields": {}})
+        
+        assert service.check(second) == []
+        await service._rebuild_task
+        await service.stop()
+        
+        assert service.ready
+        assert [(d["contact_id"], d["duplicate_id"]) for d in service.pending()] == [(second["id"], first["id"])]
@@ -0,0 +1,218 @@
+"""
+Tests for time-decayed engagement scoring and the activity log.
+"""
+
+from datetime import datetime, timedelta
+import random
+
+import pytest
+
+from src.core.config import settings
+from src.services.engagement import EngagementService, accumulate, recompute, score_at
+from src.services.lifecycle import LifecycleService
+from src.services.repositories import ActivityRepository, ContactRepository
+from src.services.webhook_events import WebhookEvent, WebhookEventBuffer
+
+START = datetime(2024, 1, 1)
+
+
+async def _contact(db, email="ada@example.com"):
+    return await ContactRepository(db).create({
+        "email": email, "first_name": "Ada", "last_name": "Lovelace", "custom_fields": {},
+    })
+
+
+class TestDecay:
+
+    def test_half_life(self, monkeypatch):
+        monkeypatch.setattr(settings, "engagement_half_life_days", 10)
+        raw, raw_at = accumulate(0.0, None, 40, START)
+        assert score_at(raw, raw_at, START + timedelta(days=10)) == pytest.approx(20)
+        assert score_at(raw, raw_at, START + timedelta(days=20)) == pytest.approx(10)
+    
+    def test_incremental_matches_replay_in_any_order(self):
+        rng = random.Random(7)
+        events = [(rng.choice([1, 3, 10, 20]), START + timedelta(hours=rng.randint(0, 2000))) for _ in range(300)]
+        now = START + timedelta(days=100)
+        
+        raw, raw_at = 0.0, None
+        for points, occurred_at in events:
+            raw, raw_at = accumulate(raw, raw_at, points, occurred_at)
+        
+        assert score_at(raw, raw_at, now) == pytest.approx(recompute(events, now))
+
+
+class TestEngagementService:
+
+    @pytest.mark.asyncio
+    async def test_recorded_score_matches_full_recompute(self, db):
+        contact = await _contact(db)
+        service = EngagementService(ActivityRepository(db))
+        for days, activity_type in [(0, "email_open"), (3, "form_submit"), (1, "meeting_scheduled"), (9, "email_click")]:
+            activity, updated = await service.record(
+                contact["id"], activity_type, {"source": "test"}, occurred_at=START + timedelta(days=days)
+            )
+        
+        now = START + timedelta(days=15)
+        assert service.current_score(updated, now) == pytest.approx(await service.recompute(contact["id"], now))
+        assert updated["engagement_at"] == START + timedelta(days=9)
+        assert activity["points"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_unknown_contact(self, db):
+        service = EngagementService(ActivityRepository(db))
+        assert await service.record("con_missing", "email_open") == (None, None)
+        assert await ActivityRepository(db).points("con_missing") == []
+
+
+class TestTimeline:
+
+    @pytest.mark.asyncio
+    async def test_cursor_pages_newest_first(self, db):
+        contact = await _contact(db)
+        other = await _contact(db, "grace@example.com")
+        repo = ActivityRepository(db)
+        service = EngagementService(repo)
+        for hours in range(5):
+            await service.record(contact["id"], "page_view", occurred_at=START + timedelta(hours=hours))
+        await service.record(other["id"], "page_view", occurred_at=START)
+        
+        first = await repo.timeline(contact["id"], limit=3)
+        second = await repo.timeline(contact["id"], cursor=first.next_cursor, limit=3)
+        
+        assert [a["occurred_at"].hour for a in first.items] == [4, 3, 2]
+        assert [a["occurred_at"].hour for a in second.items] == [1, 0]
+        assert second.next_cursor is None
+        with pytest.raises(ValueError):
+            await repo.timeline(contact["id"], cursor="not-a-cursor")
+
+
+def _buffer(db) -> WebhookEventBuffer:
+    return WebhookEventBuffer(EngagementService(ActivityRepository(db)), ContactRepository(db), LifecycleService())
+
+
+class TestWebhookBuffer:
+
+    @pytest.mark.asyncio
+    async def test_batch_coalesces_per_contact(self, db):
+        contact = await _contact(db)
+        other = await _contact(db, "grace@example.com")
+        buffer = _buffer(db)
+        events = [WebhookEvent("email_open", contact_id=contact["id"], event_id=f"evt_{i}") for i in range(40)]
+        events += [WebhookEvent("email_open", contact_id=contact["id"], event_id="evt_0")]
+        events += [WebhookEvent("email_click", email="grace@example.com")]
+        events += [WebhookEvent("email_open", email="nobody@example.com")]
+        
+        transitions = await buffer.process(events)
+        
+        stored = await ContactRepository(db).get(contact["id"])
+        assert [t.contact_id for t in transitions] == [contact["id"]]
+        assert stored["lifecycle_stage"] == "mql"
+        assert stored["engagement_score"] == 40
+        assert (await ContactRepository(db).get(other["id"]))["engagement_score"] == 3
+        assert len(await ActivityRepository(db).points(contact["id"])) == 40
+        assert buffer.metrics()["duplicates"] == 1
+        assert buffer.metrics()["unmatched"] == 1
+        assert buffer.metrics()["processed"] == 41
+    
+    @pytest.mark.asyncio
+    async def test_consumer_drains_buffer(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "webhook_batch_size", 10)
+        contact = await _contact(db)
+        buffer = _buffer(db)
+        buffer.start()
+        try:
+            assert buffer.push([WebhookEvent("meeting_scheduled", contact_id=contact["id"])] * 25)
+            await buffer.join()
+        finally:
+            await buffer.stop()
+        
+        stored = await ContactRepository(db).get(contact["id"])
+        assert stored["custom_fields"]["meeting_scheduled"] is True
+        assert buffer.metrics()["batches"] == 3
+        assert buffer.metrics()["processed"] == 25
+    
+    @pytest.mark.asyncio
+    async def test_full_buffer_rejects_whole_delivery(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "webhook_buffer_size", 5)
+        buffer = _buffer(db)
+        
+        assert buffer.push([WebhookEvent("email_open", contact_id="con_1")] * 4)
+        assert not buffer.push([WebhookEvent("email_open", contact_id="con_1")] * 2)
+        assert buffer.queue.qsize() == 4
+        assert buffer.metrics()["rejected"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_retried_before_ids_are_seen(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "webhook_retry_seconds", 0)
+        contact = await _contact(db)
+        buffer = _buffer(db)
+        record_many, calls = buffer.engagement.record_many, []
+        
+        async def flaky(activities):
+            calls.append(activities)
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            return await record_many(activities)
+        
+        monkeypatch.setattr(buffer.engagement, "record_many", flaky)
+        events = [WebhookEvent("email_open", contact_id=contact["id"], event_id=f"evt_{i}") for i in range(3)]
+        events += [WebhookEvent("email_open", email="nobody@example.com")]
+        
+        await buffer._process_with_retries(events)
+        
+        assert len(calls) == 2
+        assert (await ContactRepository(db).get(contact["id"]))["engagement_score"] == 3
+        assert buffer.metrics()["retries"] == 1
+        assert buffer.metrics()["batches"] == 1
+        assert buffer.metrics()["unmatched"] == 1
+        assert buffer.metrics()["duplicates"] == 0
+        await buffer.process(events)
+        assert buffer.metrics()["duplicates"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_batch_failing_every_attempt_is_dead_lettered(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "webhook_retry_seconds", 0)
+        contact = await _contact(db)
+        buffer = _buffer(db)
+        record_many = buffer.engagement.record_many
+        
+        async def down(activities):
+            raise RuntimeError("database is down")
+        
+        monkeypatch.setattr(buffer.engagement, "record_many", down)
+        buffer.start()
+        try:
+            assert buffer.push([WebhookEvent("email_click", contact_id=contact["id"], event_id="evt_1")])
+            await buffer.join()
+            assert buffer.metrics()["failed"] == 1
+            assert buffer.metrics()["dead_letters"] == 1
+            
+            monkeypatch.setattr(buffer.engagement, "record_many", record_many)
+            assert buffer.replay_dead_letters() == 1
+            await buffer.join()
+        finally:
+            await buffer.stop()
+        
+        assert (await ContactRepository(db).get(contact["id"]))["engagement_score"] == 3
+        assert buffer.metrics()["dead_letters"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_lifecycle_retry_does_not_record_activities_twice(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "webhook_retry_seconds", 0)
+        contact = await _contact(db)
+        buffer = _buffer(db)
+        reevaluate, calls = buffer.lifecycle.reevaluate_on_change, []
+        
+        async def flaky(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise RuntimeError("lock timeout")
+            return await reevaluate(*args)
+        
+        monkeypatch.setattr(buffer.lifecycle, "reevaluate_on_change", flaky)
+        
+        await buffer._process_with_retries([WebhookEvent("email_open", contact_id=contact["id"])])
+        
+        assert len(calls) == 2
+        assert len(await ActivityRepository(db).points(contact["id"])) == 1
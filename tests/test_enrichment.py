@@ -0,0 +1,554 @@
+"""
+Tests for the enrichment service and its cache.
+"""
+
+import asyncio
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from src.core.cache import LRUCache, SingleFlight, TwoTierCache
+from src.core.config import settings
+from src.core.http import HTTPClientPool
+from src.services.enrichment import EnrichmentResult, EnrichmentService, merge_by_confidence
+from src.services.enrichment_providers import EnrichmentProvider
+from src.services import enrichment_queue as enrichment_queue_module
+from src.services.enrichment_queue import EnrichmentPriority, EnrichmentQueue, store_enrichment
+from src.services.repositories import ContactRepository
+
+
+class FakeRedis:
+    """The subset of redis.asyncio.Redis used by TwoTierCache."""
+    
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.ttls: Dict[str, int] = {}
+        self.down = False
+    
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis is down")
+    
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+    
+    async def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value
+        self.ttls[key] = ex
+    
+    async def delete(self, key):
+        self._check()
+        self.data.pop(key, None)
+    
+    async def aclose(self):
+        pass
+
+
+class FakeClearbit:
+    def __init__(self, unknown=(), delay: float = 0.0):
+        self.unknown = set(unknown)
+        self.delay = delay
+        self.requests = []
+    
+    def count(self, host: str) -> int:
+        return sum(1 for r in self.requests if r.url.host == host)
+    
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        await asyncio.sleep(self.delay)
+        if request.url.host == "person.clearbit.com":
+            email = request.url.params.get("email")
+            return httpx.Response(200, json={
+                "person": {
+                    "name": {"givenName": email.split("@")[0].title(), "familyName": "Doe"},
+                    "employment": {"title": "Engineer"},
+                },
+            })
+        domain = request.url.params.get("domain")
+        if domain in self.unknown:
+            return httpx.Response(404, json={"error": {"type": "unknown_record"}})
+        return httpx.Response(200, json={
+            "name": domain.split(".")[0].title(),
+            "domain": domain,
+            "category": {"industry": "Software"},
+            "metrics": {"employeesRange": "51-250"},
+        })
+
+
+@pytest.fixture
+def clearbit_key(monkeypatch):
+    monkeypatch.setattr(settings, "clearbit_api_key", "sk_test")
+
+
+def _service(upstream, redis=None) -> EnrichmentService:
+    return EnrichmentService(
+        http=HTTPClientPool(transport=httpx.MockTransport(upstream)),
+        cache=TwoTierCache("enrichment", maxsize=100, redis=redis, use_redis=redis is not None),
+    )
+
+
+class TestLRUCache:
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        far = 2 ** 40
+        cache.set("a", 1, far)
+        cache.set("b", 2, far)
+        cache.get("a")
+        cache.set("c", 3, far)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.evictions == 1
+    
+    def test_expired_entries_are_dropped(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1, 0)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestTwoTierCache:
+
+    @pytest.mark.asyncio
+    async def test_redis_hit_fills_local_tier(self):
+        redis = FakeRedis()
+        writer = TwoTierCache("t", maxsize=10, redis=redis)
+        await writer.set("k", {"v": 1}, ttl=60)
+        assert redis.ttls["t:k"] == 60
+        
+        reader = TwoTierCache("t", maxsize=10, redis=redis)
+        assert await reader.get("k") == {"v": 1}
+        assert await reader.get("k") == {"v": 1}
+        assert reader.stats()["redis_hits"] == 1
+        assert reader.stats()["local_hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_when_redis_is_down(self):
+        redis = FakeRedis()
+        redis.down = True
+        cache = TwoTierCache("t", maxsize=10, redis=redis)
+        
+        await cache.set("k", "v", ttl=60)
+        assert await cache.get("k") == "v"
+        assert await cache.get("missing") is None
+        # Redis is skipped after the first failure until the retry delay passes.
+        assert cache.stats()["redis_errors"] == 1
+
+
+class TestEnrichmentCache:
+
+    @pytest.mark.asyncio
+    async def test_same_domain_is_looked_up_once(self, clearbit_key):
+        upstream = FakeClearbit()
+        service = _service(upstream)
+        
+        for domain in ["acme.com", "ACME.com", "www.acme.com"] * 10:
+            result = await service.enrich_by_domain(domain)
+            assert result.success
+            assert result.data["industry"] == "Software"
+        
+        assert len(upstream.requests) == 1
+        stats = service.metrics()
+        assert stats["upstream_calls"] == 1
+        assert stats["cache"]["misses"] == 1
+        assert stats["cache"]["local_hits"] == 29
+    
+    @pytest.mark.asyncio
+    async def test_failures_are_cached_for_negative_ttl(self, clearbit_key, monkeypatch):
+        monkeypatch.setattr(settings, "enrichment_negative_cache_ttl_seconds", 0.05)
+        upstream = FakeClearbit(unknown={"nobody.io"})
+        service = _service(upstream)
+        
+        first = await service.enrich_by_domain("nobody.io")
+        second = await service.enrich_by_domain("nobody.io")
+        assert not first.success and not second.success
+        assert len(upstream.requests) == 1
+        assert service.negative_hits == 1
+        
+        await asyncio.sleep(0.06)
+        await service.enrich_by_domain("nobody.io")
+        assert len(upstream.requests) == 2
+    
+    @pytest.mark.asyncio
+    async def test_results_shared_through_redis(self, clearbit_key):
+        upstream = FakeClearbit()
+        redis = FakeRedis()
+        
+        await _service(upstream, redis).enrich_by_domain("acme.com")
+        result = await _service(upstream, redis).enrich_by_domain("acme.com")
+        
+        assert result.data["name"] == "Acme"
+        assert len(upstream.requests) == 1
+
+
+class TestSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        flights = SingleFlight()
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "done"
+        
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(10)))
+        
+        assert results == ["done"] * 10
+        assert len(calls) == 1
+        assert flights.shared == 9
+        assert len(flights) == 0
+        assert await flights.do("k", work) == "done"
+        assert len(calls) == 2
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        flights = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.02)
+            return 42
+        
+        first = asyncio.ensure_future(flights.do("k", work))
+        second = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        
+        assert await second == 42
+    
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        flights = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream failed")
+        
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+
+class TestEnrichmentCoalescing:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_domain_lookups_make_one_upstream_call(self, clearbit_key):
+        upstream = FakeClearbit(delay=0.02)
+        service = _service(upstream)
+        
+        results = await asyncio.gather(*(service.enrich_by_domain("acme.com") for _ in range(25)))
+        
+        assert all(r.success for r in results)
+        assert len(upstream.requests) == 1
+        assert service.metrics()["coalesced"] == 24
+    
+    @pytest.mark.asyncio
+    async def test_email_lookups_share_company_lookup(self, clearbit_key):
+        upstream = FakeClearbit(delay=0.02)
+        service = _service(upstream)
+        emails = [f"user{i}@acme.com" for i in range(10)] + ["someone@gmail.com"]
+        
+        results = await asyncio.gather(*(service.enrich_by_email(e) for e in emails))
+        
+        assert upstream.count("person.clearbit.com") == 11
+        assert upstream.count("company.clearbit.com") == 1
+        assert results[0].data["first_name"] == "User0"
+        assert results[0].data["company"] == "Acme"
+        assert results[0].data["company_industry"] == "Software"
+        assert results[-1].data["company"] is None
+    
+    @pytest.mark.asyncio
+    async def test_flight_rechecks_cache_after_a_stale_miss(self, clearbit_key):
+        upstream = FakeClearbit()
+        service = _service(upstream)
+        await service.enrich_by_domain("acme.com")
+        cached, misses = service._cached, []
+        
+        async def stale_miss(key):
+            # The caller's first check ran before the previous flight cached its result.
+            if not misses:
+                misses.append(key)
+                return None
+            return await cached(key)
+        
+        service._cached = stale_miss
+        result = await service.enrich_by_domain("acme.com")
+        
+        assert result.success
+        assert misses == ["domain:acme.com"]
+        assert len(upstream.requests) == 1
+
+
+class RecordingEnrichment:
+    """Stands in for EnrichmentService and records lookup order."""
+    
+    def __init__(self):
+        self.emails: List[str] = []
+        self.domains: List[str] = []
+    
+    async def enrich_by_email(self, email):
+        self.emails.append(email)
+        return EnrichmentResult(success=True, data={"title": "Engineer"}, source="fake")
+    
+    async def enrich_by_domain(self, domain):
+        self.domains.append(domain)
+        return EnrichmentResult(success=True, data={}, source="fake")
+
+
+def _queue(service, results=None) -> EnrichmentQueue:
+    async def on_result(contact_id, result):
+        if results is not None:
+            results[contact_id] = result
+    
+    return EnrichmentQueue(service=service, on_result=on_result)
+
+
+def _contact(i: int, domain: str = "acme.com") -> Dict[str, Any]:
+    return {"id": f"con_{i}", "email": f"user{i}@{domain}"}
+
+
+class TestEnrichmentQueue:
+
+    @pytest.mark.asyncio
+    async def test_interactive_requests_jump_bulk_backlog(self, monkeypatch):
+        monkeypatch.setattr(settings, "enrichment_workers", 1)
+        monkeypatch.setattr(settings, "enrichment_batch_size", 1)
+        service = RecordingEnrichment()
+        queue = _queue(service)
+        for i in range(5):
+            queue.enqueue(_contact(i), EnrichmentPriority.BULK)
+        queue.enqueue(_contact(99), EnrichmentPriority.INTERACTIVE)
+        
+        queue.start()
+        await queue.join()
+        await queue.stop()
+        
+        assert service.emails[0] == "user99@acme.com"
+        assert service.emails[1:] == [f"user{i}@acme.com" for i in range(5)]
+    
+    @pytest.mark.asyncio
+    async def test_contact_is_queued_once(self):
+        service = RecordingEnrichment()
+        results: Dict[str, Any] = {}
+        queue = _queue(service, results)
+        queue.enqueue(_contact(1), EnrichmentPriority.BULK)
+        queue.enqueue(_contact(1), EnrichmentPriority.BULK)
+        queue.enqueue(_contact(1), EnrichmentPriority.INTERACTIVE)
+        assert queue.metrics()["depth"] == 1
+        
+        queue.start()
+        await queue.join()
+        await queue.stop()
+        
+        assert service.emails == ["user1@acme.com"]
+        assert results["con_1"].data == {"title": "Engineer"}
+        assert queue.metrics()["depth"] == 0
+        assert queue.metrics()["processed"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_batches_look_up_each_domain_once(self):
+        service = RecordingEnrichment()
+        queue = _queue(service)
+        for i in range(10):
+            queue.enqueue(_contact(i))
+        queue.enqueue(_contact(10, "globex.com"))
+        
+        queue.start()
+        await queue.join()
+        await queue.stop()
+        
+        assert queue.batches == 1
+        assert service.domains == ["acme.com"]
+        assert len(service.emails) == 11
+        assert queue.metrics()["lag_seconds_max"] > 0
+    
+    @pytest.mark.asyncio
+    async def test_free_mail_batches_skip_company_lookup(self):
+        service = RecordingEnrichment()
+        queue = _queue(service)
+        for i in range(5):
+            queue.enqueue(_contact(i, "gmail.com"))
+        
+        queue.start()
+        await queue.join()
+        await queue.stop()
+        
+        assert service.domains == []
+        assert len(service.emails) == 5
+    
+    @pytest.mark.asyncio
+    async def test_results_only_fill_empty_fields(self, db, monkeypatch):
+        contacts = ContactRepository(db)
+        monkeypatch.setattr(enrichment_queue_module, "contact_repository", contacts)
+        typed = await contacts.create({"email": "ada@acme.com", "first_name": "Ada", "last_name": "Lovelace", "company": "Acme Labs", "custom_fields": {}})
+        blank = await contacts.create({"email": "alan@acme.com", "first_name": "Alan", "last_name": "Turing", "title": "", "custom_fields": {}})
+        result = EnrichmentResult(success=True, data={"company": "Acme", "title": "Engineer"}, source="fake")
+        
+        await store_enrichment(typed["id"], result)
+        await store_enrichment(blank["id"], result)
+        
+        stored = await contacts.get(typed["id"])
+        assert (stored["company"], stored["title"]) == ("Acme Labs", "Engineer")
+        stored = await contacts.get(blank["id"])
+        assert (stored["company"], stored["title"]) == ("Acme", "Engineer")
+        assert await contacts.fill_missing(typed["id"], {"company": "Other"}) is None
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self, monkeypatch):
+        monkeypatch.setattr(settings, "enrichment_queue_size", 2)
+        queue = _queue(RecordingEnrichment())
+        
+        assert queue.enqueue(_contact(1))
+        assert queue.enqueue(_contact(2))
+        assert not queue.enqueue(_contact(3))
+        assert queue.metrics()["rejected"] == 1
+
+
+class FakeProvider(EnrichmentProvider):
+    """Local provider with a fixed answer and latency."""
+    
+    def __init__(self, name, data=None, delay=0.0, error=None, confidence=None):
+        super().__init__()
+        self.name = name
+        self.data = data or {}
+        self.delay = delay
+        self.error = error
+        self.confidence = confidence or {}
+        self.calls = 0
+        self.finished = 0
+    
+    async def _answer(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise LookupError(self.error)
+        self.finished += 1
+        return dict(self.data)
+    
+    async def person(self, email):
+        return await self._answer()
+    
+    async def company(self, domain):
+        return await self._answer()
+
+
+def _multi(*providers, mode="sequential") -> EnrichmentService:
+    return EnrichmentService(
+        cache=TwoTierCache("enrichment", maxsize=100, use_redis=False),
+        providers=list(providers),
+        mode=mode,
+    )
+
+
+class TestEnrichmentProviders:
+
+    @pytest.mark.asyncio
+    async def test_sequential_stops_at_first_answer(self):
+        primary = FakeProvider("primary", {"title": "CTO"})
+        secondary = FakeProvider("secondary", {"title": "VP"})
+        
+        result = await _multi(primary, secondary).enrich_by_domain("acme.com")
+        
+        assert result.success and result.data == {"title": "CTO"}
+        assert result.source == "primary"
+        assert secondary.calls == 0
+    
+    @pytest.mark.asyncio
+    async def test_sequential_falls_through_failures(self):
+        primary = FakeProvider("primary", error="no match")
+        secondary = FakeProvider("secondary", {"title": "VP"})
+        
+        result = await _multi(primary, secondary).enrich_by_domain("acme.com")
+        
+        assert result.success and result.source == "secondary"
+        both_fail = await _multi(primary, FakeProvider("other", error="down")).enrich_by_domain("x.io")
+        assert not both_fail.success
+        assert both_fail.error == "primary: no match; other: down"
+    
+    @pytest.mark.asyncio
+    async def test_hedge_fires_after_budget(self, monkeypatch):
+        monkeypatch.setattr(settings, "enrichment_hedge_budget_seconds", 0.02)
+        primary = FakeProvider("primary", {"title": "CTO"}, delay=0.5)
+        secondary = FakeProvider("secondary", {"title": "VP"}, delay=0.01)
+        service = _multi(primary, secondary, mode="hedged")
+        
+        started = asyncio.get_running_loop().time()
+        result = await service.enrich_by_domain("acme.com")
+        
+        assert asyncio.get_running_loop().time() - started < 0.2
+        assert result.source == "secondary"
+        assert service.hedges == 1
+        assert primary.finished == 0
+    
+    @pytest.mark.asyncio
+    async def test_no_hedge_when_primary_is_fast(self, monkeypatch):
+        monkeypatch.setattr(settings, "enrichment_hedge_budget_seconds", 0.05)
+        primary = FakeProvider("primary", {"title": "CTO"}, delay=0.001)
+        secondary = FakeProvider("secondary", {"title": "VP"})
+        
+        result = await _multi(primary, secondary, mode="hedged").enrich_by_domain("acme.com")
+        
+        assert result.source == "primary"
+        assert secondary.calls == 0
+    
+    @pytest.mark.asyncio
+    async def test_budget_follows_measured_p95(self, monkeypatch):
+        monkeypatch.setattr(settings, "enrichment_hedge_budget_seconds", 10.0)
+        primary = FakeProvider("primary", {"title": "CTO"}, delay=0.5)
+        for _ in range(50):
+            primary.latency.record(0.01)
+        secondary = FakeProvider("secondary", {"title": "VP"})
+        service = _multi(primary, secondary, mode="hedged")
+        
+        result = await asyncio.wait_for(service.enrich_by_domain("acme.com"), 0.3)
+        
+        assert result.source == "secondary"
+        assert service.metrics()["providers"]["primary"]["p95_seconds"] == 0.01
+    
+    @pytest.mark.asyncio
+    async def test_failed_and_cancelled_calls_are_sampled(self, monkeypatch):
+        monkeypatch.setattr(settings, "enrichment_hedge_budget_seconds", 0.02)
+        failing = FakeProvider("failing", error="no match", delay=0.01)
+        slow = FakeProvider("slow", {"title": "CTO"}, delay=0.5)
+        fast = FakeProvider("fast", {"title": "VP"})
+        
+        await _multi(failing, fast).enrich_by_domain("acme.com")
+        await _multi(slow, fast, mode="hedged").enrich_by_domain("acme.com")
+        
+        assert len(failing.latency.samples) == 1
+        [cancelled] = slow.latency.samples
+        assert slow.finished == 0 and cancelled >= 0.02
+    
+    @pytest.mark.asyncio
+    async def test_hedged_answers_in_flight_are_merged(self, monkeypatch):
+        monkeypatch.setattr(settings, "enrichment_hedge_budget_seconds", 0.02)
+        primary = FakeProvider("primary", {"title": "CTO", "phone": None}, delay=0.03)
+        secondary = FakeProvider("secondary", {"title": "VP", "phone": "555-0100"}, delay=0.02)
+        
+        result = await _multi(primary, secondary, mode="hedged").enrich_by_domain("acme.com")
+        
+        assert result.data == {"title": "CTO", "phone": "555-0100"}
+        assert result.source == "primary,secondary"
+        assert result.field_sources == {"title": "primary", "phone": "secondary"}
+    
+    def test_merge_takes_most_confident_field(self):
+        clearbit = FakeProvider("clearbit", confidence={"company": 0.9, "title": 0.6})
+        apollo = FakeProvider("apollo", confidence={"company": 0.7, "title": 0.85})
+        
+        data, sources = merge_by_confidence([
+            (clearbit, {"company": "Acme Inc", "title": "Engineer", "phone": None}),
+            (apollo, {"company": "ACME", "title": "Staff Engineer", "phone": "555-0100"}),
+        ])
+        
+        assert data == {"company": "Acme Inc", "title": "Staff Engineer", "phone": "555-0100"}
+        assert sources == {"company": "clearbit", "title": "apollo", "phone": "apollo"}
+    
+    @pytest.mark.asyncio
+    async def test_no_configured_provider(self):
+        result = await _multi().enrich_by_domain("acme.com")
+        assert not result.success
+        assert result.error == "No enrichment provider configured"
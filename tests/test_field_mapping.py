@@ -0,0 +1,92 @@
+"""
+Tests for compiled field mappings.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from src.services.field_mapping import FieldMappingRegistry, compile_mapping, parse_target
+
+
+class TestCompiledMapping:
+
+    def test_renames_and_drops_unmapped_fields(self):
+        mapping = compile_mapping({"email": "Email", "firstname": "FirstName"})
+        records = [
+            {"email": "ada@acme.com", "firstname": "Ada", "internal": 1},
+            {"email": "grace@navy.mil"},
+        ]
+        
+        assert mapping.transform(records) == [
+            {"Email": "ada@acme.com", "FirstName": "Ada"},
+            {"Email": "grace@navy.mil"},
+        ]
+        subset = mapping.subset(["firstname"])
+        assert subset.transform([{"firstname": "Grace"}]) == [{"FirstName": "Grace"}]
+        assert subset is mapping.subset(["firstname"])
+    
+    def test_coercions(self):
+        mapping = compile_mapping({
+            "amount": "Amount:float",
+            "seats": "Seats:int",
+            "active": "Active:bool",
+            "closed": "CloseDate:datetime",
+            "zip": "Zip:str",
+        })
+        [row] = mapping.transform([
+            {"amount": "1200.50", "seats": "12", "active": "yes", "closed": "2026-03-01T10:00:00Z", "zip": 2139},
+        ])
+        
+        assert row == {
+            "Amount": 1200.5,
+            "Seats": 12,
+            "Active": True,
+            "CloseDate": datetime(2026, 3, 1, 10).isoformat(),
+            "Zip": "2139",
+        }
+        assert mapping.transform([{"amount": None}]) == [{"Amount": None}]
+        assert mapping.subset(["seats", "zip"]).transform([{"seats": "3", "zip": 1}]) == [{"Seats": 3, "Zip": "1"}]
+        assert mapping.coercions == {
+            "amount": "float", "seats": "int", "active": "bool", "closed": "datetime", "zip": "str",
+        }
+    
+    def test_bad_values_and_types_raise(self):
+        with pytest.raises(ValueError, match="'seats' to int"):
+            compile_mapping({"seats": "Seats:int"}).transform([{"seats": "many"}])
+        with pytest.raises(ValueError):
+            parse_target("Amount:money")
+        assert parse_target("Amount") == ("Amount", None)
+    
+    def test_field_names_are_not_code(self):
+        mapping = compile_mapping({"a'] or 1 #": "b\"}) #"})
+        assert mapping.transform([{"a'] or 1 #": 1}]) == [{"b\"}) #": 1}]
+
+
+class TestFieldMappingRegistry:
+
+    def test_reconfigure_replaces_compiled_transform(self):
+        registry = FieldMappingRegistry()
+        first = registry.configure("hubspot", "salesforce", "contacts", {"email": "Email"})
+        assert registry.compiled("hubspot", "salesforce", "contacts") is first
+        
+        second = registry.configure("hubspot", "salesforce", "contacts", {"email": "EmailAddress"})
+        assert registry.compiled("hubspot", "salesforce", "contacts") is second
+        assert second.transform([{"email": "x"}]) == [{"EmailAddress": "x"}]
+        assert registry.compiled("hubspot", "salesforce", "deals") is None
+    
+    def test_run_mapping_overrides_configured(self):
+        registry = FieldMappingRegistry()
+        registry.configure("hubspot", "salesforce", "contacts", {"email": "Email"})
+        
+        override = registry.compiled("hubspot", "salesforce", "contacts", {"email": "Mail"})
+        
+        assert override.fields == {"email": "Mail"}
+        assert registry.compiled("hubspot", "salesforce", "contacts", {"email": "Mail"}) is override
+    
+    def test_invalid_mapping_keeps_previous(self):
+        registry = FieldMappingRegistry()
+        registry.configure("hubspot", "salesforce", "contacts", {"email": "Email"})
+        with pytest.raises(ValueError):
+            registry.configure("hubspot", "salesforce", "contacts", {"email": "Email:blob"})
+        assert registry.get("hubspot", "salesforce", "contacts") == {"email": "Email"}
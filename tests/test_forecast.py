@@ -0,0 +1,97 @@
+"""
+Tests for the Monte Carlo revenue forecast.
+"""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.core.config import settings
+from src.services.forecast import RevenueForecaster, period_end, simulate_revenue
+from src.services.pipeline import PipelineAggregates, stage_probability
+from src.services.repositories import DealRepository
+
+TODAY = date(2024, 5, 15)
+
+
+async def _create(repo, aggregates, value, stage, close_date=None):
+    deal = await repo.create({
+        "name": f"Deal {value}",
+        "contact_id": "con_1",
+        "value": value,
+        "stage": stage,
+        "probability": stage_probability(stage),
+        "close_date": close_date,
+    })
+    aggregates.record_created(deal)
+    return deal
+
+
+class TestSimulateRevenue:
+
+    def test_certain_outcomes(self):
+        values = np.array([100.0, 200.0, 400.0])
+        outcomes = simulate_revenue(values, np.array([1.0, 0.0, 1.0]), 1000, 10, np.random.default_rng(0))
+        assert np.all(outcomes == 500)
+    
+    def test_normal_tail_matches_exact_simulation(self):
+        rng = np.random.default_rng(3)
+        values = rng.uniform(1000, 5000, 2000)
+        probabilities = rng.choice([0.2, 0.6], 2000)
+        
+        exact = simulate_revenue(values, probabilities, 20000, 2000, np.random.default_rng(1))
+        approx = simulate_revenue(values, probabilities, 20000, 50, np.random.default_rng(2))
+        
+        assert np.allclose(np.percentile(approx, [10, 50, 90]), np.percentile(exact, [10, 50, 90]), rtol=0.01)
+    
+    def test_period_end(self):
+        assert period_end("month", TODAY) == date(2024, 5, 31)
+        assert period_end("quarter", TODAY) == date(2024, 6, 30)
+        assert period_end("quarter", date(2024, 11, 2)) == date(2024, 12, 31)
+        assert period_end("year", TODAY) == date(2024, 12, 31)
+        with pytest.raises(ValueError):
+            period_end("decade", TODAY)
+
+
+class TestRevenueForecaster:
+
+    @pytest.mark.asyncio
+    async def test_percentiles_per_period(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "forecast_simulations", 5000)
+        repo = DealRepository(db)
+        aggregates = PipelineAggregates(repo)
+        forecaster = RevenueForecaster(repo, aggregates, seed=0)
+        await _create(repo, aggregates, 2000, "closed_won")
+        await _create(repo, aggregates, 1000, "negotiation", "2024-05-20")
+        await _create(repo, aggregates, 5000, "proposal", "2024-09-01")
+        
+        month = await forecaster.forecast("month", TODAY)
+        year = await forecaster.forecast("year", TODAY)
+        
+        assert month["open_deals"] == 1
+        assert month["expected_revenue"] == 2800
+        assert month["worst_case"] == 2000
+        assert month["best_case"] == 3000
+        assert year["open_deals"] == 2
+        assert year["expected_revenue"] == 2000 + 800 + 3000
+        assert year["percentiles"]["p5"] <= year["percentiles"]["p50"] <= year["percentiles"]["p95"]
+    
+    @pytest.mark.asyncio
+    async def test_cached_until_pipeline_changes(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "forecast_simulations", 1000)
+        repo = DealRepository(db)
+        aggregates = PipelineAggregates(repo)
+        forecaster = RevenueForecaster(repo, aggregates)
+        await _create(repo, aggregates, 1000, "discovery")
+        
+        first = await forecaster.forecast("quarter", TODAY)
+        assert await forecaster.forecast("quarter", TODAY) is first
+        assert forecaster.runs == 1
+        
+        await _create(repo, aggregates, 3000, "discovery")
+        second = await forecaster.forecast("quarter", TODAY)
+        
+        assert forecaster.runs == 2
+        assert second["open_deals"] == 2
+        assert second["version"] == aggregates.version
@@ -0,0 +1,120 @@
+"""
+Tests for the shared HTTP client pool and adaptive rate limiter.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from src.core.config import settings
+from src.core.http import AdaptiveRateLimiter, HTTPClientPool, parse_retry_after
+
+
+def _pool(handler) -> HTTPClientPool:
+    return HTTPClientPool(transport=httpx.MockTransport(handler))
+
+
+class TestAdaptiveRateLimiter:
+
+    @pytest.mark.asyncio
+    async def test_limits_to_configured_rate(self):
+        limiter = AdaptiveRateLimiter(rate=50, burst=1)
+        started = time.monotonic()
+        for _ in range(6):
+            await limiter.acquire()
+        # First token is free, the next five refill at 50 per second.
+        assert time.monotonic() - started >= 0.09
+    
+    @pytest.mark.asyncio
+    async def test_throttling_halves_rate_and_blocks(self):
+        limiter = AdaptiveRateLimiter(rate=100)
+        limiter.on_throttled(retry_after=0.05)
+        assert limiter.rate == 50
+        
+        waited = await limiter.acquire()
+        assert waited >= 0.04
+    
+    def test_success_recovers_rate_up_to_limit(self):
+        limiter = AdaptiveRateLimiter(rate=10)
+        limiter.on_throttled(retry_after=0)
+        for _ in range(100):
+            limiter.on_success()
+        assert limiter.rate == 10
+    
+    def test_parse_retry_after(self):
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        later = datetime.now(timezone.utc) + timedelta(seconds=30)
+        assert 25 < parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+
+
+class TestHTTPClientPool:
+
+    @pytest.mark.asyncio
+    async def test_retries_after_429(self):
+        responses = [
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(200, json={"ok": True}),
+        ]
+        pool = _pool(lambda request: responses.pop(0))
+        
+        response = await pool.request("hubspot", "GET", "https://api.hubapi.com/x")
+        
+        assert response.status_code == 200
+        metrics = pool.metrics()["hubspot"]
+        assert metrics["requests"] == 3
+        assert metrics["throttled"] == 2
+        assert metrics["retries"] == 2
+        assert metrics["rate_limit_per_second"] < settings.hubspot_rate_limit_per_second
+    
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, monkeypatch):
+        monkeypatch.setattr(settings, "http_max_retries", 1)
+        pool = _pool(lambda request: httpx.Response(429, headers={"Retry-After": "0"}))
+        
+        response = await pool.request("salesforce", "GET", "https://example.com")
+        
+        assert response.status_code == 429
+        assert pool.metrics()["salesforce"]["requests"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_server_errors_do_not_raise_rate(self):
+        pool = _pool(lambda request: httpx.Response(503))
+        limiter = pool.limiter("hubspot")
+        limiter.on_throttled(retry_after=0)
+        throttled_rate = limiter.rate
+        
+        response = await pool.request("hubspot", "GET", "https://api.hubapi.com/x")
+        
+        assert response.status_code == 503
+        assert limiter.rate == throttled_rate
+        assert pool.metrics()["hubspot"]["retries"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_tracks_in_flight_requests(self):
+        async def slow(request):
+            await asyncio.sleep(0.01)
+            return httpx.Response(200)
+        
+        pool = _pool(slow)
+        await asyncio.gather(*(pool.request("salesforce", "GET", "https://example.com") for _ in range(5)))
+        
+        metrics = pool.metrics()["salesforce"]
+        assert metrics["in_flight"] == 0
+        assert metrics["in_flight_max"] > 1
+        await pool.close()
+    
+    @pytest.mark.asyncio
+    async def test_one_client_per_vendor(self):
+        pool = HTTPClientPool()
+        assert pool.client("hubspot") is pool.client("hubspot")
+        assert pool.client("hubspot") is not pool.client("salesforce")
+        
+        await pool.close()
+        assert pool.clients == {}
@@ -0,0 +1,80 @@
+"""
+Tests for streamed bulk contact ingest.
+"""
+
+import pytest
+
+from src.api.contacts import _validate_chunk
+from src.core.ingest import iter_lines, decode_ndjson, decode_csv, chunked
+
+
+async def _stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+class TestDecoders:
+
+    @pytest.mark.asyncio
+    async def test_lines_split_across_chunks(self):
+        lines = await _collect(iter_lines(_stream(b'{"a": 1}\n{"a"', b': 2}\r\n', b'{"a": "\xc3', b'\xa9"}')))
+        
+        assert lines == ['{"a": 1}', '{"a": 2}', '{"a": "é"}']
+    
+    @pytest.mark.asyncio
+    async def test_ndjson_reports_bad_lines(self):
+        records = await _collect(decode_ndjson(iter_lines(_stream(b'{"email": "a@b.com"}\n\nnot json\n[1]\n'))))
+        
+        assert records[0] == (0, {"email": "a@b.com"}, None)
+        assert records[1][0] == 1 and records[1][2].startswith("invalid JSON")
+        assert records[2][0] == 2 and records[2][1] is None
+    
+    @pytest.mark.asyncio
+    async def test_csv_uses_header_and_drops_empty_cells(self):
+        body = b"email,first_name,last_name,phone\na@b.com,Ann,Lee,\nbad,row\n"
+        records = await _collect(decode_csv(iter_lines(_stream(body))))
+        
+        assert records[0] == (0, {"email": "a@b.com", "first_name": "Ann", "last_name": "Lee"}, None)
+        assert records[1][2] == "expected 4 columns, got 2"
+    
+    @pytest.mark.asyncio
+    async def test_csv_quoted_cells_span_lines(self):
+        body = b'email,first_name,last_name,notes\r\na@x.com,A,B,"line1\r\n\r\nsaid ""hi""\r\nline2"\r\nb@x.com,C,D,\r\n'
+        records = await _collect(decode_csv(iter_lines(_stream(body))))
+        
+        assert records == [
+            (0, {"email": "a@x.com", "first_name": "A", "last_name": "B", "notes": 'line1\n\nsaid "hi"\nline2'}, None),
+            (1, {"email": "b@x.com", "first_name": "C", "last_name": "D"}, None),
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_chunked(self):
+        async def numbers():
+            for i in range(5):
+                yield i
+        
+        assert await _collect(chunked(numbers(), 2)) == [[0, 1], [2, 3], [4]]
+
+
+class TestChunkValidation:
+
+    def test_valid_rows_survive_invalid_neighbours(self):
+        chunk = [
+            (0, {"email": "a@b.com", "first_name": "A", "last_name": "B", "segment": "smb"}, None),
+            (1, {"email": "not-an-email", "first_name": "C", "last_name": "D"}, None),
+            (2, None, "invalid JSON: boom"),
+            (3, {"email": "e@f.com", "first_name": "E"}, None),
+            (4, {"email": "g@h.com", "first_name": "G", "last_name": "H"}, None),
+        ]
+        
+        valid, errors = _validate_chunk(chunk)
+        
+        assert [c.email for c in valid] == ["a@b.com", "g@h.com"]
+        assert valid[0].custom_fields == {"segment": "smb"}
+        assert [e["row"] for e in errors] == [1, 2, 3]
+        assert errors[0]["errors"][0].startswith("email:")
+        assert errors[2]["errors"] == ["last_name: Field required"]
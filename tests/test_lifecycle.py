@@ -2,12 +2,21 @@
 Tests for lifecycle service.
 """
 
+import asyncio
+
+import numpy as np
 import pytest
 from datetime import datetime
+
+from src.core.config import settings
 from src.services.lifecycle import (
     LifecycleService,
     LifecycleStage,
+    StageConfig,
     StageTransition,
+    compile_condition,
+    encode_stages,
+    decode_stages,
 )
 
 
@@ -75,3 +84,209 @@ class TestLifecycleService:
         assert lifecycle_service._evaluate_condition(50, "gte", 30) is True
         assert lifecycle_service._evaluate_condition(30, "gte", 30) is True
         assert lifecycle_service._evaluate_condition(20, "gte", 30) is False
+    
+    @pytest.mark.asyncio
+    async def test_configure_stage_recompiles_conditions(self, lifecycle_service):
+        """Test reconfiguring a stage takes effect on the next evaluation."""
+        lifecycle_service.configure_stage(StageConfig(
+            stage=LifecycleStage.LEAD,
+            next_stage=LifecycleStage.MQL,
+            conditions=[
+                {"field": "engagement_score", "operator": "gte", "value": 50},
+                {"field": "email_verified", "operator": "eq", "value": True},
+            ],
+            actions=[],
+        ))
+        
+        transition = await lifecycle_service.evaluate_transition(
+            contact_id="con_123",
+            current_stage=LifecycleStage.LEAD,
+            contact_data={"engagement_score": 35, "email_verified": True},
+        )
+        assert transition is None
+        
+        transition = await lifecycle_service.evaluate_transition(
+            contact_id="con_123",
+            current_stage=LifecycleStage.LEAD,
+            contact_data={"engagement_score": 55, "email_verified": True},
+        )
+        assert transition is not None
+    
+    @pytest.mark.asyncio
+    async def test_replaced_config_is_recompiled(self, lifecycle_service):
+        """Test assigning stage_configs directly invalidates the compiled stage."""
+        lifecycle_service.stage_configs[LifecycleStage.LEAD] = StageConfig(
+            stage=LifecycleStage.LEAD,
+            next_stage=LifecycleStage.MQL,
+            conditions=[{"field": "engagement_score", "operator": "lt", "value": 10}],
+            actions=[],
+        )
+        
+        transition = await lifecycle_service.evaluate_transition(
+            contact_id="con_123",
+            current_stage=LifecycleStage.LEAD,
+            contact_data={"engagement_score": 5},
+        )
+        assert transition is not None
+    
+    def test_compiled_matches_interpreter(self, lifecycle_service):
+        operators = ["eq", "neq", "gte", "gt", "lte", "lt"]
+        for op in operators:
+            for actual in [None, 10, 30, 50]:
+                predicate = compile_condition({"field": "x", "operator": op, "value": 30})
+                expected = lifecycle_service._evaluate_condition(actual, op, 30)
+                assert predicate({"x": actual}) is expected
+    
+    def test_unsupported_operator_rejected(self, lifecycle_service):
+        with pytest.raises(ValueError):
+            lifecycle_service.configure_stage(StageConfig(
+                stage=LifecycleStage.LEAD,
+                next_stage=LifecycleStage.MQL,
+                conditions=[{"field": "engagement_score", "operator": "between", "value": 1}],
+                actions=[],
+            ))
+        
+        assert lifecycle_service.stage_configs[LifecycleStage.LEAD].conditions[0]["operator"] == "gte"
+    
+    @pytest.mark.asyncio
+    async def test_evaluate_batch_matches_per_contact(self, lifecycle_service):
+        """Test columnar evaluation agrees with evaluate_transition row by row."""
+        stages = ["lead", "lead", "lead", "mql", "mql", "sql", "sql", "customer"]
+        scores = [35.0, 20.0, np.nan, 10.0, 90.0, 0.0, 0.0, 99.0]
+        meetings = [False, True, False, True, False, False, True, True]
+        budgets = [False, False, False, False, True, True, False, True]
+        
+        result = lifecycle_service.evaluate_batch(encode_stages(stages), {
+            "engagement_score": np.array(scores),
+            "meeting_scheduled": np.array(meetings),
+            "budget_confirmed": np.array(budgets),
+        })
+        
+        for i, stage in enumerate(stages):
+            score = None if np.isnan(scores[i]) else scores[i]
+            transition = await lifecycle_service.evaluate_transition(
+                contact_id=f"con_{i}",
+                current_stage=LifecycleStage(stage),
+                contact_data={
+                    "engagement_score": score,
+                    "meeting_scheduled": meetings[i],
+                    "budget_confirmed": budgets[i],
+                },
+            )
+            assert result.transitioned[i] == (transition is not None)
+            expected = transition.to_stage.value if transition else stage
+            assert decode_stages(result.next_stage)[i] == expected
+    
+    def test_encode_stages_rejects_unknown(self):
+        with pytest.raises(ValueError):
+            encode_stages(["lead", "prospect"])
+    
+    def test_stages_for_fields(self, lifecycle_service):
+        assert lifecycle_service.stages_for_fields(["phone"]) == set()
+        assert lifecycle_service.stages_for_fields(["engagement_score"]) == {LifecycleStage.LEAD}
+        assert lifecycle_service.stages_for_fields(
+            ["meeting_scheduled", "budget_confirmed"]
+        ) == {LifecycleStage.MQL, LifecycleStage.SQL}
+    
+    @pytest.mark.asyncio
+    async def test_reevaluate_skips_unrelated_fields(self, lifecycle_service):
+        """Test a write that can't affect the current stage skips evaluation."""
+        contact_data = {"engagement_score": 90, "phone": "+15550100"}
+        
+        transition = await lifecycle_service.reevaluate_on_change(
+            "con_123", LifecycleStage.LEAD, ["phone"], contact_data
+        )
+        assert transition is None
+        
+        transition = await lifecycle_service.reevaluate_on_change(
+            "con_123", LifecycleStage.LEAD, ["engagement_score"], contact_data
+        )
+        assert transition is not None
+        assert transition.to_stage == LifecycleStage.MQL
+    
+    def test_field_index_follows_reconfiguration(self, lifecycle_service):
+        lifecycle_service.configure_stage(StageConfig(
+            stage=LifecycleStage.LEAD,
+            next_stage=LifecycleStage.MQL,
+            conditions=[{"field": "form_submitted", "operator": "eq", "value": True}],
+            actions=[],
+        ))
+        
+        assert lifecycle_service.stages_for_fields(["engagement_score"]) == set()
+        assert lifecycle_service.stages_for_fields(["form_submitted"]) == {LifecycleStage.LEAD}
+
+
+def _transition(contact_id: str = "con_123") -> StageTransition:
+    return StageTransition(
+        contact_id=contact_id,
+        from_stage=LifecycleStage.MQL,
+        to_stage=LifecycleStage.SQL,
+        trigger="test",
+        timestamp=datetime.utcnow(),
+    )
+
+
+class TestTransitionActions:
+
+    @pytest.mark.asyncio
+    async def test_actions_run_concurrently(self, lifecycle_service):
+        """Test independent actions overlap instead of running serially."""
+        running, peak = 0, 0
+        
+        async def slow(transition, config):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+        
+        lifecycle_service.action_handlers["assign"] = slow
+        lifecycle_service.action_handlers["notify"] = slow
+        config = lifecycle_service.stage_configs[LifecycleStage.MQL]
+        
+        results = await lifecycle_service.execute_transition_actions(_transition(), config)
+        
+        assert [r["action"] for r in results] == ["assign", "notify"]
+        assert all(r["executed"] for r in results)
+        assert all(r["latency_ms"] >= 40 for r in results)
+        assert peak == 2
+    
+    @pytest.mark.asyncio
+    async def test_action_timeout_and_errors_reported(self, lifecycle_service, monkeypatch):
+        monkeypatch.setattr(settings, "lifecycle_action_timeout_seconds", 0.01)
+        
+        async def hang(transition, config):
+            await asyncio.sleep(1)
+        
+        async def fail(transition, config):
+            raise RuntimeError("crm unavailable")
+        
+        lifecycle_service.action_handlers["assign"] = hang
+        lifecycle_service.action_handlers["notify"] = fail
+        config = lifecycle_service.stage_configs[LifecycleStage.MQL]
+        
+        results = await lifecycle_service.execute_transition_actions(_transition(), config)
+        
+        assert results[0]["executed"] is False
+        assert results[0]["error"] == "timeout"
+        assert results[1]["error"] == "crm unavailable"
+    
+    @pytest.mark.asyncio
+    async def test_per_type_concurrency_limit(self, lifecycle_service, monkeypatch):
+        monkeypatch.setattr(settings, "lifecycle_action_concurrency", 3)
+        active = {"now": 0, "peak": 0}
+        
+        async def tracked(transition, config):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.005)
+            active["now"] -= 1
+        
+        lifecycle_service.action_handlers["assign"] = tracked
+        transitions = [_transition(f"con_{i}") for i in range(30)]
+        
+        results = await lifecycle_service.execute_transitions(transitions, workers=10)
+        
+        assert len(results) == 30
+        assert all(r[0]["executed"] for r in results)
+        assert active["peak"] == 3
@@ -0,0 +1,80 @@
+"""
+Tests for materialized pipeline aggregates.
+"""
+
+import pytest
+
+from src.services.pipeline import PipelineAggregates, stage_probability
+from src.services.repositories import DealRepository
+
+
+def _deal(value: float, stage: str = "qualification", **extra):
+    return {
+        "name": f"Deal {value}",
+        "contact_id": "con_1",
+        "value": value,
+        "stage": stage,
+        "probability": stage_probability(stage),
+        "custom_fields": {},
+        **extra,
+    }
+
+
+async def _create(repo, aggregates, *args, **kwargs):
+    deal = await repo.create(_deal(*args, **kwargs))
+    aggregates.record_created(deal)
+    return deal
+
+
+async def _move(repo, aggregates, deal_id, stage):
+    before, after = await repo.update_with_previous(
+        deal_id, {"stage": stage, "probability": stage_probability(stage)}
+    )
+    aggregates.record_updated(before, after)
+    return after
+
+
+class TestPipelineAggregates:
+
+    @pytest.mark.asyncio
+    async def test_writes_update_running_totals(self, db):
+        repo = DealRepository(db)
+        aggregates = PipelineAggregates(repo)
+        first = await _create(repo, aggregates, 1000)
+        await _create(repo, aggregates, 3000, "proposal")
+        await _create(repo, aggregates, 500, "closed_won")
+        await _move(repo, aggregates, first["id"], "negotiation")
+        
+        summary = aggregates.summary()
+        by_stage = {s["stage"]: s for s in summary["stages"]}
+        
+        assert by_stage["qualification"]["count"] == 0
+        assert by_stage["negotiation"] == {"stage": "negotiation", "count": 1, "value": 1000, "weighted_value": 800}
+        assert summary["total_pipeline_value"] == 4000
+        assert summary["weighted_value"] == 800 + 1800
+        assert summary["version"] == 4
+        assert (await aggregates.check())["consistent"]
+    
+    @pytest.mark.asyncio
+    async def test_check_detects_drift_and_rebuild_repairs(self, db):
+        repo = DealRepository(db)
+        aggregates = PipelineAggregates(repo)
+        await _create(repo, aggregates, 1000)
+        # A write the aggregates never saw, e.g. from another process.
+        await repo.create(_deal(250, "proposal"))
+        
+        report = await aggregates.check()
+        assert not report["consistent"]
+        assert report["drift"]["proposal"]["expected"]["count"] == 1
+        assert report["drift"]["proposal"]["actual"]["count"] == 0
+        
+        version = aggregates.version
+        await aggregates.rebuild()
+        assert (await aggregates.check())["consistent"]
+        assert aggregates.version == version + 1
+        assert aggregates.summary()["weighted_value"] == 200 + 150
+    
+    @pytest.mark.asyncio
+    async def test_update_of_missing_deal(self, db):
+        repo = DealRepository(db)
+        assert await repo.update_with_previous("deal_missing", {"stage": "proposal"}) == (None, None)
@@ -0,0 +1,266 @@
+"""
+Tests for the async repository layer.
+"""
+
+import json
+
+import pytest
+from datetime import datetime
+
+from src.core.export import encode_ndjson, encode_csv
+from src.core.pagination import encode_cursor, decode_cursor
+from src.services.repositories import (
+    ContactRepository,
+    DealRepository,
+    AccountRepository,
+    SyncWatermarkRepository,
+    SyncStateRepository,
+    SyncConflictRepository,
+    DuplicateRecordError,
+    CONTACT_EXPORT_COLUMNS,
+)
+
+
+def _contact(email: str, **extra):
+    return {
+        "email": email,
+        "first_name": "Jane",
+        "last_name": "Doe",
+        "custom_fields": {},
+        **extra,
+    }
+
+
+class TestContactRepository:
+
+    @pytest.mark.asyncio
+    async def test_create_and_get(self, db):
+        repo = ContactRepository(db)
+        created = await repo.create(_contact("jane@acme.com", company="Acme"))
+        
+        fetched = await repo.get(created["id"])
+        
+        assert fetched["email"] == "jane@acme.com"
+        assert fetched["company"] == "Acme"
+        assert fetched["lifecycle_stage"] == "lead"
+        assert await repo.get("con_missing") is None
+    
+    @pytest.mark.asyncio
+    async def test_duplicate_email_rejected(self, db):
+        repo = ContactRepository(db)
+        await repo.create(_contact("jane@acme.com"))
+        
+        with pytest.raises(DuplicateRecordError):
+            await repo.create(_contact("jane@acme.com"))
+    
+    @pytest.mark.asyncio
+    async def test_list_filters_by_stage_and_score(self, db):
+        repo = ContactRepository(db)
+        await repo.create(_contact("a@acme.com", engagement_score=10))
+        await repo.create(_contact("b@acme.com", engagement_score=50))
+        await repo.create(_contact("c@acme.com", engagement_score=70, lifecycle_stage="mql"))
+        
+        leads = (await repo.list(lifecycle_stage="lead")).items
+        engaged = (await repo.list(min_score=40)).items
+        engaged_leads = (await repo.list(lifecycle_stage="lead", min_score=40)).items
+        
+        assert {c["email"] for c in leads} == {"a@acme.com", "b@acme.com"}
+        assert {c["email"] for c in engaged} == {"b@acme.com", "c@acme.com"}
+        assert [c["email"] for c in engaged_leads] == ["b@acme.com"]
+    
+    @pytest.mark.asyncio
+    async def test_update_returns_new_row(self, db):
+        repo = ContactRepository(db)
+        created = await repo.create(_contact("jane@acme.com"))
+        
+        updated = await repo.update(created["id"], {"title": "CTO"})
+        
+        assert updated["title"] == "CTO"
+        assert updated["updated_at"] >= created["updated_at"]
+        assert await repo.update("con_missing", {"title": "CTO"}) is None
+
+
+class TestBulkUpsert:
+
+    @pytest.mark.asyncio
+    async def test_upsert_inserts_and_updates_by_email(self, db):
+        repo = ContactRepository(db)
+        existing = await repo.create(_contact("jane@acme.com", lifecycle_stage="mql"))
+        
+        written = await repo.upsert_many([
+            _contact("jane@acme.com", title="CTO"),
+            _contact("bob@acme.com"),
+            _contact("bob@acme.com", title="VP Sales"),
+        ])
+        
+        assert {row["email"]: row["created"] for row in written} == {"jane@acme.com": False, "bob@acme.com": True}
+        jane = await repo.get(existing["id"])
+        assert jane["title"] == "CTO"
+        assert jane["lifecycle_stage"] == "mql"
+        assert (await repo.get_by_email("bob@acme.com"))["title"] == "VP Sales"
+
+
+class TestKeysetPagination:
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_all_rows_once(self, db):
+        repo = ContactRepository(db)
+        for i in range(25):
+            await repo.create(_contact(f"user{i}@acme.com", engagement_score=i))
+        
+        seen, cursor = [], None
+        while True:
+            page = await repo.list(min_score=5, cursor=cursor, limit=7)
+            seen.extend(c["email"] for c in page.items)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        
+        assert len(seen) == 20
+        assert len(set(seen)) == 20
+        assert seen[0] == "user24@acme.com"
+    
+    @pytest.mark.asyncio
+    async def test_updated_rows_do_not_repeat_within_scroll(self, db):
+        repo = ContactRepository(db)
+        created = [await repo.create(_contact(f"user{i}@acme.com")) for i in range(4)]
+        
+        first = await repo.list(limit=2)
+        await repo.update(created[0]["id"], {"title": "CTO"})
+        second = await repo.list(cursor=first.next_cursor, limit=2)
+        
+        first_ids = {c["id"] for c in first.items}
+        assert not first_ids & {c["id"] for c in second.items}
+    
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, db):
+        with pytest.raises(ValueError):
+            await ContactRepository(db).list(cursor="not-a-cursor")
+    
+    def test_cursor_round_trip(self):
+        now = datetime.utcnow()
+        assert decode_cursor(encode_cursor(now, "con_1")) == (now, "con_1")
+
+
+class TestDealAndAccountRepositories:
+
+    @pytest.mark.asyncio
+    async def test_deal_filters(self, db):
+        repo = DealRepository(db)
+        base = {"contact_id": "con_1", "currency": "USD", "probability": 20, "custom_fields": {}}
+        await repo.create({**base, "name": "small", "value": 1000, "stage": "qualification"})
+        await repo.create({**base, "name": "big", "value": 90000, "stage": "proposal", "account_id": "acc_1"})
+        
+        assert [d["name"] for d in (await repo.list(min_value=5000)).items] == ["big"]
+        assert [d["name"] for d in (await repo.list(stage="qualification")).items] == ["small"]
+        assert [d["name"] for d in (await repo.list(account_id="acc_1")).items] == ["big"]
+    
+    @pytest.mark.asyncio
+    async def test_account_create_and_list(self, db):
+        repo = AccountRepository(db)
+        created = await repo.create({"name": "Acme", "industry": "software", "size": "smb", "custom_fields": {}})
+        
+        assert (await repo.get(created["id"]))["name"] == "Acme"
+        assert len((await repo.list(industry="software")).items) == 1
+        assert (await repo.list(industry="retail")).items == []
+
+
+class TestPoolMetrics:
+
+    @pytest.mark.asyncio
+    async def test_checkouts_counted(self, db):
+        repo = ContactRepository(db)
+        before = db.pool_metrics.checkouts
+        
+        await repo.create(_contact("jane@acme.com"))
+        await repo.list()
+        
+        metrics = db.metrics()
+        assert metrics["checkouts"] >= before + 2
+        assert metrics["checkins"] == metrics["checkouts"]
+        assert metrics["wait_seconds_total"] >= 0
+
+
+class TestStreamingExport:
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_bounded_partitions(self, db):
+        repo = ContactRepository(db)
+        for i in range(10):
+            await repo.create(_contact(f"user{i}@acme.com", engagement_score=i))
+        
+        partitions = [rows async for rows in repo.stream(min_score=3, batch_size=3)]
+        
+        assert [len(rows) for rows in partitions] == [3, 3, 1]
+        assert all(len(row) == len(CONTACT_EXPORT_COLUMNS) for rows in partitions for row in rows)
+    
+    @pytest.mark.asyncio
+    async def test_ndjson_and_csv_encoding(self, db):
+        repo = ContactRepository(db)
+        await repo.create(_contact("jane@acme.com", custom_fields={"tier": "gold"}))
+        
+        ndjson = "".join([c async for c in encode_ndjson(CONTACT_EXPORT_COLUMNS, repo.stream())])
+        csv_text = "".join([c async for c in encode_csv(CONTACT_EXPORT_COLUMNS, repo.stream())])
+        
+        record = json.loads(ndjson.strip())
+        assert record["email"] == "jane@acme.com"
+        assert record["custom_fields"] == {"tier": "gold"}
+        header, row = csv_text.strip().splitlines()
+        assert header.split(",")[:2] == ["id", "email"]
+        assert "jane@acme.com" in row
+
+
+class TestSyncWatermarks:
+
+    @pytest.mark.asyncio
+    async def test_set_and_advance(self, db):
+        repo = SyncWatermarkRepository(db)
+        assert await repo.get("hubspot", "salesforce", "contacts") is None
+        
+        await repo.set("hubspot", "salesforce", "contacts", datetime(2026, 1, 1))
+        await repo.set("hubspot", "salesforce", "contacts", datetime(2026, 1, 2))
+        await repo.set("hubspot", "salesforce", "deals", datetime(2025, 6, 1))
+        
+        assert await repo.get("hubspot", "salesforce", "contacts") == datetime(2026, 1, 2)
+        assert await repo.get("hubspot", "salesforce", "deals") == datetime(2025, 6, 1)
+
+
+class TestSyncState:
+
+    @pytest.mark.asyncio
+    async def test_put_and_replace_states(self, db):
+        repo = SyncStateRepository(db)
+        await repo.put_many("hubspot", "salesforce", "contacts", {
+            "h1": {"peer_id": "s1", "synced": {"email": "a"}, "observed": {"email": "a"}},
+            "h2": {"peer_id": None, "synced": {}, "observed": {}},
+        })
+        await repo.put_many("hubspot", "salesforce", "contacts", {
+            "h1": {"peer_id": "s1", "synced": {"email": "b"}, "observed": {"email": "c"}, "changed": {"email": "Ada"}},
+        })
+        
+        states = await repo.get_many("hubspot", "salesforce", "contacts", ["h1", "h2", "h3"])
+        assert states == {
+            "h1": {"peer_id": "s1", "synced": {"email": "b"}, "observed": {"email": "c"}, "changed": {"email": "Ada"}},
+            "h2": {"peer_id": None, "synced": {}, "observed": {}, "changed": {}},
+        }
+        assert await repo.get_many("salesforce", "hubspot", "contacts", ["h1"]) == {}
+    
+    @pytest.mark.asyncio
+    async def test_conflicts_resolve_once_until_reopened(self, db):
+        repo = SyncConflictRepository(db)
+        conflict = {
+            "sync_id": "sync_1", "source": "hubspot", "target": "salesforce", "object_type": "contacts",
+            "source_id": "h1", "target_id": "s1", "field": "firstname", "target_field": "FirstName",
+            "source_value": "Ada", "status": "open", "created_at": datetime(2026, 1, 1),
+        }
+        await repo.add([conflict])
+        
+        assert [c["id"] for c in await repo.list_open()] == [conflict["id"]]
+        resolved = await repo.resolve(conflict["id"], "custom", "Ada L.")
+        assert (resolved["status"], resolved["resolved_value"]) == ("resolved", "Ada L.")
+        assert await repo.resolve(conflict["id"], "source_wins", None) is None
+        assert await repo.list_open() == []
+        
+        await repo.reopen(conflict["id"])
+        [reopened] = await repo.list_open()
+        assert (reopened["resolution"], reopened["resolved_value"]) == (None, None)
@@ -0,0 +1,94 @@
+"""
+Tests for the stale deal index and rot alerts.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.core.config import settings
+from src.services.repositories import DealRepository
+from src.services.stale_deals import StaleDealIndex
+
+NOW = datetime(2024, 6, 1)
+
+
+def _deal(deal_id: str, days_ago: float, stage: str = "proposal"):
+    return {"id": deal_id, "stage": stage, "updated_at": NOW - timedelta(days=days_ago)}
+
+
+def _index(*deals):
+    index = StaleDealIndex(repository=None)
+    for deal in deals:
+        index.touch(deal)
+    return index
+
+
+class TestStaleDealIndex:
+
+    def test_stale_reads_oldest_prefix(self):
+        index = _index(_deal("a", 30), _deal("b", 20), _deal("c", 3), _deal("d", 40))
+        
+        total, keys = index.stale(14, limit=2, now=NOW)
+        
+        assert total == 3
+        assert [deal_id for _, deal_id in keys] == ["d", "a"]
+    
+    def test_touch_moves_and_closing_removes(self):
+        index = _index(_deal("a", 30), _deal("b", 20))
+        index.touch(_deal("a", 0))
+        index.touch(_deal("b", 0, "closed_won"))
+        
+        assert len(index) == 1
+        assert index.stale(14, limit=10, now=NOW) == (0, [])
+    
+    @pytest.mark.asyncio
+    async def test_rebuild_skips_closed_deals(self, db):
+        repo = DealRepository(db)
+        for stage in ("qualification", "proposal", "closed_lost"):
+            await repo.create({"name": stage, "contact_id": "con_1", "value": 100, "stage": stage, "probability": 50})
+        index = StaleDealIndex(repo)
+        
+        await index.rebuild()
+        
+        total, _ = index.stale(14, limit=10, now=datetime.utcnow() + timedelta(days=15))
+        assert total == 2
+    
+    @pytest.mark.asyncio
+    async def test_rebuild_does_not_realert_stale_deals(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "deal_rot_threshold_days", 14)
+        repo = DealRepository(db)
+        await repo.create({"name": "Old", "contact_id": "con_1", "value": 100, "stage": "proposal", "probability": 50})
+        now = datetime.utcnow() + timedelta(days=20)
+        index = StaleDealIndex(repo)
+        
+        await index.rebuild(now)
+        
+        assert index.sweep(now) == []
+        assert index.stale(14, limit=10, now=now)[0] == 1
+        index.touch({"id": "fresh", "stage": "proposal", "updated_at": now - timedelta(days=10)})
+        assert [a.deal_id for a in index.sweep(now + timedelta(days=5))] == ["fresh"]
+
+
+class TestRotSweep:
+
+    def test_alerts_once_per_crossing(self, monkeypatch):
+        monkeypatch.setattr(settings, "deal_rot_threshold_days", 14)
+        index = _index(_deal("a", 20), _deal("b", 13.5), _deal("c", 1))
+        
+        assert [a.deal_id for a in index.sweep(NOW)] == ["a"]
+        assert index.sweep(NOW) == []
+        assert [a.deal_id for a in index.sweep(NOW + timedelta(days=1))] == ["b"]
+        assert [a.days_idle for a in index.recent_alerts] == [20, 14.5]
+    
+    def test_alerts_late_and_reset_deals(self, monkeypatch):
+        monkeypatch.setattr(settings, "deal_rot_threshold_days", 14)
+        index = _index(_deal("a", 20))
+        index.sweep(NOW)
+        # Indexed after the sweep with activity already past the threshold.
+        index.touch(_deal("late", 30))
+        # Activity resets the clock, so the deal can rot again later.
+        index.touch(_deal("a", 0))
+        
+        assert [a.deal_id for a in index.sweep(NOW)] == ["late"]
+        assert [a.deal_id for a in index.sweep(NOW + timedelta(days=15))] == ["a"]
@@ -0,0 +1,480 @@
+"""
+Tests for the sync engine.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import pytest
+
+from src.core.config import settings
+from src.services.crm_adapters import BaseCRMAdapter
+from src.services.sync_engine import SyncEngine
+
+
+class InMemoryAdapter(BaseCRMAdapter):
+    """CRM adapter backed by in-memory lists."""
+    
+    def __init__(self, contacts=None, deals=None, write_delay: float = 0.0):
+        self.contacts: List[Dict[str, Any]] = list(contacts or [])
+        self.deals: List[Dict[str, Any]] = list(deals or [])
+        self.write_delay = write_delay
+        self.pages_fetched = 0
+        self.fail_on: set = set()
+    
+    async def get_contacts(self, limit: int = 100, offset: int = 0):
+        self.pages_fetched += 1
+        return self.contacts[offset:offset + limit]
+    
+    async def create_contact(self, data):
+        if data.get("email") in self.fail_on:
+            raise RuntimeError(f"rejected {data['email']}")
+        await asyncio.sleep(self.write_delay)
+        self.contacts.append(data)
+        return f"c{len(self.contacts)}"
+    
+    async def update_contact(self, contact_id, data):
+        return True
+    
+    async def get_deals(self, limit: int = 100, offset: int = 0):
+        return self.deals[offset:offset + limit]
+    
+    async def create_deal(self, data):
+        self.deals.append(data)
+        return f"d{len(self.deals)}"
+
+
+class DeltaAdapter(InMemoryAdapter):
+    """In-memory adapter that answers modified-since queries server-side."""
+    
+    supports_delta = True
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delta_calls = 0
+    
+    async def get_contacts_modified_since(self, since, limit=100, after_id=None):
+        self.delta_calls += 1
+        after = (since, after_id or "")
+        changed = [c for c in self.contacts if (c["updated_at"], c["id"]) > after or (c["updated_at"] == since and not after_id)]
+        changed.sort(key=lambda c: (c["updated_at"], c["id"]))
+        return changed[:limit]
+
+
+T0 = datetime(2026, 1, 1)
+
+
+def _contacts(n: int):
+    return [
+        {"id": f"h{i:03d}", "email": f"user{i}@acme.com", "firstname": f"User{i}", "updated_at": T0 + timedelta(seconds=i)}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(settings, "sync_batch_size", 10)
+    monkeypatch.setattr(settings, "sync_queue_depth", 2)
+    monkeypatch.setattr(settings, "sync_upsert_workers", 3)
+
+
+def _engine(source: BaseCRMAdapter, target: BaseCRMAdapter) -> SyncEngine:
+    engine = SyncEngine()
+    engine.register_adapter("hubspot", source)
+    engine.register_adapter("salesforce", target)
+    return engine
+
+
+class TestSyncEngine:
+
+    @pytest.mark.asyncio
+    async def test_copies_and_maps_all_records(self, small_batches):
+        source = InMemoryAdapter(contacts=_contacts(95), deals=[{"name": "Big deal"}])
+        target = InMemoryAdapter()
+        engine = _engine(source, target)
+        
+        job = engine.start(
+            "hubspot", "salesforce", ["contacts", "deals"],
+            field_mapping={"contacts": {"email": "Email", "firstname": "FirstName"}},
+        )
+        await engine.wait(job.sync_id)
+        
+        assert job.status == "completed"
+        assert job.records_read == 96
+        assert job.records_synced == 96
+        assert sorted(c["Email"] for c in target.contacts) == sorted(c["email"] for c in source.contacts)
+        assert target.deals == [{"name": "Big deal"}]
+        assert engine.history()[0] is job
+    
+    @pytest.mark.asyncio
+    async def test_record_errors_are_counted(self, small_batches):
+        target = InMemoryAdapter()
+        target.fail_on = {"user3@acme.com", "user7@acme.com"}
+        engine = _engine(InMemoryAdapter(contacts=_contacts(20)), target)
+        
+        job = engine.start("hubspot", "salesforce", ["contacts", "accounts"])
+        await engine.wait(job.sync_id)
+        
+        assert job.status == "completed"
+        assert job.records_synced == 18
+        assert job.errors == 3
+        assert "Unsupported object type: accounts" in job.error_messages
+    
+    @pytest.mark.asyncio
+    async def test_writes_one_batch_per_page(self, small_batches):
+        target = InMemoryAdapter()
+        batches = []
+        upsert_contacts = target.upsert_contacts
+        
+        async def counting(records):
+            batches.append(len(records))
+            return await upsert_contacts(records)
+        
+        target.upsert_contacts = counting
+        engine = _engine(InMemoryAdapter(contacts=_contacts(25)), target)
+        
+        job = engine.start("hubspot", "salesforce", ["contacts"])
+        await engine.wait(job.sync_id)
+        
+        assert sorted(batches) == [5, 10, 10]
+        assert job.records_synced == 25
+    
+    @pytest.mark.asyncio
+    async def test_source_failure_fails_job(self, small_batches):
+        source = InMemoryAdapter(contacts=_contacts(50))
+        
+        async def broken(limit=100, offset=0):
+            if offset:
+                raise ConnectionError("source unavailable")
+            return source.contacts[:limit]
+        
+        source.get_contacts = broken
+        engine = _engine(source, InMemoryAdapter())
+        
+        job = engine.start("hubspot", "salesforce", ["contacts"])
+        await engine.wait(job.sync_id)
+        
+        assert job.status == "failed"
+        assert job.completed_at is not None
+        assert "source unavailable" in job.error_messages
+    
+    @pytest.mark.asyncio
+    async def test_slow_target_applies_backpressure(self, small_batches):
+        source = InMemoryAdapter(contacts=_contacts(300))
+        target = InMemoryAdapter(write_delay=0.001)
+        engine = _engine(source, target)
+        
+        job = engine.start("hubspot", "salesforce", ["contacts"])
+        await asyncio.sleep(0.02)
+        
+        # two bounded queues plus the pages held by each stage
+        in_flight = source.pages_fetched - len(target.contacts) // 10
+        assert in_flight <= 2 * settings.sync_queue_depth + settings.sync_upsert_workers + 2
+        
+        await engine.wait(job.sync_id)
+        assert job.records_synced == 300
+    
+    def test_unknown_crm_rejected(self):
+        with pytest.raises(ValueError):
+            SyncEngine().start("zoho", "salesforce", ["contacts"])
+
+
+class TestIncrementalSync:
+
+    @pytest.mark.asyncio
+    async def test_second_run_reads_only_changes(self, small_batches):
+        source = DeltaAdapter(contacts=_contacts(50))
+        target = InMemoryAdapter()
+        engine = _engine(source, target)
+        
+        first = engine.start("hubspot", "salesforce", ["contacts"])
+        await engine.wait(first.sync_id)
+        mark = await engine.watermarks.get("hubspot", "salesforce", "contacts")
+        assert first.records_synced == 50
+        assert mark == T0 + timedelta(seconds=49)
+        
+        source.contacts[3].update(firstname="Three", updated_at=T0 + timedelta(hours=1))
+        source.contacts[7].update(firstname="Seven", updated_at=T0 + timedelta(hours=2))
+        second = engine.start("hubspot", "salesforce", ["contacts"])
+        await engine.wait(second.sync_id)
+        
+        # The record at the watermark is read again and skipped as unchanged.
+        assert second.records_read == 3
+        assert second.records_synced == 2
+        assert second.records_skipped == 1
+        assert source.delta_calls == 1
+        assert await engine.watermarks.get("hubspot", "salesforce", "contacts") == T0 + timedelta(hours=2)
+    
+    @pytest.mark.asyncio
+    async def test_adapter_without_delta_filters_client_side(self, small_batches):
+        source = InMemoryAdapter(contacts=_contacts(30))
+        target = InMemoryAdapter()
+        engine = _engine(source, target)
+        await engine.watermarks.set("hubspot", "salesforce", "contacts", T0 + timedelta(seconds=24))
+        
+        job = engine.start("hubspot", "salesforce", ["contacts"])
+        await engine.wait(job.sync_id)
+        
+        assert job.records_read == 30
+        assert job.records_skipped == 24
+        assert [c["email"] for c in target.contacts] == [f"user{i}@acme.com" for i in range(24, 30)]
+    
+    @pytest.mark.asyncio
+    async def test_delta_pages_follow_the_last_key(self, small_batches):
+        contacts = _contacts(25)
+        for contact in contacts[8:13]:
+            contact["updated_at"] = T0 + timedelta(seconds=8)
+        source = DeltaAdapter(contacts=contacts)
+        read = source.get_contacts_modified_since
+        
+        async def edited_mid_run(since, limit=100, after_id=None):
+            page = await read(since, limit=limit, after_id=after_id)
+            if source.delta_calls == 1:
+                # An edit during the run moves a read record to the end.
+                contacts[2]["updated_at"] = T0 + timedelta(hours=1)
+            return page
+        
+        source.get_contacts_modified_since = edited_mid_run
+        target = InMemoryAdapter()
+        engine = _engine(source, target)
+        await engine.watermarks.set("hubspot", "salesforce", "contacts", T0 - timedelta(seconds=1))
+        
+        job = await _run(engine, "hubspot", "salesforce")
+        
+        assert job.records_read == 26
+        assert {c["email"] for c in target.contacts} == {f"user{i}@acme.com" for i in range(25)}
+        assert await engine.watermarks.get("hubspot", "salesforce", "contacts") == T0 + timedelta(hours=1)
+    
+    @pytest.mark.asyncio
+    async def test_failed_writes_hold_the_watermark(self, small_batches):
+        target = InMemoryAdapter()
+        target.fail_on = {"user5@acme.com"}
+        engine = _engine(DeltaAdapter(contacts=_contacts(10)), target)
+        
+        job = engine.start("hubspot", "salesforce", ["contacts"])
+        await engine.wait(job.sync_id)
+        
+        assert job.errors == 1
+        assert await engine.watermarks.get("hubspot", "salesforce", "contacts") is None
+    
+    @pytest.mark.asyncio
+    async def test_full_resync_ignores_watermark(self, small_batches):
+        source = DeltaAdapter(contacts=_contacts(20))
+        engine = _engine(source, InMemoryAdapter())
+        await engine.watermarks.set("hubspot", "salesforce", "contacts", T0 + timedelta(days=1))
+        
+        job = engine.start("hubspot", "salesforce", ["contacts"], full_resync=True)
+        await engine.wait(job.sync_id)
+        
+        assert job.records_synced == 20
+        assert source.delta_calls == 0
+
+
+class KeyedAdapter(DeltaAdapter):
+    """Delta adapter that assigns record IDs, applies updates and stamps every change."""
+    
+    def __init__(self, contacts=None, prefix: str = "c"):
+        super().__init__(contacts)
+        self.prefix = prefix
+        self.writes: List[Dict[str, Any]] = []
+        self.fail_updates = False
+    
+    async def upsert_contacts(self, records):
+        self.writes.extend(records)
+        return await super().upsert_contacts(records)
+    
+    async def create_contact(self, data):
+        record = {**data, "id": f"{self.prefix}{len(self.contacts) + 1}"}
+        self.contacts.append(_touch(record))
+        return record["id"]
+    
+    async def update_contact(self, contact_id, data):
+        if self.fail_updates:
+            return False
+        for contact in self.contacts:
+            if contact["id"] == contact_id:
+                _touch(contact, **data)
+                return True
+        return False
+    
+    def get(self, contact_id: str) -> Dict[str, Any]:
+        return next(c for c in self.contacts if c["id"] == contact_id)
+
+
+_clock = [T0]
+
+
+def _touch(record: Dict[str, Any], **fields) -> Dict[str, Any]:
+    _clock[0] += timedelta(seconds=1)
+    record.update(fields, updated_at=_clock[0])
+    return record
+
+
+def _keyed(n: int):
+    return [_touch({"id": f"h{i}", "email": f"user{i}@acme.com", "firstname": f"User{i}"}) for i in range(n)]
+
+
+async def _run(engine: SyncEngine, source: str, target: str, **kwargs):
+    job = engine.start(source, target, ["contacts"], **kwargs)
+    await engine.wait(job.sync_id)
+    return job
+
+
+class TestFieldMapping:
+
+    @pytest.mark.asyncio
+    async def test_configured_mapping_and_coercion_errors(self, small_batches):
+        source = InMemoryAdapter(contacts=[
+            {"email": "a@acme.com", "seats": "3"},
+            {"email": "b@acme.com", "seats": "lots"},
+            {"email": "c@acme.com", "seats": None},
+        ])
+        target = InMemoryAdapter()
+        engine = _engine(source, target)
+        engine.mappings.configure("hubspot", "salesforce", "contacts", {"email": "Email", "seats": "Seats:int"})
+        
+        job = await _run(engine, "hubspot", "salesforce")
+        
+        assert target.contacts == [{"Email": "a@acme.com", "Seats": 3}, {"Email": "c@acme.com", "Seats": None}]
+        assert job.records_synced == 2
+        assert job.errors == 1
+        assert "'seats' to int" in job.error_messages[0]
+    
+    def test_invalid_run_mapping_rejected(self):
+        with pytest.raises(ValueError):
+            _engine(InMemoryAdapter(), InMemoryAdapter()).start(
+                "hubspot", "salesforce", ["contacts"], field_mapping={"contacts": {"email": "Email:blob"}}
+            )
+
+
+class TestFieldHashes:
+
+    @pytest.mark.asyncio
+    async def test_unchanged_records_skip_the_target(self, small_batches):
+        source, target = KeyedAdapter(_keyed(20)), KeyedAdapter(prefix="s")
+        engine = _engine(source, target)
+        await _run(engine, "hubspot", "salesforce")
+        assert len(target.contacts) == 20
+        assert "id" not in target.writes[0]
+        
+        target.writes.clear()
+        second = await _run(engine, "hubspot", "salesforce", full_resync=True)
+        assert second.records_skipped == 20
+        assert target.writes == []
+        
+        _touch(source.contacts[4], firstname="Renamed")
+        third = await _run(engine, "hubspot", "salesforce")
+        assert third.records_synced == 1
+        assert target.writes == [{"firstname": "Renamed", "id": "s5"}]
+        assert target.get("s5")["firstname"] == "Renamed"
+    
+    @pytest.mark.asyncio
+    async def test_records_written_by_a_run_are_unchanged_in_reverse(self, small_batches):
+        source, target = KeyedAdapter(_keyed(10)), KeyedAdapter(prefix="s")
+        engine = _engine(source, target)
+        await _run(engine, "hubspot", "salesforce")
+        
+        _touch(target.get("s2"), firstname="Changed in Salesforce")
+        back = await _run(engine, "salesforce", "hubspot")
+        
+        assert back.records_skipped == 9
+        assert source.writes == [{"firstname": "Changed in Salesforce", "id": "h1"}]
+        assert source.get("h1")["firstname"] == "Changed in Salesforce"
+    
+    @pytest.mark.asyncio
+    async def test_records_without_fields_to_write_are_skipped(self, small_batches):
+        source, target = KeyedAdapter([_touch({"id": "h0"}), *_keyed(2)]), KeyedAdapter(prefix="s")
+        engine = _engine(source, target)
+        engine.mappings.configure("hubspot", "salesforce", "contacts", {"id": "HubSpotId", "email": "Email"})
+        
+        job = await _run(engine, "hubspot", "salesforce")
+        
+        assert job.status == "completed"
+        assert job.records_skipped == 1
+        assert [c["Email"] for c in target.contacts] == ["user0@acme.com", "user1@acme.com"]
+
+
+class TestConflicts:
+
+    async def _conflicting(self, policy: str):
+        source, target = KeyedAdapter(_keyed(5)), KeyedAdapter(prefix="s")
+        engine = _engine(source, target)
+        await _run(engine, "hubspot", "salesforce")
+        await _run(engine, "salesforce", "hubspot")
+        
+        _touch(source.get("h0"), firstname="From HubSpot", email="new@acme.com")
+        _touch(target.get("s1"), firstname="From Salesforce")
+        target.writes.clear()
+        job = await _run(engine, "hubspot", "salesforce", conflict_resolution=policy)
+        return engine, source, target, job
+    
+    @pytest.mark.asyncio
+    async def test_source_wins_overwrites_and_records(self, small_batches):
+        engine, _, target, job = await self._conflicting("source_wins")
+        
+        assert job.conflicts == 1
+        assert target.get("s1")["firstname"] == "From HubSpot"
+        assert target.get("s1")["email"] == "new@acme.com"
+        assert await engine.open_conflicts() == []
+        assert [c["resolution"] for c in engine.conflicts.conflicts.values()] == ["source_wins"]
+    
+    @pytest.mark.asyncio
+    async def test_manual_holds_only_the_conflicting_field(self, small_batches):
+        engine, source, target, job = await self._conflicting("manual")
+        
+        assert job.conflicts == 1
+        assert target.writes == [{"email": "new@acme.com", "id": "s1"}]
+        assert target.get("s1")["firstname"] == "From Salesforce"
+        [conflict] = await engine.open_conflicts()
+        assert (conflict["source_id"], conflict["target_id"], conflict["field"]) == ("h0", "s1", "firstname")
+        assert (conflict["source_value"], conflict["target_value"]) == ("From HubSpot", "From Salesforce")
+        
+        rerun = await _run(engine, "hubspot", "salesforce", conflict_resolution="manual", full_resync=True)
+        assert rerun.conflicts == 0
+        assert rerun.records_skipped == 5
+        
+        resolved = await engine.resolve_conflict(conflict["id"], "custom", "Agreed")
+        assert resolved["status"] == "resolved"
+        assert source.get("h0")["firstname"] == target.get("s1")["firstname"] == "Agreed"
+        assert await engine.open_conflicts() == []
+        with pytest.raises(ValueError):
+            await engine.resolve_conflict(conflict["id"], "source_wins")
+        
+        final = await _run(engine, "hubspot", "salesforce", full_resync=True)
+        assert final.records_skipped == 5
+    
+    @pytest.mark.asyncio
+    async def test_target_wins_copies_back_on_reverse_run(self, small_batches):
+        engine, source, target, job = await self._conflicting("manual")
+        [conflict] = await engine.open_conflicts()
+        
+        await engine.resolve_conflict(conflict["id"], "target_wins")
+        await _run(engine, "salesforce", "hubspot", full_resync=True)
+        
+        assert source.get("h0")["firstname"] == "From Salesforce"
+    
+    @pytest.mark.asyncio
+    async def test_resolution_claims_the_conflict_before_writing(self, small_batches):
+        engine, _, target, _ = await self._conflicting("manual")
+        [conflict] = await engine.open_conflicts()
+        
+        target.fail_updates = True
+        with pytest.raises(RuntimeError):
+            await engine.resolve_conflict(conflict["id"], "source_wins")
+        assert [c["id"] for c in await engine.open_conflicts()] == [conflict["id"]]
+        
+        target.fail_updates = False
+        target.writes.clear()
+        outcomes = await asyncio.gather(
+            engine.resolve_conflict(conflict["id"], "source_wins"),
+            engine.resolve_conflict(conflict["id"], "source_wins"),
+            return_exceptions=True,
+        )
+        assert sorted(type(o).__name__ for o in outcomes) == ["ValueError", "dict"]
+        assert target.writes == [{"id": "s1", "firstname": "From HubSpot"}]
+    
+    def test_unknown_policy_rejected(self):
+        engine = _engine(InMemoryAdapter(), InMemoryAdapter())
+        with pytest.raises(ValueError):
+            engine.start("hubspot", "salesforce", ["contacts"], conflict_resolution="newest_wins")